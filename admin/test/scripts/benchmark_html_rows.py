@@ -0,0 +1,103 @@
+"""Measures the throughput of the HTML rendering of artifact table rows.
+
+This script renders a synthetic table with the row loop used by
+ArtifactHtmlReport before the rendering was optimized and with the current
+rendering of ArtifactHtmlReport, checks that both produce the same HTML and
+prints the time and throughput of each. The table mixes text needing to be
+escaped, numbers, None and 'N/A' values and an HTML column not escaped, like
+the media columns of the artifacts.
+
+Usage:
+  python benchmark_html_rows.py [--rows <row_count>] [--columns <column_count>]
+"""
+import argparse
+import html
+import io
+import os
+import sys
+import time
+
+# Add the root directory to sys.path to import the scripts
+root_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(root_dir)
+from scripts.artifact_report import ArtifactHtmlReport
+
+
+def get_table(row_count, column_count):
+    data_headers = [f'Column {index}' for index in range(column_count - 1)] + ['Media']
+    values = ['2024-01-01 10:00:00', 'Text with <b>tags</b> & "quotes"', None, 'N/A', 12345, 3.5,
+              'com.apple.springboard']
+    data_list = []
+    for row_index in range(row_count):
+        row = [values[(row_index + column) % len(values)] for column in range(column_count - 1)]
+        row.append(f'<a href="media/{row_index}.jpg">{row_index}.jpg</a>')
+        data_list.append(tuple(row))
+    return data_headers, data_list
+
+
+def write_rows_reference(output_file, data_headers, data_list, html_escape, html_no_escape):
+    """The row loop of ArtifactHtmlReport.write_artifact_data_table before its optimization"""
+    if html_escape:
+        for row in data_list:
+            if html_no_escape:
+                output_file.write('<tr>' + ''.join(('<td>{}</td>'.format(html.escape(
+                    str(x) if x not in [None, 'N/A'] else '')) if h not in html_no_escape else '<td>{}</td>'.format(
+                    str(x) if x not in [None, 'N/A'] else '') for x, h in zip(row, data_headers))) + '</tr>')
+            else:
+                output_file.write('<tr>' + ''.join(
+                    ('<td>{}</td>'.format(html.escape(str(x) if x not in [None, 'N/A'] else '')) for x in
+                     row)) + '</tr>')
+    else:
+        for row in data_list:
+            output_file.write('<tr>' + ''.join(('<td>{}</td>'.format(str(x) if x not in [None, 'N/A'] else '')
+                                                for x in row)) + '</tr>')
+
+
+def write_rows_current(output_file, data_headers, data_list, html_escape, html_no_escape):
+    ArtifactHtmlReport._write_rows(output_file, ArtifactHtmlReport._get_row_cells(
+        data_headers, data_list, html_escape, html_no_escape))
+
+
+def measure(write_rows, output_path, data_headers, data_list, html_no_escape):
+    with open(output_path, 'w', encoding='utf8') as output_file:
+        start_time = time.perf_counter()
+        write_rows(output_file, data_headers, data_list, True, html_no_escape)
+    return time.perf_counter() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the HTML rendering of artifact table rows")
+    parser.add_argument("--rows", type=int, default=1000000, help="Number of rows of the table")
+    parser.add_argument("--columns", type=int, default=8, help="Number of columns of the table")
+    parser.add_argument("--output", default=os.path.join(root_dir, 'benchmark_html_rows.tmp'),
+                        help="Path of the temporary HTML file")
+    args = parser.parse_args()
+
+    data_headers, data_list = get_table(args.rows, args.columns)
+    check_list = data_list[:1000]
+    for html_no_escape in ([], ['Media']):
+        reference_output = io.StringIO()
+        current_output = io.StringIO()
+        write_rows_reference(reference_output, data_headers, check_list, True, html_no_escape)
+        write_rows_current(current_output, data_headers, check_list, True, html_no_escape)
+        if reference_output.getvalue() != current_output.getvalue():
+            print(f"Error: the rendered rows differ with html_no_escape={html_no_escape}")
+            sys.exit(1)
+
+    cell_count = args.rows * args.columns
+    print(f"Rendering {args.rows:,} rows of {args.columns} columns ({cell_count:,} cells)")
+    try:
+        for html_no_escape in ([], ['Media']):
+            reference_time = measure(write_rows_reference, args.output, data_headers, data_list, html_no_escape)
+            current_time = measure(write_rows_current, args.output, data_headers, data_list, html_no_escape)
+            print(f"html_no_escape={html_no_escape}")
+            print(f"  Previous rendering: {reference_time:.2f} s, {cell_count / reference_time:,.0f} cells/s")
+            print(f"  Current rendering:  {current_time:.2f} s, {cell_count / current_time:,.0f} cells/s")
+            print(f"  Speedup: {reference_time / current_time:.2f}x")
+    finally:
+        if os.path.exists(args.output):
+            os.remove(args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The unit tests import the scripts package from the root of the repository
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
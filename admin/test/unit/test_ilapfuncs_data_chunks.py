@@ -0,0 +1,29 @@
+from scripts.ilapfuncs import DataBatch, get_data_chunks
+
+
+def test_rows_yielded_as_lists_are_single_rows():
+    rows = [['only', 'row'], ('t', 'row'), ['third', 'row']]
+    assert list(get_data_chunks(iter(rows), 10)) == [rows]
+
+
+def test_rows_with_list_values_are_single_rows():
+    rows = [[['a', 'b'], 'list value'], [['c'], 'other']]
+    assert list(get_data_chunks(iter(rows), 10)) == [rows]
+
+
+def test_data_batches_are_spread_in_rows():
+    def data_rows():
+        yield ('first', 1)
+        yield DataBatch([('second', 2), ['third', 3]])
+        yield ['fourth', 4]
+        yield DataBatch()
+    assert list(get_data_chunks(data_rows(), 10)) == [[('first', 1), ('second', 2), ['third', 3], ['fourth', 4]]]
+
+
+def test_chunks_have_chunk_size_rows():
+    def data_rows():
+        yield DataBatch([(index,) for index in range(5)])
+        for index in range(5, 8):
+            yield [index]
+    assert list(get_data_chunks(data_rows(), 3)) == [
+        [(0,), (1,), (2,)], [(3,), (4,), [5]], [[6], [7]]]
@@ -0,0 +1,120 @@
+import os
+import sqlite3
+
+import pytest
+
+from scripts import lavafuncs, run_journal
+from scripts.lavafuncs import initialize_lava, lava_create_sqlite_table, lava_finalize_output, lava_get_data, \
+    lava_insert_sqlite_data, lava_sync, resume_lava
+from scripts.run_journal import close_run_journal, get_completed_plugins, journal_output, \
+    journal_plugin_started, journal_plugins_completed, load_run_state, open_run_journal, \
+    rollback_interrupted_plugins
+
+
+@pytest.fixture
+def report_folder(tmp_path):
+    yield str(tmp_path)
+    close_run_journal()
+    if lavafuncs._lava_writer_queue:
+        lava_finalize_output(str(tmp_path))
+
+
+def write_file(report_folder, name):
+    path = os.path.join(report_folder, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(name)
+    return path
+
+
+def write_lava_table(table_name, rows):
+    table_name, column_map, object_columns = lava_create_sqlite_table(table_name, ['value'])
+    lava_insert_sqlite_data(table_name, rows, object_columns, ['value'], column_map)
+    lavafuncs.lava_data['artifacts'].setdefault('Category', []).append({'name': table_name, 'tablename': table_name})
+
+
+def get_lava_tables(report_folder):
+    db = sqlite3.connect(os.path.join(report_folder, lavafuncs.lava_db_name))
+    try:
+        return {name for (name,) in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    finally:
+        db.close()
+
+
+def start_run(report_folder):
+    open_run_journal(report_folder, {'plugins': ['completed_plugin', 'interrupted_plugin']})
+    initialize_lava('input', report_folder, 'fs')
+
+
+def complete_plugin(plugin_name, table_name, shared_file):
+    journal_plugin_started(plugin_name)
+    journal_output('html', write_file(run_journal._journal_folder, f'_HTML/{plugin_name}.html'))
+    journal_output('html', shared_file)
+    write_lava_table(table_name, [('completed',)])
+    lava_sync()
+    journal_plugins_completed([plugin_name], {'lava_data': lava_get_data()})
+
+
+def interrupt_plugin(plugin_name, table_name, shared_file):
+    journal_plugin_started(plugin_name)
+    journal_output('html', write_file(run_journal._journal_folder, f'_HTML/{plugin_name}.html'))
+    journal_output('tsv', write_file(run_journal._journal_folder, f'_TSV Exports/{plugin_name}.tsv'))
+    journal_output('html', shared_file)
+    write_lava_table(table_name, [('interrupted',)])
+    lavafuncs.lava_commit()
+
+
+def crash(report_folder):
+    '''Leaves the journal and the LAVA database as a crash of the process would'''
+    close_run_journal()
+    lavafuncs._lava_writer_request('close')
+    lavafuncs._lava_writer_queue = None
+    lavafuncs.lava_db.close()
+
+
+def test_rollback_interrupted_plugins(report_folder):
+    start_run(report_folder)
+    shared_file = write_file(report_folder, '_HTML/shared.html')
+    complete_plugin('completed_plugin', 'completed_table', shared_file)
+    interrupt_plugin('interrupted_plugin', 'interrupted_table', shared_file)
+    crash(report_folder)
+
+    open_run_journal(report_folder)
+    assert rollback_interrupted_plugins(report_folder, lavafuncs.lava_db_name) == ['interrupted_plugin']
+    assert get_completed_plugins() == {'completed_plugin'}
+    assert os.path.isfile(os.path.join(report_folder, '_HTML', 'completed_plugin.html'))
+    assert os.path.isfile(shared_file)
+    assert not os.path.exists(os.path.join(report_folder, '_HTML', 'interrupted_plugin.html'))
+    assert not os.path.exists(os.path.join(report_folder, '_TSV Exports', 'interrupted_plugin.tsv'))
+    tables = get_lava_tables(report_folder)
+    assert 'completed_table' in tables
+    assert 'interrupted_table' not in tables
+    # Nothing left to roll back
+    assert rollback_interrupted_plugins(report_folder, lavafuncs.lava_db_name) == []
+
+
+def test_resume_restores_the_state_of_the_completed_plugins(report_folder):
+    start_run(report_folder)
+    shared_file = write_file(report_folder, '_HTML/shared.html')
+    complete_plugin('completed_plugin', 'completed_table', shared_file)
+    interrupt_plugin('interrupted_plugin', 'interrupted_table', shared_file)
+    crash(report_folder)
+
+    open_run_journal(report_folder)
+    rollback_interrupted_plugins(report_folder, lavafuncs.lava_db_name)
+    run_state = load_run_state()
+    assert [artifact['tablename'] for artifact in run_state['lava_data']['artifacts']['Category']] \
+        == ['completed_table']
+    resume_lava(report_folder, run_state['lava_data'])
+    complete_plugin('interrupted_plugin', 'interrupted_table', shared_file)
+    assert get_completed_plugins() == {'completed_plugin', 'interrupted_plugin'}
+    lava_finalize_output(report_folder)
+
+    db = sqlite3.connect(os.path.join(report_folder, lavafuncs.lava_db_name))
+    try:
+        assert db.execute('SELECT value FROM completed_table').fetchall() == [('completed',)]
+        assert db.execute('SELECT value FROM interrupted_table').fetchall() == [('completed',)]
+    finally:
+        db.close()
+    assert [artifact['tablename'] for artifact in lavafuncs.lava_data['artifacts']['Category']] \
+        == ['completed_table', 'interrupted_table']
@@ -0,0 +1,43 @@
+import fnmatch
+import sqlite3
+
+import pytest
+
+from scripts.search_files import FileSeekerItunes, _longest_literal, normalize_pattern, normcase
+
+RELATIVE_PATHS = ['x/a[b.db', 'x/ab.db', 'x/^y.db', 'x/zy.db', 'x/]y.db', 'x/xy.db', 'x/ay.db', 'x/a!b.db']
+PATTERNS = ['*/a[b.db', '*/[^x]y.db', '*/[!x]y.db', '*/a[!x]b.db', '*y.db', '*/a?b.db', '*/x/*.db', '*/[]x]y.db',
+            '*/[]]y.db', '*/[!]]y.db']
+
+
+@pytest.fixture
+def itunes_seeker(tmp_path):
+    backup = tmp_path / 'backup'
+    backup.mkdir()
+    db = sqlite3.connect(backup / 'Manifest.db')
+    db.execute('CREATE TABLE Files (fileID TEXT PRIMARY KEY, domain TEXT, relativePath TEXT, flags INTEGER, file BLOB)')
+    db.executemany('INSERT INTO Files VALUES (?, ?, ?, 1, NULL)', [
+        (f'{index:040x}', 'HomeDomain', relative_path) for index, relative_path in enumerate(RELATIVE_PATHS)])
+    db.commit()
+    db.close()
+    return FileSeekerItunes(str(backup), str(tmp_path / 'data'), 'db', None)
+
+
+@pytest.mark.parametrize('filepattern', PATTERNS)
+def test_itunes_patterns_match_like_fnmatch(itunes_seeker, filepattern):
+    itunes_seeker.resolve_patterns([filepattern])
+    normalized_pattern = normalize_pattern(filepattern)
+    expected = [path for path in itunes_seeker._all_files
+                if fnmatch.fnmatchcase(normcase(path), normalized_pattern)]
+    assert expected
+    assert itunes_seeker.resolved[normalized_pattern] == expected
+
+
+@pytest.mark.parametrize('filepattern, literal', [
+    ('*/[]abc]/file.db', '/file.db'),
+    ('*/[!]abc]/file.db', '/file.db'),
+    ('*/a[b/file.db', '/a[b/file.db'),
+    ('*/[!x]y?z.db', 'z.db'),
+])
+def test_longest_literal_reads_brackets_like_fnmatch(filepattern, literal):
+    assert _longest_literal(filepattern) == literal
@@ -0,0 +1,47 @@
+import io
+import os
+import tarfile
+
+import pytest
+
+from scripts import search_files
+from scripts.search_files import FileSeekerTar
+
+
+def make_tar_gz(path, file_count=20, file_size=64 * 1024):
+    with tarfile.open(path, 'w:gz') as tar:
+        for index in range(file_count):
+            data = os.urandom(file_size)
+            info = tarfile.TarInfo(f'private/var/mobile/file{index}.bin')
+            info.size = len(data)
+            info.mtime = 1700000000
+            tar.addfile(info, io.BytesIO(data))
+
+
+@pytest.mark.skipif(search_files.indexed_gzip is None, reason='indexed_gzip is not installed')
+def test_gzip_index_saved_after_resolve_patterns_and_reused(tmp_path, monkeypatch):
+    monkeypatch.setattr(FileSeekerTar, 'seek_point_spacing', 256 * 1024)
+    tar_path = str(tmp_path / 'extraction.tar.gz')
+    make_tar_gz(tar_path)
+    index_cache = str(tmp_path / 'index_cache')
+
+    seeker = FileSeekerTar(tar_path, str(tmp_path / 'data1'), index_cache)
+    seeker.resolve_patterns(['*/mobile/file1*.bin'])
+    # Saved without waiting for cleanup, which the runs may never reach
+    gzip_indexes = [name for name in os.listdir(index_cache) if name.endswith('.gzidx')]
+    assert len(gzip_indexes) == 1
+    seeker.cleanup()
+
+    gzip_index_path = os.path.join(index_cache, gzip_indexes[0])
+    saved_mtime = os.path.getmtime(gzip_index_path)
+    second_seeker = FileSeekerTar(tar_path, str(tmp_path / 'data2'), index_cache)
+    assert second_seeker._gzip_file is not None
+    # Loaded from the index, so there is nothing to save again
+    assert second_seeker._gzip_index_path is None
+    assert second_seeker._gzip_file.seek_points()
+    paths = second_seeker.search('*/mobile/file19.bin')
+    assert len(paths) == 1
+    with open(paths[0], 'rb') as extracted, tarfile.open(tar_path, 'r:gz') as tar:
+        assert extracted.read() == tar.extractfile('private/var/mobile/file19.bin').read()
+    second_seeker.cleanup()
+    assert os.path.getmtime(gzip_index_path) == saved_mtime
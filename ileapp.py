@@ -9,6 +9,7 @@ import traceback
 import sys
 
 import scripts.plugin_loader as plugin_loader
+import scripts.plugin_scheduler as plugin_scheduler
 
 from shutil import copyfile
 from getpass import getpass
@@ -18,11 +19,28 @@ from scripts.version_info import ileapp_version
 from time import process_time, gmtime, strftime, perf_counter
 from scripts.lavafuncs import *
 from scripts.context import Context
+from scripts.files_index import get_default_index_cache_folder
+from scripts.artifact_cache import get_default_artifact_cache_folder
+from scripts.timeline_db import finalize_timeline
+from scripts.location_exports import finalize_locations
+from scripts.columnar_export import columnar_export_formats, is_columnar_export_available
+from scripts.tsv_writer import tsv_compression_formats, is_tsv_compression_available
+from scripts.run_journal import has_run_journal, get_run_params, is_run_complete, open_run_journal, \
+    close_run_journal, journal_plugin_started, journal_plugins_completed, get_completed_plugins, load_run_state, \
+    rollback_interrupted_plugins, set_run_complete
 
 def validate_args(args):
     if args.artifact_paths or args.create_profile_casedata:
         return  # Skip further validation if --artifact_paths is used
 
+    if args.resume:
+        if not os.path.isdir(args.resume):
+            raise argparse.ArgumentError(None, f'REPORT folder \'{args.resume}\' does not exist! Run the program again.')
+        if not has_run_journal(args.resume):
+            raise argparse.ArgumentError(None, f'REPORT folder \'{args.resume}\' has no run journal to resume. '
+                                               f'Run the program again.')
+        return  # The other arguments are read from the run journal
+
     # Ensure other arguments are provided
     mandatory_args = ['input_path', 'output_path', 't']
     for arg in mandatory_args:
@@ -60,6 +78,17 @@ def validate_args(args):
     if args.load_profile and not os.path.exists(args.load_profile):
         raise argparse.ArgumentError(None, 'iLEAPP Profile file not found! Run the program again.')
 
+    if args.workers < 1:
+        raise argparse.ArgumentError(None, 'The number of workers must be at least 1. Run the program again.')
+
+    if args.export and not is_columnar_export_available():
+        raise argparse.ArgumentError(None, f'The {args.export} export requires the pyarrow package. '
+                                           'Install it with "pip install pyarrow" and run the program again.')
+
+    if args.tsv_compress and not is_tsv_compression_available(args.tsv_compress):
+        raise argparse.ArgumentError(None, f'The {args.tsv_compress} compression requires the zstandard package. '
+                                           'Install it with "pip install zstandard" and run the program again.')
+
     try:
         timezone = pytz.timezone(args.timezone)
     except pytz.UnknownTimeZoneError:
@@ -179,6 +208,43 @@ def main():
                               "This argument is meant to be used alone, without any other arguments."))
     parser.add_argument('--custom_output_folder', required=False, action="store", help="Custom name for the output folder")
     parser.add_argument('--itunes_password', required=False, action="store", help="Password used for encrypted iTunes backup")
+    parser.add_argument('--workers', required=False, action="store", default=1, type=int,
+                        help=("Number of worker processes used to run independent artifacts in parallel "
+                              "(default: 1, artifacts are processed sequentially)"))
+    parser.add_argument('--index-cache', required=False, action="store", nargs='?',
+                        const=get_default_index_cache_folder(), metavar='FOLDER',
+                        help=("Reuse the files listing of a file system extraction (type fs) or the members of a "
+                              "tar archive (types tar and gz) saved in the index cache FOLDER by a previous run, as "
+                              "long as the extraction has not changed. The index is built on the first run. For gzip "
+                              "compressed archives, seek points are also saved when the optional indexed_gzip "
+                              f"package is installed. Default folder: {get_default_index_cache_folder()}"))
+    parser.add_argument('--artifact-cache', required=False, action="store", nargs='?',
+                        const=get_default_artifact_cache_folder(), metavar='FOLDER',
+                        help=("Reuse the results of the artifacts saved in the cache FOLDER by a previous run when "
+                              "their files, their module, the iLEAPP version and the timezone are the same. The "
+                              "reports are generated from the saved results. Only use a FOLDER you trust. Default "
+                              f"folder: {get_default_artifact_cache_folder()}"))
+    parser.add_argument('--resume', required=False, action="store", metavar='REPORT_FOLDER',
+                        help=("Resume an interrupted run in its REPORT_FOLDER. The artifacts completed before the "
+                              "interruption are skipped, the partial outputs of the interrupted ones are deleted "
+                              "and the run continues with the arguments it was started with. "
+                              "This argument is meant to be used alone, except --itunes_password for an encrypted "
+                              "iTunes backup, which is not recorded."))
+    parser.add_argument('--evidence-access', required=False, action="store", default='copy',
+                        choices=evidence_access_modes,
+                        help=("How the files of a file system extraction (type fs) are accessed: copied to the "
+                              "report data folder (default), hardlinked or cloned (reflink) in it when the "
+                              "evidence is on the same file system, or read in place. In place, SQLite databases "
+                              "are opened as immutable and only the ones with -wal or -journal data are linked "
+                              "with a private copy of these files. Hardlinked and in place files are the evidence "
+                              "itself: the artifacts must only read them, any write would change the evidence."))
+    parser.add_argument('--export', required=False, action="store", choices=columnar_export_formats,
+                        help=("Also export the records of each artifact to a typed, compressed Parquet or Arrow "
+                              "IPC file, in the _Parquet Exports or _Arrow Exports folder, for analysis with "
+                              "pandas or DuckDB. Requires the optional pyarrow package."))
+    parser.add_argument('--tsv-compress', required=False, action="store", choices=tsv_compression_formats,
+                        help=("Compress the TSV exports as they are written, in .tsv.gz files with gzip or in "
+                              ".tsv.zst files with Zstandard. Zstandard requires the optional zstandard package."))
 
     available_plugins = []
     loader = plugin_loader.PluginLoader()
@@ -207,6 +273,10 @@ def main():
     except argparse.ArgumentError as e:
         parser.error(str(e))
 
+    if args.resume:
+        resume_run(args.resume, loader, args.itunes_password)
+        return
+
     if args.artifact_paths:
         print('Artifact path list generation started.')
         print('')
@@ -327,13 +397,90 @@ def main():
     initialize_lava(input_path, out_params.output_folder_base, extracttype)
 
     crunch_artifacts(selected_plugins, extracttype, input_path, out_params, wrap_text, loader, casedata, time_offset, 
-        profile_filename, itunes_backup_password)
+        profile_filename, itunes_backup_password, workers=args.workers, index_cache=args.index_cache,
+        evidence_access=args.evidence_access, artifact_cache=args.artifact_cache, export=args.export,
+        tsv_compress=args.tsv_compress)
+
+    lava_finalize_output(out_params.output_folder_base)
+
+def resume_run(report_folder, loader, itunes_backup_password=None):
+    '''Resumes the interrupted run of a report folder with the arguments recorded in its run journal.
+    The password of an encrypted iTunes backup is not recorded: it is given again, or asked on the terminal.'''
+    report_folder = os.path.abspath(report_folder)
+    if is_run_complete(report_folder):
+        print(f'The run of {report_folder} is already complete.')
+        return
+    run_params = get_run_params(report_folder)
+    if not run_params:
+        print(f'The run journal of {report_folder} could not be read.')
+        return
+    if run_params.get('export') and not is_columnar_export_available():
+        print(f'The {run_params["export"]} export of the run requires the pyarrow package.')
+        return
+    if run_params.get('tsv_compress') and not is_tsv_compression_available(run_params['tsv_compress']):
+        print(f'The {run_params["tsv_compress"]} compression of the run requires the zstandard package.')
+        return
+    if run_params['extracttype'] == 'itunes' and not itunes_backup_password \
+            and not (sys.stdin and sys.stdin.isatty()):
+        if get_itunes_backup_type(run_params['input_path']) == 'db' \
+                and get_itunes_backup_encryption(run_params['input_path']):
+            print('The iTunes backup of the run is encrypted: resume it with its password given by --itunes_password.')
+            return
+
+    out_params = OutputParameters(os.path.dirname(report_folder), os.path.basename(report_folder), resume=True)
+    Context.set_output_params(out_params)
+    plugins = [loader[name] for name in run_params['plugins'] if name in loader]
+
+    crunch_artifacts(plugins, run_params['extracttype'], run_params['input_path'], out_params,
+        run_params['wrap_text'], loader, run_params['casedata'], run_params['time_offset'],
+        run_params['profile_filename'], itunes_backup_password, workers=run_params['workers'],
+        index_cache=run_params['index_cache'], evidence_access=run_params['evidence_access'],
+        artifact_cache=run_params['artifact_cache'],
+        export=run_params.get('export'), tsv_compress=run_params.get('tsv_compress'), resume=True)
 
     lava_finalize_output(out_params.output_folder_base)
 
+def search_plugin_files(plugin, seeker, extracttype, input_path, out_params, log):
+    '''Searches the files matching the paths of a plugin and writes them to the processed files log.
+    Returns the list of files found.'''
+    if isinstance(plugin.search, list) or isinstance(plugin.search, tuple):
+        search_regexes = plugin.search
+    elif plugin.search is None:
+        search_regexes = plugin.search
+    else:
+        search_regexes = [plugin.search]
+    files_found = []
+    log.write(f'<b>For {plugin.name} module</b>')
+    if search_regexes is None:
+        log.write(f'<ul><li>No search regexes provided for {plugin.name} module.')
+        log.write("<ul><li><i>'_lava_artifacts.db'</i> used as source file.</li></ul></li></ul>")
+        files_found = [os.path.join(out_params.output_folder_base, '_lava_artifacts.db')]
+    else:
+        for artifact_search_regex in search_regexes:
+            found = seeker.search(artifact_search_regex)
+            if not found:
+                if plugin.name == 'logarchive' and extracttype != 'fs' and extracttype != 'file':
+                    src = os.path.join(os.path.dirname(input_path), "logarchive.json")
+                    dst = os.path.join(out_params.data_folder, "logarchive.json")
+                    if os.path.exists(src):
+                        copyfile(src, dst)
+                        files_found.append(dst)
+                log.write(f'<ul><li>No file found for regex <i>{artifact_search_regex}</i></li></ul>')
+            else:
+                log.write(f'<ul><li>{len(found)} {"files" if len(found) > 1 else "file"} for regex <i>{artifact_search_regex}</i> located at:')
+                for pathh in found:
+                    if pathh.startswith('\\\\?\\'):
+                        pathh = pathh[4:]
+                    log.write(f'<ul><li>{pathh}</li></ul>')
+                log.write(f'</li></ul>')
+                files_found.extend(found)
+    return files_found
+
 def crunch_artifacts(
         plugins: typing.Sequence[plugin_loader.PluginSpec], extracttype, input_path, out_params, wrap_text,
-        loader: plugin_loader.PluginLoader, casedata, time_offset, profile_filename, itunes_backup_password=None, decryption_keys=None):
+        loader: plugin_loader.PluginLoader, casedata, time_offset, profile_filename, itunes_backup_password=None, decryption_keys=None,
+        workers=1, index_cache=None, evidence_access='copy', artifact_cache=None, export=None,
+        tsv_compress=None, resume=False):
     start = process_time()
     start_wall = perf_counter()
  
@@ -344,19 +491,76 @@ def crunch_artifacts(
     logfunc('Objective: Triage iOS Full File System and iTunes Backup Extractions.')
     logfunc('By: Alexis Brignoni | @AlexisBrignoni | abrignoni.com')
     logfunc('By: Yogesh Khatri   | @SwiftForensics | swiftforensics.com\n')
-    logdevinfo()
-    
+    if not resume:
+        logdevinfo()
+    out_params.artifact_cache_folder = artifact_cache
+    out_params.export_format = export
+    out_params.tsv_compression = tsv_compress
+    lava_only = False
+
+    def checkpoint(plugin_names):
+        '''Records in the run journal that plugins are completed, with the state of the run'''
+        try:
+            # The LAVA data must be on disk before the plugins are recorded as completed
+            lava_sync()
+        except Exception as ex:
+            logfunc('Writing the LAVA data of {} had errors!'.format(', '.join(plugin_names)))
+            logfunc('Error was {}'.format(str(ex)))
+        journal_plugins_completed(plugin_names, {
+            'lava_data': lava_get_data(),
+            'identifiers': identifiers,
+            'icons': icons,
+            'lava_only_artifacts': lava_only_artifacts,
+            'os_version': iOS.get_version(),
+            'installed_os_version': Context.get_installed_os_version(),
+            'lava_only': lava_only})
+
+    if resume:
+        open_run_journal(out_params.output_folder_base)
+        rolled_back = rollback_interrupted_plugins(out_params.output_folder_base, lava_db_name)
+        if rolled_back:
+            logfunc(f'Partial outputs of the interrupted artifacts deleted: {", ".join(rolled_back)}')
+        run_state = load_run_state()
+        resume_lava(out_params.output_folder_base, run_state['lava_data'])
+        identifiers.update(run_state['identifiers'])
+        icons.update(run_state['icons'])
+        lava_only_artifacts.update(run_state['lava_only_artifacts'])
+        if run_state['os_version']:
+            iOS.set_version(run_state['os_version'])
+        if run_state['installed_os_version']:
+            Context.set_installed_os_version(run_state['installed_os_version'])
+        lava_only = run_state['lava_only']
+        completed_plugins = get_completed_plugins()
+        logfunc(f'Resuming the run: {len(completed_plugins)} artifacts already completed')
+    else:
+        open_run_journal(out_params.output_folder_base, {
+            'plugins': [plugin.name for plugin in plugins],
+            'extracttype': extracttype,
+            'input_path': input_path,
+            'wrap_text': wrap_text,
+            'time_offset': time_offset,
+            'casedata': casedata,
+            'profile_filename': profile_filename,
+            'workers': workers,
+            'index_cache': index_cache,
+            'evidence_access': evidence_access,
+            'artifact_cache': artifact_cache,
+            'export': export,
+            'tsv_compress': tsv_compress})
+        completed_plugins = set()
+        checkpoint([])
+
     seeker = None
     password = itunes_backup_password
     try:
         if extracttype == 'fs':
-            seeker = FileSeekerDir(input_path, out_params.data_folder)
+            seeker = FileSeekerDir(input_path, out_params.data_folder, index_cache, evidence_access)
 
         elif extracttype == 'file':
             seeker = FileSeekerFile(input_path, out_params.data_folder)
             
         elif extracttype in ('tar', 'gz'):
-            seeker = FileSeekerTar(input_path, out_params.data_folder)
+            seeker = FileSeekerTar(input_path, out_params.data_folder, index_cache)
 
         elif extracttype == 'zip':
             seeker = FileSeekerZip(input_path, out_params.data_folder)
@@ -406,12 +610,23 @@ def crunch_artifacts(
     logfunc(f'File/Directory selected: {input_path}')
     logfunc('\n--------------------------------------------------------------------------------------')
 
-    log = open(os.path.join(out_params.output_folder_base, '_HTML', '_Script_Logs', 'ProcessedFilesLog.html'), 'w+', encoding='utf8')
+    # Match the search patterns of all the selected artifacts at once
+    search_patterns = []
+    for plugin in plugins:
+        if plugin.name in completed_plugins:
+            continue
+        if isinstance(plugin.search, (list, tuple)):
+            search_patterns.extend(plugin.search)
+        elif isinstance(plugin.search, str):
+            search_patterns.append(plugin.search)
+    seeker.resolve_patterns(search_patterns)
+
+    log = open(os.path.join(out_params.output_folder_base, '_HTML', '_Script_Logs', 'ProcessedFilesLog.html'),
+               'a' if resume else 'w+', encoding='utf8')
     log.write(f'Extraction/Path selected: {input_path}<br><br>')
     log.write(f'Timezone selected: {time_offset}<br><br>')
     
     parsed_modules = 0
-    lava_only = False
     # Special processing for iTunesBackup Info.plist as it is a seperate entity, not part of the Manifest.db. Seeker won't find it
     if extracttype == 'itunes':
         info_plist_path = os.path.join(input_path, 'Info.plist')
@@ -425,7 +640,10 @@ def crunch_artifacts(
                 except (FileExistsError, FileNotFoundError) as ex:
                     logfunc('Error creating report directory at path {}'.format(report_folder))
                     logfunc('Error was {}'.format(str(ex)))
-            loader["itunes_backup_info"].method([info_plist_path], report_folder, seeker, wrap_text, time_offset)
+            if 'itunes_backup_info' not in completed_plugins:
+                journal_plugin_started('itunes_backup_info')
+                loader["itunes_backup_info"].method([info_plist_path], report_folder, seeker, wrap_text, time_offset)
+                checkpoint(['itunes_backup_info'])
             report_folder = os.path.join(out_params.output_folder_base, '_HTML', 'Installed Apps')
             if not os.path.exists(report_folder):
                 try:
@@ -433,86 +651,89 @@ def crunch_artifacts(
                 except (FileExistsError, FileNotFoundError) as ex:
                     logfunc('Error creating report directory at path {}'.format(report_folder))
                     logfunc('Error was {}'.format(str(ex)))
-            loader["itunes_backup_installed_applications"].method([info_plist_path], report_folder, seeker, wrap_text, time_offset)
+            if 'itunes_backup_installed_applications' not in completed_plugins:
+                journal_plugin_started('itunes_backup_installed_applications')
+                loader["itunes_backup_installed_applications"].method([info_plist_path], report_folder, seeker,
+                                                                       wrap_text, time_offset)
+                checkpoint(['itunes_backup_installed_applications'])
             #del search_list['last_build'] # removing last_build as this takes its place
             print([info_plist_path])  # TODO Remove special consideration for itunes? Merge into main search
         else:
             logfunc('Info.plist not found for iTunes Backup!')
             log.write('Info.plist not found for iTunes Backup!')
 
-    # Search for the files per the arguments
-    for plugin_number, plugin in enumerate(plugins, start=1):
-        logfunc()
-        logfunc('[{}/{}] {} [{}] artifact started'.format(plugin_number, len(plugins),
-                                                              plugin.name, plugin.module_name))
+    def prepare_plugin(plugin):
+        '''Searches the files of the plugin and creates its report folder.
+        Returns (files_found, category_folder) or None if there is no work to do.'''
+        nonlocal lava_only
         output_types = plugin.artifact_info.get('output_types', '')
-        if isinstance(plugin.search, list) or isinstance(plugin.search, tuple):
-            search_regexes = plugin.search
-        elif plugin.search is None:
-            search_regexes = plugin.search
-        else:
-            search_regexes = [plugin.search]
-        parsed_modules += 1
-        GuiWindow.SetProgressBar(parsed_modules, len(plugins))
-        files_found = []
-        log.write(f'<b>For {plugin.name} module</b>')
-        if search_regexes is None:
-            log.write(f'<ul><li>No search regexes provided for {plugin.name} module.')
-            log.write("<ul><li><i>'_lava_artifacts.db'</i> used as source file.</li></ul></li></ul>")
-            files_found = [os.path.join(out_params.output_folder_base, '_lava_artifacts.db')]
-        else:
-            for artifact_search_regex in search_regexes:
-                found = seeker.search(artifact_search_regex)
-                if not found:
-                    if plugin.name == 'logarchive' and extracttype != 'fs' and extracttype != 'file':
-                        src = os.path.join(os.path.dirname(input_path), "logarchive.json")
-                        dst = os.path.join(out_params.data_folder, "logarchive.json")
-                        if os.path.exists(src):
-                            copyfile(src, dst)
-                            files_found.append(dst)
-                    log.write(f'<ul><li>No file found for regex <i>{artifact_search_regex}</i></li></ul>')
-                else:
-                    log.write(f'<ul><li>{len(found)} {"files" if len(found) > 1 else "file"} for regex <i>{artifact_search_regex}</i> located at:')
-                    for pathh in found:
-                        if pathh.startswith('\\\\?\\'):
-                            pathh = pathh[4:]
-                        log.write(f'<ul><li>{pathh}</li></ul>')
-                    log.write(f'</li></ul>')
-                    files_found.extend(found)
-        if files_found:
-            if not lava_only and 'lava_only' in output_types:
-                lava_only = True
-            category_folder = os.path.join(out_params.output_folder_base, '_HTML', plugin.category)
-            if not os.path.exists(category_folder):
-                try:
-                    os.makedirs(category_folder)
-                except (FileExistsError, FileNotFoundError) as ex:
-                    logfunc('Error creating {} report directory at path {}'.format(plugin.name, category_folder))
-                    logfunc('Error was {}'.format(str(ex)))
-                    continue  # cannot do work
+        files_found = search_plugin_files(plugin, seeker, extracttype, input_path, out_params, log)
+        if not files_found:
+            return None
+        if not lava_only and 'lava_only' in output_types:
+            lava_only = True
+        category_folder = os.path.join(out_params.output_folder_base, '_HTML', plugin.category)
+        if not os.path.exists(category_folder):
             try:
-                plugin.method(files_found, category_folder, seeker, wrap_text, time_offset)
-                if plugin.name == 'logarchive':
-                    lava_db_path = os.path.join(out_params.output_folder_base, '_lava_artifacts.db')
-                    if does_table_exist_in_db(lava_db_path, 'logarchive'):
-                        loader["logarchive_artifacts"].method([lava_db_path], category_folder, seeker, wrap_text, time_offset)
-                    if does_table_exist_in_db(lava_db_path, 'logarchive_artifacts'):
-                        unifed_logs_artifacts = []
-                        unifed_logs_artifacts = [plugin.name for plugin in loader.plugins
-                                                 if plugin.module_name=='logarchive'
-                                                 and plugin.name != 'logarchive'
-                                                 and plugin.name != 'logarchive_artifacts']
-                        for unifed_log_artifact in unifed_logs_artifacts:
-                            loader[unifed_log_artifact].method([lava_db_path], category_folder, seeker, wrap_text, time_offset)
-            except Exception as ex:
-                logfunc('Reading {} artifact had errors!'.format(plugin.name))
+                os.makedirs(category_folder)
+            except (FileExistsError, FileNotFoundError) as ex:
+                logfunc('Error creating {} report directory at path {}'.format(plugin.name, category_folder))
                 logfunc('Error was {}'.format(str(ex)))
-                logfunc('Exception Traceback: {}'.format(traceback.format_exc()))
-                continue  # nope
-        else:
-            logfunc(f"No file found")
-        logfunc('{} [{}] artifact completed'.format(plugin.name, plugin.module_name))
+                return None  # cannot do work
+        return files_found, category_folder
+
+    if workers > 1 and isinstance(seeker, (FileSeekerTar, FileSeekerZip)):
+        logfunc(f'Parallel processing is not available for {extracttype} extractions. '
+                'Artifacts will be processed sequentially.')
+        workers = 1
+
+    if workers > 1:
+        plugin_scheduler.run_plugins_parallel(plugins, loader, seeker, workers, prepare_plugin, out_params,
+                                              wrap_text, time_offset, completed_plugins, checkpoint)
+    else:
+        # Search for the files per the arguments
+        for plugin_number, plugin in enumerate(plugins, start=1):
+            parsed_modules += 1
+            GuiWindow.SetProgressBar(parsed_modules, len(plugins))
+            if plugin.name in completed_plugins:
+                continue
+            logfunc()
+            logfunc('[{}/{}] {} [{}] artifact started'.format(plugin_number, len(plugins),
+                                                                  plugin.name, plugin.module_name))
+            journal_plugin_started(plugin.name)
+            # The Unified Logs artifacts are executed with logarchive
+            journal_names = [plugin.name]
+            if plugin.name == 'logarchive':
+                journal_names += ['logarchive_artifacts'] + plugin_scheduler.get_unified_logs_plugins(loader)
+            prepared = prepare_plugin(plugin)
+            if prepared:
+                files_found, category_folder = prepared
+                try:
+                    plugin.method(files_found, category_folder, seeker, wrap_text, time_offset)
+                    if plugin.name == 'logarchive':
+                        lava_db_path = os.path.join(out_params.output_folder_base, '_lava_artifacts.db')
+                        if does_table_exist_in_db(lava_db_path, 'logarchive'):
+                            loader["logarchive_artifacts"].method([lava_db_path], category_folder, seeker, wrap_text, time_offset)
+                        if does_table_exist_in_db(lava_db_path, 'logarchive_artifacts'):
+                            unifed_logs_artifacts = []
+                            unifed_logs_artifacts = [plugin.name for plugin in loader.plugins
+                                                     if plugin.module_name=='logarchive'
+                                                     and plugin.name != 'logarchive'
+                                                     and plugin.name != 'logarchive_artifacts']
+                            for unifed_log_artifact in unifed_logs_artifacts:
+                                loader[unifed_log_artifact].method([lava_db_path], category_folder, seeker, wrap_text, time_offset)
+                except Exception as ex:
+                    logfunc('Reading {} artifact had errors!'.format(plugin.name))
+                    logfunc('Error was {}'.format(str(ex)))
+                    logfunc('Exception Traceback: {}'.format(traceback.format_exc()))
+                    checkpoint(journal_names)
+                    continue  # nope
+            else:
+                logfunc(f"No file found")
+            logfunc('{} [{}] artifact completed'.format(plugin.name, plugin.module_name))
+            checkpoint(journal_names)
     log.close()
+    seeker.cleanup()
 
     write_device_info()
     if lava_only:
@@ -530,6 +751,8 @@ def crunch_artifacts(
 
     logfunc('')
     logfunc('Report generation started.')
+    finalize_timeline(out_params.output_folder_base)
+    finalize_locations(out_params.output_folder_base)
     # remove the \\?\ prefix we added to input and output paths, so it does not reflect in report
     if is_platform_windows(): 
         if out_params.output_folder_base.startswith('\\\\?\\'):
@@ -538,6 +761,8 @@ def crunch_artifacts(
             input_path = input_path[4:]
     
     report.generate_report(out_params.output_folder_base, run_time_secs, run_time_HMS, extracttype, input_path, casedata, profile_filename, icons, lava_only)
+    set_run_complete()
+    close_run_journal()
     logfunc('Report generation Completed.')
     logfunc('')
     logfunc(f'Report location: {out_params.output_folder_base}')
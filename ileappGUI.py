@@ -16,6 +16,8 @@ from scripts.tz_offset import tzvalues
 from scripts.modules_to_exclude import modules_to_exclude
 from scripts.lavafuncs import *
 from scripts.context import Context
+from scripts.files_index import get_default_index_cache_folder
+from scripts.artifact_cache import get_default_artifact_cache_folder
 
 
 def pickModules():
@@ -254,7 +256,9 @@ def process(casedata):
 
         crunch_successful = ileapp.crunch_artifacts(
             selected_modules, extracttype, input_path, out_params, wrap_text,
-            loader, casedata, time_offset, profile_filename, None, decryption_keys)
+            loader, casedata, time_offset, profile_filename, None, decryption_keys,
+            index_cache=get_default_index_cache_folder() if index_cache_var.get() else None,
+            artifact_cache=get_default_artifact_cache_folder() if artifact_cache_var.get() else None)
 
         lava_finalize_output(out_params.output_folder_base)
 
@@ -488,6 +492,8 @@ casedata = {'Case Number': tk.StringVar(),
             }
 timezone_set = tk.StringVar()
 modules_filter_var = tk.StringVar()
+index_cache_var = tk.BooleanVar(value=False)
+artifact_cache_var = tk.BooleanVar(value=False)
 modules_filter_var.trace_add("write", filter_modules)  # Trigger filtering on input change
 pickModules()
 
@@ -574,6 +580,16 @@ output_entry = ttk.Entry(output_frame)
 output_entry.grid(row=0, column=0, padx=5, pady=4, sticky='we')
 output_folder_button = ttk.Button(output_frame, text='Browse Folder', command=select_output)
 output_folder_button.grid(row=0, column=1, padx=5, pady=4)
+index_cache_checkbox = tk.Checkbutton(
+    output_frame, text='Reuse the files listing index of previous runs (directory extractions)',
+    variable=index_cache_var, bg=theme_bgcolor, fg=theme_fgcolor, selectcolor=theme_inputcolor,
+    activebackground=theme_bgcolor, activeforeground=theme_fgcolor, highlightthickness=0)
+index_cache_checkbox.grid(row=1, column=0, columnspan=2, padx=5, pady=(0, 4), sticky='w')
+artifact_cache_checkbox = tk.Checkbutton(
+    output_frame, text='Reuse the results of the artifacts whose files did not change since previous runs',
+    variable=artifact_cache_var, bg=theme_bgcolor, fg=theme_fgcolor, selectcolor=theme_inputcolor,
+    activebackground=theme_bgcolor, activeforeground=theme_fgcolor, highlightthickness=0)
+artifact_cache_checkbox.grid(row=2, column=0, columnspan=2, padx=5, pady=(0, 4), sticky='w')
 
 mlist_frame = ttk.LabelFrame(main_window, text=' Available Modules: ', name='f_list')
 mlist_frame.grid(padx=14, pady=5, sticky='we')
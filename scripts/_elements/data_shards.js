@@ -0,0 +1,164 @@
+// Tables whose rows are written to data shards next to the page. Each shard is a script
+// registering its rows, loaded on demand: the rows of the displayed page only need their
+// shards, searching and ordering load all the shards. DataTables only renders the rows
+// displayed.
+var leappDataShards = window.leappDataShards || (function() {
+  var tables = {};
+  var entities = {"&amp;": "&", "&lt;": "<", "&gt;": ">", "&quot;": '"', "&#x27;": "'", "&#39;": "'"};
+
+  function register(tableId, index, rows) {
+    var table = tables[tableId];
+    if (!table) {
+      return;
+    }
+    table.shards[index] = rows;
+    var callbacks = table.pending[index] || [];
+    delete table.pending[index];
+    callbacks.forEach(function(callback) { callback(); });
+  }
+
+  function loadShard(table, index, callback) {
+    if (table.shards[index]) {
+      callback();
+      return;
+    }
+    if (table.pending[index]) {
+      table.pending[index].push(callback);
+      return;
+    }
+    table.pending[index] = [callback];
+    var script = document.createElement("script");
+    script.src = table.folder + "/" + encodeURIComponent(table.id) + "_" + index + ".js";
+    script.onerror = function() {
+      console.error("Data shard " + script.src + " could not be loaded");
+      register(table.id, index, []);
+    };
+    document.body.appendChild(script);
+  }
+
+  function loadShards(table, first, last, callback) {
+    var remaining = last - first + 1;
+    for (var index = first; index <= last; index++) {
+      loadShard(table, index, function() {
+        remaining--;
+        if (!remaining) {
+          callback();
+        }
+      });
+    }
+  }
+
+  function getRow(table, rowIndex) {
+    return table.shards[Math.floor(rowIndex / table.shardSize)][rowIndex % table.shardSize] || [];
+  }
+
+  function getCellText(cell) {
+    return cell.replace(/<[^>]*>/g, "").replace(/&(amp|lt|gt|quot|#x27|#39);/g, function(entity) {
+      return entities[entity];
+    }).toLowerCase();
+  }
+
+  function getRowTexts(table, rowIndex) {
+    if (!table.texts[rowIndex]) {
+      table.texts[rowIndex] = getRow(table, rowIndex).map(getCellText);
+    }
+    return table.texts[rowIndex];
+  }
+
+  function compareTexts(a, b) {
+    if (a !== "" && b !== "" && !isNaN(a) && !isNaN(b)) {
+      return a - b;
+    }
+    return a < b ? -1 : a > b ? 1 : 0;
+  }
+
+  // Returns the indexes of the rows matching the search, in the requested order
+  function getView(table, search, order) {
+    var view = [];
+    for (var rowIndex = 0; rowIndex < table.rowCount; rowIndex++) {
+      if (!search || getRowTexts(table, rowIndex).some(function(text) { return text.indexOf(search) !== -1; })) {
+        view.push(rowIndex);
+      }
+    }
+    if (order.length) {
+      view.sort(function(a, b) {
+        var textsA = getRowTexts(table, a), textsB = getRowTexts(table, b);
+        for (var i = 0; i < order.length; i++) {
+          var result = compareTexts(textsA[order[i].column] || "", textsB[order[i].column] || "");
+          if (result) {
+            return order[i].dir === "desc" ? -result : result;
+          }
+        }
+        return a - b;
+      });
+    }
+    return view;
+  }
+
+  function getPage(table, request, callback) {
+    var search = request.search.value.toLowerCase();
+    var order = request.order || [];
+    var start = request.start;
+    var end = request.length < 0 ? table.rowCount : Math.min(start + request.length, table.rowCount);
+    var respond = function(rowCount, rowIndexes) {
+      callback({
+        draw: request.draw,
+        recordsTotal: table.rowCount,
+        recordsFiltered: rowCount,
+        data: rowIndexes.map(function(rowIndex) { return getRow(table, rowIndex); })
+      });
+    };
+    if (!search && !order.length) {
+      var first = Math.floor(start / table.shardSize);
+      var last = Math.floor(Math.max(end - 1, start) / table.shardSize);
+      loadShards(table, first, Math.min(last, table.shardCount - 1), function() {
+        var rowIndexes = [];
+        for (var rowIndex = start; rowIndex < end; rowIndex++) {
+          rowIndexes.push(rowIndex);
+        }
+        respond(table.rowCount, rowIndexes);
+      });
+      return;
+    }
+    loadShards(table, 0, table.shardCount - 1, function() {
+      var viewKey = JSON.stringify([search, order]);
+      if (table.viewKey !== viewKey) {
+        table.view = getView(table, search, order);
+        table.viewKey = viewKey;
+      }
+      var viewEnd = request.length < 0 ? table.view.length : start + request.length;
+      respond(table.view.length, table.view.slice(start, viewEnd));
+    });
+  }
+
+  function initTable(tableId, folder, rowCount, shardSize) {
+    var table = tables[tableId] = {
+      id: tableId,
+      folder: folder,
+      rowCount: rowCount,
+      shardSize: shardSize,
+      shardCount: Math.ceil(rowCount / shardSize),
+      shards: [],
+      pending: {},
+      texts: [],
+      view: null,
+      viewKey: null
+    };
+    $("#" + tableId).DataTable({
+      "serverSide": true,
+      "processing": true,
+      "deferRender": true,
+      "searchDelay": 500,
+      // The rows are displayed in the order of the artifact until ordered by a column
+      "order": [],
+      "aLengthMenu": [[ 15, 50, 100, 500 ], [ 15, 50, 100, 500 ]],
+      "ajax": function(request, callback) {
+        getPage(table, request, callback);
+      }
+    });
+    $(".dataTables_length").addClass("bs-select");
+    $("#mySpinner").remove();
+  }
+
+  return {register: register, initTable: initTable};
+})();
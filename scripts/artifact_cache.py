@@ -0,0 +1,233 @@
+"""
+This module provides a cache of the results of the artifacts, so that the artifacts
+whose source files have not changed are not parsed again when an extraction is
+processed again (new profile, new version of a module...).
+
+The results of an artifact processed with the artifact_processor decorator are its
+(data_headers, data_list, source_path) tuple. They are stored in a JSON file of the
+cache folder, named after a key computed from the name of the artifact, the hash of
+its module file, the iLEAPP version, the iOS versions, the timezone and the name and
+hash of the content of each file found for the artifact. When the key of an artifact
+matches a stored result, the result is returned instead of calling the artifact, and
+the HTML, TSV, timeline, KML and LAVA outputs are generated from it as usual.
+
+The source files of a cached result were in the data folder of a previous report: the
+paths of the previous files found are replaced by the current ones in the returned
+source path and in the text values of the data list.
+
+Loading a result never executes code: the tuples, dicts, datetimes, dates and bytes of
+the results are tagged in the JSON file and rebuilt when it is loaded. The results with
+values of other types are not stored.
+
+Only the results of the artifacts without other effects than their return value are
+stored: artifacts with media, searching files themselves with the seeker, storing device
+information, setting the iOS version or writing other files are always executed.
+
+Global Variables:
+    artifact_cache_version (int): Version of the cache format, part of the keys.
+
+Functions:
+    get_default_artifact_cache_folder: Returns the default folder of the cached results.
+    get_artifact_cache_key: Computes the key of the results of an artifact.
+    load_artifact_result: Returns the results stored for a key.
+    save_artifact_result: Stores the results of an artifact.
+"""
+
+import base64
+import hashlib
+import json
+import os
+
+from datetime import date, datetime, timezone
+from functools import lru_cache
+
+from scripts.files_index import get_default_index_cache_folder
+from scripts.version_info import ileapp_version
+
+artifact_cache_version = 3
+
+
+def get_default_artifact_cache_folder():
+    """
+    Returns the default folder of the cached results, next to the index files in the
+    cache folder of the user.
+    Returns:
+        str: The path of the folder.
+    """
+    return os.path.join(os.path.dirname(get_default_index_cache_folder()), 'artifact_results')
+
+
+def _hash_file(path, digest):
+    with open(path, 'rb') as file:
+        while True:
+            chunk = file.read(1048576)
+            if not chunk:
+                break
+            digest.update(chunk)
+
+
+@lru_cache(maxsize=None)
+def _hash_module_file(module_file_path):
+    digest = hashlib.sha256()
+    _hash_file(module_file_path, digest)
+    return digest.hexdigest()
+
+
+def _hash_source(path, digest):
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                digest.update(f'{os.path.relpath(file_path, path)}\0'.encode('utf-8', 'surrogateescape'))
+                _hash_file(file_path, digest)
+    else:
+        _hash_file(path, digest)
+
+
+def get_artifact_cache_key(artifact_name, module_file_path, files_found, timezone_offset, os_versions):
+    """
+    Computes the key of the results of an artifact. The files found are identified by
+    their name and content, not by their location, which changes with each report.
+    Args:
+        artifact_name (str): The name of the artifact function.
+        module_file_path (str): The path of the module of the artifact.
+        files_found (list): The paths of the files found for the artifact.
+        timezone_offset (str): The timezone of the run.
+        os_versions (tuple): The iOS version and the installed iOS version.
+    Returns:
+        str or None: The hexadecimal key, or None if a file found can't be read.
+    """
+    digest = hashlib.sha256(f'{artifact_cache_version}\0{ileapp_version}\0{artifact_name}\0'
+                            f'{_hash_module_file(module_file_path)}\0{timezone_offset}\0{os_versions}\0'
+                            .encode('utf-8', 'surrogateescape'))
+    try:
+        for path in files_found:
+            path = str(path)
+            digest.update(f'{os.path.basename(path)}\0'.encode('utf-8', 'surrogateescape'))
+            _hash_source(path, digest)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def _get_result_path(cache_folder, key):
+    return os.path.join(cache_folder, key[:2], key + '.json')
+
+
+def _encode_value(value):
+    """Returns a value of the results as JSON data, its tuples, dicts, datetimes, dates and
+    bytes being tagged"""
+    value_type = type(value)
+    if value is None or value_type in (bool, int, float, str):
+        return value
+    if value_type is list:
+        return [_encode_value(item) for item in value]
+    if value_type is tuple:
+        return {'tuple': [_encode_value(item) for item in value]}
+    if value_type is dict:
+        return {'dict': [[_encode_value(key), _encode_value(item)] for key, item in value.items()]}
+    if value_type is datetime and (value.tzinfo is None or type(value.tzinfo) is timezone):
+        return {'datetime': value.isoformat()}
+    if value_type is date:
+        return {'date': value.isoformat()}
+    if value_type is bytes:
+        return {'bytes': base64.b64encode(value).decode('ascii')}
+    raise TypeError(f'{value_type.__name__} value in the results')
+
+
+def _decode_value(value):
+    """Rebuilds a value of the results encoded by _encode_value"""
+    if isinstance(value, list):
+        return [_decode_value(item) for item in value]
+    if isinstance(value, dict):
+        if 'tuple' in value:
+            return tuple(_decode_value(item) for item in value['tuple'])
+        if 'datetime' in value:
+            return datetime.fromisoformat(value['datetime'])
+        if 'date' in value:
+            return date.fromisoformat(value['date'])
+        if 'bytes' in value:
+            return base64.b64decode(value['bytes'])
+        return {_decode_value(key): _decode_value(item) for key, item in value['dict']}
+    return value
+
+
+def _get_path_prefixes(old_paths, new_paths):
+    """Returns the parts of the previous and current paths of the files found that differ,
+    if they are the same for all the files"""
+    prefixes = set()
+    for old_path, new_path in zip(old_paths, new_paths):
+        suffix_length = len(os.path.commonprefix([old_path[::-1], new_path[::-1]]))
+        prefixes.add((old_path[:len(old_path) - suffix_length], new_path[:len(new_path) - suffix_length]))
+    if len(prefixes) == 1:
+        old_prefix, new_prefix = prefixes.pop()
+        if old_prefix and old_prefix != new_prefix:
+            return old_prefix, new_prefix
+    return None
+
+
+def _replace_paths(value, old_prefix, new_prefix):
+    if isinstance(value, str):
+        return value.replace(old_prefix, new_prefix) if old_prefix in value else value
+    if isinstance(value, (list, tuple)):
+        replaced = [_replace_paths(item, old_prefix, new_prefix) for item in value]
+        return type(value)(replaced) if isinstance(value, tuple) else replaced
+    return value
+
+
+def load_artifact_result(cache_folder, key, files_found):
+    """
+    Returns the results stored for a key, with the paths of the files found when they
+    were stored replaced by the current ones.
+    Args:
+        cache_folder (str): The folder of the cached results.
+        key (str): The key of the results.
+        files_found (list): The current paths of the files found for the artifact.
+    Returns:
+        tuple or None: The (data_headers, data_list, source_path) of the artifact, or None if
+            no result is stored for the key.
+    """
+    result_path = _get_result_path(cache_folder, key)
+    if not os.path.isfile(result_path):
+        return None
+    try:
+        with open(result_path, 'r', encoding='utf-8') as result_file:
+            cached = json.load(result_file)
+        if cached.get('version') != artifact_cache_version:
+            return None
+        data_headers, data_list, source_path = _decode_value(cached['result'])
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return None
+    prefixes = _get_path_prefixes(cached['files_found'], [str(path) for path in files_found])
+    if prefixes:
+        source_path = _replace_paths(source_path, *prefixes)
+        data_list = _replace_paths(data_list, *prefixes)
+    return data_headers, data_list, source_path
+
+
+def save_artifact_result(cache_folder, key, files_found, result):
+    """
+    Stores the results of an artifact, replacing any previous results for the key.
+    Args:
+        cache_folder (str): The folder of the cached results.
+        key (str): The key of the results.
+        files_found (list): The paths of the files found for the artifact.
+        result (tuple): The (data_headers, data_list, source_path) of the artifact.
+    Returns:
+        bool: True if the results were stored, False if they have values that can't be
+            encoded.
+    """
+    try:
+        encoded_result = _encode_value(tuple(result))
+    except (TypeError, RecursionError):
+        return False
+    result_path = _get_result_path(cache_folder, key)
+    os.makedirs(os.path.dirname(result_path), exist_ok=True)
+    temp_path = f'{result_path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as result_file:
+        json.dump({'version': artifact_cache_version,
+                   'files_found': [str(path) for path in files_found],
+                   'result': encoded_result}, result_file)
+    os.replace(temp_path, result_path)
+    return True
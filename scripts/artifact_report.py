@@ -1,31 +1,61 @@
 import html
+import json
 import os
 import sys
+import tempfile
 from scripts.html_parts import *
 #from scripts.ilapfuncs import is_platform_windows
 from scripts.version_info import ileapp_version
+from scripts.run_journal import journal_output
+
+# Number of rows above which artifact_processor writes the rows of a table to data shards
+html_table_shard_threshold = 10000
+# Number of rows of a data shard
+html_table_shard_size = 10000
+# Number of rows rendered before being written at once to the page
+html_rows_buffer_size = 1000
+# Joins the cells of a row so they are escaped at once. The rows with a cell containing it are
+# escaped cell by cell
+_cell_separator = '\x00'
+_json_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def _escape_html(text):
+    '''Same as html.escape, without the function calls'''
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;') \
+        .replace('"', '&quot;').replace("'", '&#x27;')
+
 
 class ArtifactHtmlReport:
 
     def __init__(self, artifact_name, artifact_category=''):
         self.report_file = None
         self.report_file_path = ''
+        self.data_folder_name = ''
         self.script_code = ''
+        self.spooled_rows = None
+        self.spooled_rows_count = 0
         self.artifact_name = artifact_name
         self.artifact_category = artifact_category # unused
 
     def __del__(self):
         if self.report_file:
             self.end_artifact_report()
+        if self.spooled_rows:
+            self.spooled_rows.close()
 
     def start_artifact_report(self, report_folder, artifact_file_name, artifact_description=''):
         '''Creates the report HTML file and writes the artifact name as a heading'''
         # artifact_file_name =  artifact_file_name.replace(" ", "_") # Replace " " with "_" in HTML filenames
-        self.report_file = open(os.path.join(report_folder, f'{artifact_file_name}.temphtml'), 'w', encoding='utf8')
+        self.report_file_path = os.path.join(report_folder, f'{artifact_file_name}.temphtml')
+        # Named after the final page, generate_report moves it next to the page
+        self.data_folder_name = f'{artifact_file_name.replace(" ", "_")}_data'
+        journal_output('html', self.report_file_path)
+        self.report_file = open(self.report_file_path, 'w', encoding='utf8')
         self.report_file.write(page_header.format(f'iLEAPP - {self.artifact_name} report'))
         self.report_file.write(body_start.format(f'iLEAPP {ileapp_version}'))
         self.report_file.write(body_sidebar_setup)
-        self.report_file.write(body_sidebar_dynamic_data_placeholder) # placeholder for sidebar data
+        self.report_file.write(body_sidebar_dynamic_data_include + nav_bar_script) # sidebar data
         self.report_file.write(body_sidebar_trailer)
         self.report_file.write(body_main_header)
         self.report_file.write(body_main_data_title.format(f'{self.artifact_name} report', artifact_description))
@@ -39,6 +69,95 @@ class ArtifactHtmlReport:
         else:
             self.script_code += default_responsive_table_script + nav_bar_script_footer
 
+    def write_artifact_data_rows(self, data_headers, data_list, html_escape=True, html_no_escape=[]):
+        ''' Writes rows of the data table to a temporary file, so the rows of an artifact can be
+            written by chunks as they are produced. The table is then written with
+            write_artifact_data_table, with None as data_list.
+            Parameters are the same as write_artifact_data_table
+        '''
+        if not self.spooled_rows:
+            self.spooled_rows = tempfile.TemporaryFile('w+', encoding='utf8')
+            self.spooled_rows_count = 0
+        # One JSON array of cells per line, ready to be copied to a data shard
+        self.spooled_rows.write(''.join([self._get_json_cells(cells) + '\n' for cells in self._get_row_cells(
+            data_headers, data_list, html_escape, html_no_escape)]))
+        self.spooled_rows_count += len(data_list)
+
+    @staticmethod
+    def _get_row_cells(data_headers, data_list, html_escape, html_no_escape):
+        '''Yields the list of the HTML contents of the cells of each row. The columns escaped are
+           decided once, and the cells of a row are escaped at once'''
+        raw_columns = []
+        column_count = None
+        if html_escape and html_no_escape:
+            html_no_escape = set(html_no_escape)
+            raw_columns = [index for index, header in enumerate(data_headers) if header in html_no_escape]
+            # Only the cells with a header are written when some columns are not escaped
+            column_count = len(data_headers)
+        for row in data_list:
+            texts = ['' if x is None or x == 'N/A' else str(x) for x in row]
+            if column_count is not None:
+                del texts[column_count:]
+            if not html_escape:
+                yield texts
+                continue
+            cells = _escape_html(_cell_separator.join(texts)).split(_cell_separator)
+            if len(cells) != len(texts):
+                cells = [_escape_html(text) for text in texts]
+            for index in raw_columns:
+                if index < len(texts):
+                    cells[index] = texts[index]
+            yield cells
+
+    @staticmethod
+    def _get_json_cells(cells):
+        # U+2028 and U+2029 are valid in JSON strings but end the line in older JavaScript engines
+        return _json_encoder.encode(cells).replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+
+    @staticmethod
+    def _write_rows(output_file, rows_cells):
+        '''Writes the rows to the page by buffers of html_rows_buffer_size rows'''
+        buffer = []
+        for cells in rows_cells:
+            buffer.append('<tr><td>' + '</td><td>'.join(cells) + '</td></tr>' if cells else '<tr></tr>')
+            if len(buffer) == html_rows_buffer_size:
+                output_file.write(''.join(buffer))
+                buffer.clear()
+        if buffer:
+            output_file.write(''.join(buffer))
+
+    def _write_data_shards(self, table_id, json_rows):
+        '''Writes the rows, as JSON arrays of cells, to the data shards of a table. A shard is a
+           script registering its rows, which the page loads on demand as fetching files is not
+           allowed in pages opened from the file system'''
+        data_folder = os.path.join(os.path.dirname(self.report_file_path), self.data_folder_name)
+        os.makedirs(data_folder, exist_ok=True)
+        shard_file = None
+        shard_index = 0
+        shard_rows = 0
+        try:
+            for json_row in json_rows:
+                if not shard_file:
+                    shard_path = os.path.join(data_folder, f'{table_id}_{shard_index}.js')
+                    journal_output('html', shard_path)
+                    shard_file = open(shard_path, 'w', encoding='utf8')
+                    shard_file.write(f'leappDataShards.register({json.dumps(table_id)},{shard_index},[')
+                elif shard_rows:
+                    shard_file.write(',')
+                shard_file.write(json_row)
+                shard_rows += 1
+                if shard_rows == html_table_shard_size:
+                    shard_file.write(']);\n')
+                    shard_file.close()
+                    shard_file = None
+                    shard_index += 1
+                    shard_rows = 0
+            if shard_file:
+                shard_file.write(']);\n')
+        finally:
+            if shard_file:
+                shard_file.close()
+
     def write_artifact_data_table(
         self,
         data_headers,
@@ -51,14 +170,16 @@ class ArtifactHtmlReport:
         table_responsive=True,
         table_style='',
         table_id='dtBasicExample',
-        html_no_escape=[]
+        html_no_escape=[],
+        shard_threshold=None
     ):
         ''' Writes info about data, then writes the table to html file
             Parameters
             ----------
             data_headers   : List/Tuple of table column names
 
-            data_list      : List/Tuple of lists/tuples which contain rows of data
+            data_list      : List/Tuple of lists/tuples which contain rows of data, or None for
+                             the rows written with write_artifact_data_rows
 
             source_path    : Source path of data
 
@@ -77,11 +198,16 @@ class ArtifactHtmlReport:
             table_id       : Specify an identifier string, which will be referenced in javascript
 
             html_no_escape  : if html_escape=True, list of columns not to escape
+
+            shard_threshold : Number of rows above which the rows are written to data shards next
+                              to the page instead of the page itself. The page then loads the
+                              shards on demand and only renders the rows displayed. None (default)
+                              to always write the rows in the page, as required by custom scripts
         '''
         if (not self.report_file):
             raise ValueError('Output report file is closed/unavailable!')
 
-        num_entries = len(data_list)
+        num_entries = len(data_list) if data_list is not None else self.spooled_rows_count
         if write_total:
             self.write_minor_header(f'Total number of entries: {num_entries}', 'h6')
         if write_location:
@@ -96,26 +222,32 @@ class ArtifactHtmlReport:
         if table_responsive:
             self.report_file.write("<div class='table-responsive'>")
 
-        table_head = '<table id="{}" class="table table-striped table-bordered table-xsm" cellspacing="0" {}>' \
-                     '<thead>'.format(table_id, (f'style="{table_style}"') if table_style else '')
+        use_shards = shard_threshold is not None and num_entries > shard_threshold
+        table_head = '<table id="{}" class="table table-striped table-bordered table-xsm{}" cellspacing="0" {}>' \
+                     '<thead>'.format(table_id, ' table-data-shards' if use_shards else '',
+                                      (f'style="{table_style}"') if table_style else '')
         self.report_file.write(table_head)
         self.report_file.write(
             '<tr>' + ''.join(('<th class="th-sm">{}</th>'.format(html.escape(str(x))) for x in data_headers)) + '</tr>')
         self.report_file.write('</thead><tbody>')
 
-        if html_escape:
-            for row in data_list:
-                if html_no_escape:
-                    self.report_file.write('<tr>' + ''.join(('<td>{}</td>'.format(html.escape(
-                        str(x) if x not in [None, 'N/A'] else '')) if h not in html_no_escape else '<td>{}</td>'.format(
-                        str(x) if x not in [None, 'N/A'] else '') for x, h in zip(row, data_headers))) + '</tr>')
-                else:
-                    self.report_file.write('<tr>' + ''.join(
-                        ('<td>{}</td>'.format(html.escape(str(x) if x not in [None, 'N/A'] else '')) for x in
-                         row)) + '</tr>')
-        else:
-            for row in data_list:
-                self.report_file.write('<tr>' + ''.join( ('<td>{}</td>'.format(str(x) if x not in [None, 'N/A'] else '') for x in row) ) + '</tr>')
+        if data_list is not None:
+            rows_cells = self._get_row_cells(data_headers, data_list, html_escape, html_no_escape)
+            if use_shards:
+                self._write_data_shards(table_id, (self._get_json_cells(cells) for cells in rows_cells))
+            else:
+                self._write_rows(self.report_file, rows_cells)
+        elif self.spooled_rows:
+            self.spooled_rows.seek(0)
+            if use_shards:
+                self._write_data_shards(table_id, (line.rstrip('\n') for line in self.spooled_rows))
+            else:
+                self._write_rows(self.report_file, (json.loads(line) for line in self.spooled_rows))
+            self.spooled_rows.close()
+            self.spooled_rows = None
+        if use_shards:
+            self.script_code += data_shards_table_script.format(
+                json.dumps(table_id), json.dumps(self.data_folder_name), num_entries, html_table_shard_size)
         
         self.report_file.write('</tbody>')
         if cols_repeated_at_bottom:
@@ -175,32 +175,44 @@ def convert_to_utc(timestamp):
     return datetime.fromisoformat(timestamp).astimezone(timezone.utc)
 
 
-def truncate_after_last_bracket(file_path):
-    with open(file_path, 'rb+') as f:
-        # Start from the end of the file and scan backwards
-        f.seek(0, 2)  # Move to end of file
-        file_size = f.tell()
+def get_last_bracket_offset(file_path, block_size=65536):
+    # Scans the file backwards for its last closing bracket, the data after it is ignored.
+    # The file is the evidence itself when it is hardlinked or read in place: never write to it
+    with open(file_path, 'rb') as f:
+        end = f.seek(0, 2)
+        while end > 0:
+            start = max(0, end - block_size)
+            f.seek(start)
+            index = f.read(end - start).rfind(b']')
+            if index != -1:
+                return start + index + 1
+            end = start
+    print("No closing bracket `]` found.")
+    return None
 
-        for i in range(file_size - 1, -1, -1):
-            f.seek(i)
-            char = f.read(1)
-            if char == b']':
-                # Truncate the file just after this bracket
-                f.truncate(i + 1)
-                logfunc(f"Truncated file after position {i+1}")
-                return
-        print("No closing bracket `]` found.")
+
+class BoundedReader:
+    # Reads a binary file up to a given offset
+    def __init__(self, f, end):
+        self.f = f
+        self.end = end
+
+    def read(self, size=-1):
+        remaining = self.end - self.f.tell()
+        if remaining <= 0:
+            return b''
+        return self.f.read(remaining if size is None or size < 0 else min(size, remaining))
 
 @artifact_processor
 def logarchive(files_found, report_folder, seeker, wrap_text, timezone_offset):
     source_path = get_file_path(files_found, 'logarchive*.json')
-    data_list = []
 
-    incval = 0
-    if source_path:
-        truncate_after_last_bracket(source_path)
+    # The records are streamed: the logarchive can be too large to be kept in memory
+    def get_records():
+        incval = 0
         with open(source_path, 'rb') as f:
-            for record in ijson.items(f, 'item', multiple_values=True ): # if the json is a list
+            json_file = f if end_offset is None else BoundedReader(f, end_offset)
+            for record in ijson.items(json_file, 'item', multiple_values=True ): # if the json is a list
                 if isinstance(record, dict):
                     incval = incval + 1
                     timestamp = record.get('timestamp', '')
@@ -212,8 +224,14 @@ def logarchive(files_found, report_folder, seeker, wrap_text, timezone_offset):
                     eventmessage = str(record.get('eventMessage', ''))
                     traceid = str(record.get('traceID', ''))
                     
-                    t0 = ( timestamp, incval,  process_image_path,  processid,  subsystem,  category,  eventmessage,  traceid)
-                    data_list.append(t0)
+                    yield ( timestamp, incval,  process_image_path,  processid,  subsystem,  category,  eventmessage,  traceid)
+
+    data_list = []
+    if source_path:
+        end_offset = get_last_bracket_offset(source_path)
+        if end_offset is not None:
+            logfunc(f"Reading file up to position {end_offset}")
+        data_list = get_records()
 
     data_headers = (('Timestamp', 'datetime'), 'Row Number', 'Process Image Path', 'Process ID',
                     'Subsystem', 'Category', 'Event Message', 'Trace ID')
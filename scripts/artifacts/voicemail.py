@@ -20,7 +20,7 @@ __artifacts_v2__ = {
 from pathlib import Path
 from scripts.ilapfuncs import artifact_processor, \
     get_file_path, does_table_exist_in_db, get_sqlite_db_records, \
-    get_plist_file_content, check_in_media, convert_unix_ts_to_utc, \
+    get_plist_file_content, check_in_media, check_in_media_list, convert_unix_ts_to_utc, \
     convert_cocoa_core_data_ts_to_utc
 
 
@@ -93,13 +93,13 @@ def voicemail(context):
 
     if db_file:
         source_file = db_file
+        audio_filenames = [f'{record[-1]}.amr' for record in db_records]
+        media_items = check_in_media_list(audio_filenames, audio_filenames)
 
-        for record in db_records:
+        for record, media_item in zip(db_records, media_items):
             timestamp = convert_unix_ts_to_utc(record[0])
             deleted = convert_cocoa_core_data_ts_to_utc(record[-2]) \
                 if isinstance(record[-2], int) else record[-2]
-            audio_filename = f'{record[-1]}.amr'
-            media_item = check_in_media(audio_filename, audio_filename)
             transcript_file_path = get_file_path(
                 extracted_transcript_files, f'{record[-1]}.transcript')
             transcript = get_plist_file_content(
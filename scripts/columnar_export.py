@@ -0,0 +1,222 @@
+"""
+This module provides the columnar exports of a report, enabled with --export. The rows of
+each artifact with tabular outputs are written to a typed, compressed Parquet file in the
+_Parquet Exports folder, or Arrow IPC file in the _Arrow Exports folder, named after the
+artifact, to be loaded by pandas, DuckDB or Polars without parsing the TSV exports.
+
+The rows are written by record batches of columnar_batch_size rows, so the batches of a
+streamed artifact are written as they are produced. The columns typed as datetime in the
+headers of the artifact are timestamps in microseconds in UTC, naive dates being considered
+in UTC, and the columns typed as date are dates. The type of the other columns is found
+from the values of the first batch: booleans, integers, floats and bytes are kept as such,
+the other columns are strings, dicts and lists being encoded in JSON as in the LAVA
+database. The values that can't be converted to the type of their column, like a text in
+a datetime column, are exported as null and counted in the log.
+
+The export needs the optional pyarrow package.
+
+Global Variables:
+    columnar_export_formats (tuple): The formats of the --export option.
+    columnar_batch_size (int): Maximum number of rows of a record batch.
+    columnar_compression (str): The compression codec of the exported files.
+
+Classes:
+    ColumnarExport: Writes the rows of an artifact to its columnar export file.
+
+Functions:
+    is_columnar_export_available: Returns True if pyarrow is installed.
+    get_columnar_export_path: Returns the path of the columnar export file of an artifact.
+"""
+
+import json
+import os
+
+from datetime import date, datetime
+
+from scripts.run_journal import journal_output
+from scripts.timeline_db import get_timestamp_us
+
+try:
+    # Optional, only needed by --export
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+columnar_export_formats = ('parquet', 'arrow')
+columnar_batch_size = 10000
+columnar_compression = 'zstd'
+
+_export_folder_names = {'parquet': '_Parquet Exports', 'arrow': '_Arrow Exports'}
+_int64_range = range(-2 ** 63, 2 ** 63)
+
+
+def is_columnar_export_available():
+    """Returns True if the pyarrow package needed by the columnar exports is installed."""
+    return pyarrow is not None
+
+
+def get_columnar_export_path(report_folder_base, artifact_name, export_format):
+    """
+    Returns the path of the columnar export file of an artifact.
+    Args:
+        report_folder_base (str): The path of the report folder.
+        artifact_name (str): The name of the artifact.
+        export_format (str): One of columnar_export_formats.
+    Returns:
+        str: The path of the file.
+    """
+    return os.path.join(report_folder_base, _export_folder_names[export_format], f'{artifact_name}.{export_format}')
+
+
+def _get_column_names(headers):
+    """Returns the names of the columns, the duplicated names being numbered"""
+    names = []
+    for header in headers:
+        name = str(header)
+        suffix = 2
+        while name in names:
+            name = f'{header} ({suffix})'
+            suffix += 1
+        names.append(name)
+    return names
+
+
+def _get_value_type(values):
+    """Returns the Arrow type of the values of a column without type in the headers"""
+    value_types = {type(value) for value in values if value is not None}
+    if not value_types:
+        return pyarrow.string()
+    if value_types == {bool}:
+        return pyarrow.bool_()
+    if value_types == {int}:
+        if all(value in _int64_range for value in values if value is not None):
+            return pyarrow.int64()
+        return pyarrow.string()
+    if value_types <= {int, float}:
+        return pyarrow.float64()
+    if value_types <= {bytes, bytearray}:
+        return pyarrow.binary()
+    return pyarrow.string()
+
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        try:
+            return date.fromisoformat(value.strip()[:10])
+        except ValueError:
+            return None
+    return None
+
+
+def _to_string(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+class ColumnarExport:
+    """
+    Writes the rows of an artifact to its columnar export file, by record batches. The file
+    is created with the first rows.
+    Args:
+        report_folder_base (str): The path of the report folder.
+        artifact_name (str): The name of the artifact.
+        category (str): The category of the artifact.
+        data_headers (list): The headers of the artifact, with their type hints.
+        export_format (str): One of columnar_export_formats.
+    """
+
+    def __init__(self, report_folder_base, artifact_name, category, data_headers, export_format):
+        self.artifact_name = artifact_name
+        self.category = category
+        self.export_format = export_format
+        self.path = get_columnar_export_path(report_folder_base, artifact_name, export_format)
+        self.column_names = _get_column_names(
+            [header[0] if isinstance(header, tuple) else header for header in data_headers])
+        self.type_hints = [header[1] if isinstance(header, tuple) and len(header) > 1 else None
+                           for header in data_headers]
+        self.schema = None
+        self.writer = None
+        self.null_count = 0
+
+    def __del__(self):
+        self.close()
+
+    def _get_schema(self, columns):
+        fields = []
+        for name, type_hint, values in zip(self.column_names, self.type_hints, columns):
+            if type_hint == 'datetime':
+                fields.append(pyarrow.field(name, pyarrow.timestamp('us', tz='UTC')))
+            elif type_hint == 'date':
+                fields.append(pyarrow.field(name, pyarrow.date32()))
+            else:
+                fields.append(pyarrow.field(name, _get_value_type(values)))
+        return pyarrow.schema(fields, metadata={'artifact': str(self.artifact_name), 'category': str(self.category)})
+
+    def _get_array(self, values, field_type):
+        if pyarrow.types.is_timestamp(field_type):
+            converted = [get_timestamp_us(value) for value in values]
+        elif pyarrow.types.is_date(field_type):
+            converted = [_to_date(value) for value in values]
+        elif pyarrow.types.is_string(field_type):
+            return pyarrow.array([None if value is None else _to_string(value) for value in values], field_type)
+        else:
+            try:
+                return pyarrow.array(values, field_type)
+            except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError, TypeError, OverflowError):
+                # Values of another type than the ones of the first batch
+                converted = []
+                for value in values:
+                    try:
+                        converted.append(pyarrow.scalar(value, field_type).as_py())
+                    except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError, TypeError, OverflowError):
+                        converted.append(None)
+        # The empty values are not counted
+        self.null_count += sum(1 for value, converted_value in zip(values, converted) if converted_value is None
+                               and value is not None and not (isinstance(value, str) and value in ('', 'N/A')))
+        return pyarrow.array(converted, field_type)
+
+    def _open_writer(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        journal_output('export', self.path)
+        if self.export_format == 'parquet':
+            self.writer = pyarrow.parquet.ParquetWriter(self.path, self.schema, compression=columnar_compression)
+        else:
+            self.writer = pyarrow.ipc.new_file(self.path, self.schema, options=pyarrow.ipc.IpcWriteOptions(
+                compression=columnar_compression))
+
+    def add_rows(self, data_list):
+        """
+        Writes rows of the artifact, by record batches of columnar_batch_size rows.
+        Args:
+            data_list (list): Rows of the artifact.
+        """
+        column_count = len(self.column_names)
+        for start in range(0, len(data_list), columnar_batch_size):
+            rows = data_list[start:start + columnar_batch_size]
+            # The missing values of the short rows are null
+            columns = [list(column) for column in zip(*[tuple(row) + (None,) * (column_count - len(row))
+                                                        for row in rows])][:column_count]
+            if self.schema is None:
+                self.schema = self._get_schema(columns)
+                self._open_writer()
+            arrays = [self._get_array(values, field.type) for values, field in zip(columns, self.schema)]
+            self.writer.write_batch(pyarrow.record_batch(arrays, schema=self.schema))
+
+    def close(self):
+        """
+        Completes the export file.
+        Returns:
+            int: The number of values exported as null because they could not be converted
+                to the type of their column.
+        """
+        if self.writer:
+            self.writer.close()
+            self.writer = None
+        return self.null_count
@@ -0,0 +1,305 @@
+"""
+This module provides a persistent index of the files listing of a directory
+extraction, so that the directory tree is only walked once across runs, profiles
+and the GUI.
+
+The index of each extraction root is a SQLite database stored in the index cache
+folder. It contains the path, type, size, modification and change times of each
+entry, a basename/extension table and the fingerprint of the root when the index
+was built. An index is only reused when the fingerprint of the root still matches.
+
+The fingerprint covers the absolute path of the root and the names, sizes and
+modification times of the entries of its first two levels. The deeper changes are found
+from the modification times of the indexed directories, which change when an entry is
+added, removed or renamed in them: they are checked when the listing is loaded, and the
+index is built again if one of them changed.
+
+The members of tar archives are indexed the same way, keyed by a hash of the archive
+(size, modification time and content of its first and last MB), so that a compressed
+archive does not have to be decompressed entirely to list its members.
+
+Global Variables:
+    files_index_version (int): Version of the index schema, part of the fingerprint.
+
+Functions:
+    get_default_index_cache_folder: Returns the default folder of the index files.
+    get_index_path: Returns the path of the index file of an extraction root.
+    get_root_fingerprint: Computes the fingerprint of an extraction root.
+    load_files_listing: Returns the files listing stored in the index of a root.
+    load_directories_mtimes: Returns the modification times of the directories of an index.
+    save_files_listing: Stores the files listing of a root in its index.
+    get_archive_fingerprint: Computes the fingerprint of an archive.
+    get_archive_index_path: Returns the path of an index file of an archive.
+    load_tar_members: Returns the members of a tar archive stored in its index.
+    save_tar_members: Stores the members of a tar archive in its index.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import stat
+import tarfile
+
+files_index_version = 2
+
+
+def get_default_index_cache_folder():
+    """
+    Returns the default folder of the index files, in the cache folder of the user.
+    Returns:
+        str: The path of the folder.
+    """
+    if os.name == 'nt':
+        cache_base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    else:
+        cache_base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_base, 'iLEAPP', 'files_index')
+
+
+def get_index_path(index_cache_folder, directory):
+    """
+    Returns the path of the index file of an extraction root.
+    Args:
+        index_cache_folder (str): The folder of the index files.
+        directory (str): The root of the extraction.
+    Returns:
+        str: The path of the index file.
+    """
+    root_key = os.path.normcase(os.path.abspath(directory))
+    return os.path.join(index_cache_folder, hashlib.sha1(root_key.encode('utf-8')).hexdigest() + '.db')
+
+
+def _fingerprint_entries(directory, depth, digest):
+    try:
+        entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+    except OSError:
+        digest.update(b'\0error')
+        return
+    for entry in entries:
+        try:
+            entry_stat = entry.stat(follow_symlinks=False)
+            digest.update(f'{entry.name}\0{entry_stat.st_size}\0{entry_stat.st_mtime_ns}\0'
+                          .encode('utf-8', 'surrogateescape'))
+            if depth > 1 and entry.is_dir(follow_symlinks=False):
+                _fingerprint_entries(entry.path, depth - 1, digest)
+        except OSError:
+            digest.update(f'{entry.name}\0error\0'.encode('utf-8', 'surrogateescape'))
+
+
+def get_root_fingerprint(directory):
+    """
+    Computes the fingerprint of an extraction root from its absolute path and from the
+    names, sizes and modification times of the entries of its first two levels.
+    Args:
+        directory (str): The root of the extraction.
+    Returns:
+        str: The hexadecimal fingerprint.
+    """
+    digest = hashlib.sha256()
+    digest.update(f'{files_index_version}\0{os.path.abspath(directory)}\0'.encode('utf-8', 'surrogateescape'))
+    _fingerprint_entries(directory, 2, digest)
+    return digest.hexdigest()
+
+
+def load_files_listing(index_path, directory, fingerprint):
+    """
+    Returns the files listing stored in the index of a root.
+    Args:
+        index_path (str): The path of the index file.
+        directory (str): The root of the extraction.
+        fingerprint (str): The current fingerprint of the root.
+    Returns:
+        list or None: The paths of the files and folders, in the order they were listed,
+            or None if there is no valid index for this fingerprint.
+    """
+    if not os.path.isfile(index_path):
+        return None
+    prefix = os.path.join(directory, '')
+    db = None
+    try:
+        db = sqlite3.connect(index_path)
+        info = dict(db.execute('SELECT key, value FROM index_info'))
+        if info.get('fingerprint') != fingerprint:
+            return None
+        return [prefix + rel_path for (rel_path,) in db.execute('SELECT path FROM files ORDER BY id')]
+    except sqlite3.Error:
+        return None
+    finally:
+        if db:
+            db.close()
+
+
+def load_directories_mtimes(index_path, directory):
+    """
+    Returns the modification times of the directories stored in the index of a root, to
+    check that the listing is still up to date.
+    Args:
+        index_path (str): The path of the index file.
+        directory (str): The root of the extraction.
+    Returns:
+        list or None: The (path, mtime) of the directories, the mtime being None for a
+            directory that could not be stated, or None if the index can't be read.
+    """
+    prefix = os.path.join(directory, '')
+    db = None
+    try:
+        db = sqlite3.connect(index_path)
+        return [(prefix + rel_path, mtime) for rel_path, mtime in db.execute(
+            'SELECT path, mtime FROM files WHERE is_dir = 1 ORDER BY id')]
+    except sqlite3.Error:
+        return None
+    finally:
+        if db:
+            db.close()
+
+
+def save_files_listing(index_path, directory, fingerprint, files_list, files_metadata=None):
+    """
+    Stores the files listing of a root in its index, replacing any previous index.
+    Args:
+        index_path (str): The path of the index file.
+        directory (str): The root of the extraction.
+        fingerprint (str): The fingerprint of the root.
+        files_list (list): The paths of the files and folders of the root.
+        files_metadata (list): The (is_dir, size, mtime, ctime) of each path of files_list, as
+            read when the root was listed. Without it, the metadata of the entries is read
+            while writing the index.
+    """
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    prefix_length = len(os.path.join(directory, ''))
+    temp_path = f'{index_path}.{os.getpid()}.tmp'
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+    def index_rows():
+        if files_metadata is not None:
+            for file_id, (path, metadata) in enumerate(zip(files_list, files_metadata)):
+                yield (file_id, path[prefix_length:]) + tuple(metadata)
+            return
+        for file_id, path in enumerate(files_list):
+            try:
+                entry_stat = os.stat(path, follow_symlinks=False)
+                yield (file_id, path[prefix_length:], int(stat.S_ISDIR(entry_stat.st_mode)),
+                       entry_stat.st_size, entry_stat.st_mtime, entry_stat.st_ctime)
+            except OSError:
+                yield file_id, path[prefix_length:], None, None, None, None
+
+    db = sqlite3.connect(temp_path)
+    try:
+        db.execute('PRAGMA journal_mode=OFF')
+        db.execute('PRAGMA synchronous=OFF')
+        db.execute('CREATE TABLE index_info (key TEXT PRIMARY KEY, value TEXT)')
+        db.execute('''CREATE TABLE files (id INTEGER PRIMARY KEY, path TEXT, is_dir INTEGER,
+                      size INTEGER, mtime REAL, ctime REAL)''')
+        db.execute('CREATE TABLE names (file_id INTEGER, basename TEXT, extension TEXT)')
+        db.executemany('INSERT INTO index_info VALUES (?, ?)', [
+            ('version', str(files_index_version)),
+            ('root', os.path.abspath(directory)),
+            ('fingerprint', fingerprint),
+            ('count', str(len(files_list)))])
+        db.executemany('INSERT INTO files VALUES (?, ?, ?, ?, ?, ?)', index_rows())
+        db.executemany('INSERT INTO names VALUES (?, ?, ?)', (
+            (file_id, os.path.basename(path), os.path.splitext(path)[1][1:].lower())
+            for file_id, path in enumerate(files_list)))
+        db.execute('CREATE INDEX names_basename ON names (basename)')
+        db.execute('CREATE INDEX names_extension ON names (extension)')
+        db.commit()
+    finally:
+        db.close()
+    os.replace(temp_path, index_path)
+
+
+def get_archive_fingerprint(archive_path):
+    """
+    Computes the fingerprint of an archive from its size, its modification time and the
+    content of its first and last MB, which is much faster than hashing the whole archive.
+    Args:
+        archive_path (str): The path of the archive.
+    Returns:
+        str: The hexadecimal fingerprint.
+    """
+    archive_stat = os.stat(archive_path)
+    digest = hashlib.sha256(f'{files_index_version}\0{archive_stat.st_size}\0{archive_stat.st_mtime_ns}\0'
+                            .encode('utf-8'))
+    with open(archive_path, 'rb') as archive:
+        digest.update(archive.read(1048576))
+        archive.seek(max(0, archive_stat.st_size - 1048576))
+        digest.update(archive.read(1048576))
+    return digest.hexdigest()
+
+
+def get_archive_index_path(index_cache_folder, fingerprint, extension):
+    """
+    Returns the path of an index file of an archive.
+    Args:
+        index_cache_folder (str): The folder of the index files.
+        fingerprint (str): The fingerprint of the archive.
+        extension (str): The extension of the index file, identifying its content.
+    Returns:
+        str: The path of the index file.
+    """
+    return os.path.join(index_cache_folder, fingerprint + extension)
+
+
+def load_tar_members(index_path):
+    """
+    Returns the members of a tar archive stored in its index.
+    Args:
+        index_path (str): The path of the index file.
+    Returns:
+        list or None: The TarInfo of the members, in the order of the archive, or None if
+            there is no valid index.
+    """
+    if not os.path.isfile(index_path):
+        return None
+    members = []
+    db = None
+    try:
+        db = sqlite3.connect(index_path)
+        for name, member_type, size, mtime, mode, linkname, offset, offset_data, sparse in db.execute(
+                'SELECT name, type, size, mtime, mode, linkname, offset, offset_data, sparse '
+                'FROM members ORDER BY id'):
+            member = tarfile.TarInfo(name)
+            member.type = member_type
+            member.size = size
+            member.mtime = mtime
+            member.mode = mode
+            member.linkname = linkname
+            member.offset = offset
+            member.offset_data = offset_data
+            member.sparse = [tuple(block) for block in json.loads(sparse)] if sparse else None
+            members.append(member)
+    except (sqlite3.Error, ValueError):
+        return None
+    finally:
+        if db:
+            db.close()
+    return members
+
+
+def save_tar_members(index_path, members):
+    """
+    Stores the members of a tar archive in its index, replacing any previous index.
+    Args:
+        index_path (str): The path of the index file.
+        members (list): The TarInfo of the members, in the order of the archive.
+    """
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    temp_path = f'{index_path}.{os.getpid()}.tmp'
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    db = sqlite3.connect(temp_path)
+    try:
+        db.execute('PRAGMA journal_mode=OFF')
+        db.execute('PRAGMA synchronous=OFF')
+        db.execute('''CREATE TABLE members (id INTEGER PRIMARY KEY, name TEXT, type BLOB, size INTEGER,
+                      mtime REAL, mode INTEGER, linkname TEXT, offset INTEGER, offset_data INTEGER, sparse TEXT)''')
+        db.executemany('INSERT INTO members VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', (
+            (member_id, member.name, member.type, member.size, member.mtime, member.mode, member.linkname,
+             member.offset, member.offset_data, json.dumps(member.sparse) if member.sparse else None)
+            for member_id, member in enumerate(members)))
+        db.commit()
+    finally:
+        db.close()
+    os.replace(temp_path, index_path)
@@ -110,7 +110,10 @@ body_sidebar_dynamic_data = \
                             </a>
                         </li>
 """
-body_sidebar_dynamic_data_placeholder = '<!--__INSERT-NAV-BAR-DATA-HERE__-->'
+# The sidebar data is the same for all the pages, it is written once by generate_report in
+# sidebar_script_name, which the pages include where the data goes, so they are final as written
+sidebar_script_name = '_sidebar.js'
+body_sidebar_dynamic_data_include = f'<script src="{sidebar_script_name}"></script>'
 body_sidebar_trailer = \
 """
                     </ul>
@@ -309,6 +312,23 @@ nav_bar_script = \
     </script>
 """
 
+# Content of sidebar_script_name, formatted with the sidebar data as a JSON string. Inserts the
+# data before the including script and marks the entry of the current page as active
+sidebar_script = \
+"""(function() {{
+    var script = document.currentScript;
+    script.insertAdjacentHTML("beforebegin", {0});
+    var page = decodeURIComponent(location.pathname.split("/").pop()) || "index.html";
+    var links = script.parentNode.querySelectorAll("a.nav-link");
+    for (var i = 0; i < links.length; i++) {{
+        if (links[i].getAttribute("href") === page) {{
+            links[i].className += " active";
+            break;
+        }}
+    }}
+}})();
+"""
+
 nav_bar_script_footer = \
 """
     <script>
@@ -329,7 +349,7 @@ default_responsive_table_script = \
 """
     <script>
         $(document).ready(function() {
-            $('.table').DataTable({
+            $('.table').not('.table-data-shards').DataTable({
                 //"scrollY": "60vh",
                 //"scrollX": "10%",
                 //"scrollCollapse": true,
@@ -342,6 +362,18 @@ default_responsive_table_script = \
     </script>
 """
 
+# Script of a table whose rows are in data shards, formatted with the table id, the folder of
+# the shards, the number of rows and the number of rows of a shard
+data_shards_table_script = \
+"""
+    <script src="_elements/data_shards.js"></script>
+    <script>
+        $(document).ready(function() {{
+            leappDataShards.initTable({0}, {1}, {2}, {3});
+        }});
+    </script>
+"""
+
 page_footer = \
 """
     </body>
@@ -1,6 +1,4 @@
 # common standard imports
-import codecs
-import csv
 import hashlib
 import inspect
 import json
@@ -11,9 +9,13 @@ import plistlib
 import re
 import shutil
 import sqlite3
+import stat
 import sys
+import threading
 import xml
 
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import *
 from functools import lru_cache
 from pathlib import Path
@@ -23,17 +25,23 @@ from scripts.context import Context
 
 # common third party imports
 import pytz
-import simplekml
-from scripts.filetype import guess_mime, guess_extension
+from scripts.filetype import guess, guess_mime, guess_extension, get_signature_bytes
 from functools import wraps
 
 # LEAPP version unique imports
 import binascii
 from PIL import Image
 
+from scripts.artifact_cache import get_artifact_cache_key, load_artifact_result, save_artifact_result
+from scripts.run_journal import journal_output, journal_records
+from scripts.columnar_export import ColumnarExport
+from scripts.location_exports import LocationExport
+from scripts.timeline_db import write_timeline
+from scripts.tsv_writer import TsvWriter, get_tsv_path
 from scripts.lavafuncs import lava_process_artifact, lava_insert_sqlite_data, lava_get_media_item, \
     lava_insert_sqlite_media_item, lava_insert_sqlite_media_references, lava_get_media_references, \
-    lava_get_full_media_info
+    lava_get_full_media_info, lava_get_full_media_infos, lava_media_item_exists, lava_media_reference_exists, \
+    lava_get_media_source, lava_insert_sqlite_media_source, lava_set_record_count, lava_commit
 
 os.path.basename = lru_cache(maxsize=None)(os.path.basename)
 
@@ -44,6 +52,8 @@ thumb_size = 256, 256
 identifiers = {}
 icons = {}
 lava_only_artifacts = {}
+# Number of rows of a streamed data list written at once to the outputs
+data_chunk_size = 10000
 
 class iOS:
     _version = None
@@ -66,7 +76,7 @@ class OutputParameters:
     nl = '\n'
     screen_output_file_path = ''
 
-    def __init__(self, output_folder, custom_folder_name=None):
+    def __init__(self, output_folder, custom_folder_name=None, resume=False):
         now = datetime.now()
         currenttime = str(now.strftime('%Y-%m-%d_%A_%H%M%S'))
         if custom_folder_name:
@@ -77,6 +87,9 @@ class OutputParameters:
         self.data_folder = os.path.join(self.output_folder_base, 'data')
         self.media_folder = os.path.join(self.output_folder_base, 'media')
         self.html_media_folder = os.path.join(self.output_folder_base, '_HTML', 'media')
+        self.artifact_cache_folder = None
+        self.export_format = None
+        self.tsv_compression = None
         OutputParameters.screen_output_file_path = os.path.join(
             self.output_folder_base, '_HTML', '_Script_Logs', 'Screen_Output.html')
         OutputParameters.screen_output_file_path_devinfo = os.path.join(
@@ -84,8 +97,9 @@ class OutputParameters:
         OutputParameters.screen_output_file_path_lava_only = os.path.join(
             self.output_folder_base, '_HTML', '_Script_Logs', 'Lava_only_artifacts_log.html')
 
-        os.makedirs(os.path.join(self.output_folder_base, '_HTML', '_Script_Logs'))
-        os.makedirs(self.data_folder)
+        # The folders of a resumed run already exist
+        os.makedirs(os.path.join(self.output_folder_base, '_HTML', '_Script_Logs'), exist_ok=resume)
+        os.makedirs(self.data_folder, exist_ok=resume)
         os.makedirs(self.media_folder, exist_ok=True)
         os.makedirs(self.html_media_folder, exist_ok=True)
         
@@ -173,6 +187,9 @@ def check_output_types(type, output_types):
     else:
         return False
 
+# Serializes the LAVA database accesses of the media checked in by several threads
+_media_check_in_lock = threading.Lock()
+
 def get_media_references_id(media_id, artifact_name, name):
     '''
     Get the media references ID.
@@ -201,16 +218,74 @@ def set_media_references(media_ref_id, media_id, module_name, artifact_name, nam
     ))
     lava_insert_sqlite_media_references(media_references)
 
+def _can_hardlink_media(file_path, data_folder):
+    '''
+    Returns True if a media file can be hard linked in the media folder: only the files of the
+    data folder of the report that are not linked to another file, so the media files never
+    share the inode of the evidence (--evidence-access inplace or hardlink).
+    '''
+    try:
+        if os.path.commonpath([os.path.abspath(file_path), os.path.abspath(data_folder)]) != \
+                os.path.abspath(data_folder):
+            return False
+        file_stat = os.lstat(file_path)
+    except (OSError, ValueError):
+        return False
+    return stat.S_ISREG(file_stat.st_mode) and file_stat.st_nlink == 1
+
+def _copy_to_media_folder(file_path, media_folder, data_folder):
+    '''
+    Hard links or copies a media file to a temporary file of the media folder, computing the
+    SHA1 digest of its content while it is copied, or while it is read once when it is hard
+    linked. Only the private files of the data folder are hard linked.
+    Args:
+        file_path: The path of the media file.
+        media_folder: The media folder of the report.
+        data_folder: The data folder of the report.
+    Returns:
+        The digest of the content of the file, the path of the temporary file and the first
+        bytes of the file, to guess its type without reading it again.
+    '''
+    temp_path = Path(media_folder).joinpath(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    temp_path.unlink(missing_ok=True)
+    digest = hashlib.sha1()
+    hardlinked = False
+    if _can_hardlink_media(file_path, data_folder):
+        try:
+            temp_path.hardlink_to(file_path)
+            hardlinked = True
+        except OSError:
+            pass
+    header = b''
+    if hardlinked:
+        with open(temp_path, 'rb') as source:
+            while chunk := source.read(1048576):
+                if not header:
+                    header = chunk
+                digest.update(chunk)
+    else:
+        with open(file_path, 'rb') as source, open(temp_path, 'wb') as target:
+            while chunk := source.read(1048576):
+                if not header:
+                    header = chunk
+                digest.update(chunk)
+                target.write(chunk)
+        shutil.copystat(file_path, temp_path)
+    return digest.hexdigest(), temp_path, header
+
 def _check_in_media(media_id, source_path, is_embedded, name, media_data=None, converted_file_path=None, force_type=None,
                     force_extension=None, force_creation_date=None, force_modification_date=None):
     '''
     Check in media.
     Args:
-        media_id: The ID of the media.
+        media_id: The ID of the media, the SHA1 digest of its content. None for a media file: the
+            digest is computed while the file is copied to the media folder, unless the source
+            path of the file was already checked in.
         source_path: The source path of the media file.
         is_embedded: Whether the media is embedded.
         name: The name of the media (optional).
-        media_data: The media data (optional).
+        media_data: The media data, or at least its first bytes (optional, the header of the
+            media file is read if the type of the media has to be guessed).
         converted_file_path: The converted file path (optional).
         force_type: The MIME type of the media (optional).
         force_extension: The extension of the media (optional).
@@ -222,88 +297,127 @@ def _check_in_media(media_id, source_path, is_embedded, name, media_data=None, c
     output_params = Context.get_output_params()
     seeker = Context.get_seeker()
 
-    media_ref_id = get_media_references_id(media_id, Context.get_artifact_name(), name)
-    if lava_get_media_references(media_ref_id):
-        return media_ref_id # Reference already exists, we're done.
+    extraction_path = Context.get_source_file_path(source_path)
+    file_info = seeker.file_infos.get(extraction_path)
+    item_source_path = file_info.source_path if file_info else source_path
+
+    file_to_copy = None
+    if not is_embedded:
+        if not extraction_path:
+            return None
+        file_to_copy = Path(converted_file_path) if converted_file_path else Path(extraction_path)
+        if not file_to_copy.is_file():
+            return None
+
+    temp_media_path = None
+    # The source path is only recorded once the media item exists
+    record_source = False
+    if media_id is None and not converted_file_path:
+        with _media_check_in_lock:
+            media_id = lava_get_media_source(item_source_path)
+    if media_id is None:
+        media_id, temp_media_path, media_header = _copy_to_media_folder(file_to_copy, output_params.media_folder,
+                                                                        output_params.data_folder)
+        if not converted_file_path:
+            record_source = True
+            # The header of the file is the header of the media
+            if media_data is None:
+                media_data = media_header
 
-    # If media item doesn't exist, create it.
-    if not lava_get_media_item(media_id):
-        media_item = MediaItem(media_id)
-
-        if force_type:
-            media_item.mimetype = force_type
-        else:
-            media_item.mimetype = guess_mime(media_data)
-
-        if force_extension:
-            suffix = force_extension
-        elif name and len(name.split('.')[-1]) < 5:
-            suffix = name.split('.')[-1]
-        elif not is_embedded and len(source_path.split('.')[-1]) < 5:
-            suffix = source_path.split('.')[-1]
-        else:
-            suffix = f".{guess_extension(media_data)}"
-        if suffix and not suffix.startswith('.'):
-            suffix = f".{suffix}"
-
-        extraction_path = Context.get_source_file_path(source_path)
-        file_info = seeker.file_infos.get(extraction_path)
-        if file_info:
-            media_item.source_path = file_info.source_path
-        else:
-            media_item.source_path = source_path
-
-        if is_embedded:
-            media_item.created_at = force_creation_date if force_creation_date else 0
-            media_item.updated_at = force_modification_date if force_modification_date else 0
-        else:
-            if not extraction_path:
-                return None
-
-            file_to_copy = Path(converted_file_path) if converted_file_path else Path(extraction_path)
-            if not file_to_copy.is_file():
-                return None
-
-            if force_creation_date:
-                media_item.created_at = force_creation_date
-            elif file_info:
-                media_item.created_at = file_info.creation_date
+    try:
+        media_ref_id = get_media_references_id(media_id, Context.get_artifact_name(), name)
+        with _media_check_in_lock:
+            if lava_media_reference_exists(media_ref_id):
+                if record_source:
+                    lava_insert_sqlite_media_source(item_source_path, media_id)
+                return media_ref_id # Reference already exists, we're done.
+            media_item_exists = lava_media_item_exists(media_id)
+
+        # If media item doesn't exist, create it.
+        if not media_item_exists:
+            media_item = MediaItem(media_id)
+            media_item.source_path = item_source_path
+
+            if is_embedded:
+                media_item.created_at = force_creation_date if force_creation_date else 0
+                media_item.updated_at = force_modification_date if force_modification_date else 0
             else:
-                media_item.created_at = 0
+                if force_creation_date:
+                    media_item.created_at = force_creation_date
+                elif file_info:
+                    media_item.created_at = file_info.creation_date
+                else:
+                    media_item.created_at = 0
 
-            if force_modification_date:
-                media_item.updated_at = force_modification_date
-            elif file_info:
-                media_item.updated_at = file_info.modification_date
+                if force_modification_date:
+                    media_item.updated_at = force_modification_date
+                elif file_info:
+                    media_item.updated_at = file_info.modification_date
+                else:
+                    media_item.updated_at = 0
+
+            if force_extension:
+                suffix = force_extension
+            elif name and len(name.split('.')[-1]) < 5:
+                suffix = name.split('.')[-1]
+            elif not is_embedded and len(source_path.split('.')[-1]) < 5:
+                suffix = source_path.split('.')[-1]
+            else:
+                suffix = None
+
+            # The type is guessed once from the header of the media, for the MIME type and the extension
+            kind = None
+            if not force_type or suffix is None:
+                if media_data is None:
+                    media_data = get_signature_bytes(extraction_path)
+                kind = guess(media_data)
+            media_item.mimetype = force_type if force_type else (kind.mime if kind else None)
+            if suffix is None:
+                suffix = f".{kind.extension if kind else None}"
+            if suffix and not suffix.startswith('.'):
+                suffix = f".{suffix}"
+
+            # 1. Create the canonical media file, once per content
+            canonical_media_path = Path(output_params.media_folder).joinpath(media_id).with_suffix(suffix)
+            if is_embedded:
+                canonical_media_path.write_bytes(media_data)
+            elif temp_media_path:
+                os.replace(temp_media_path, canonical_media_path)
+                temp_media_path = None
+            elif _can_hardlink_media(file_to_copy, output_params.data_folder):
+                try:
+                    canonical_media_path.hardlink_to(file_to_copy)
+                except OSError:
+                    shutil.copy2(file_to_copy, canonical_media_path)
             else:
-                media_item.updated_at = 0
-
-        # 1. Create the canonical media file
-        canonical_media_path = Path(output_params.media_folder).joinpath(media_id).with_suffix(suffix)
-        if is_embedded:
-            canonical_media_path.write_bytes(media_data)
-        else:
-            try:
-                canonical_media_path.hardlink_to(file_to_copy)
-            except OSError:
                 shutil.copy2(file_to_copy, canonical_media_path)
 
-        # 2. Create the HTML media file link/copy
-        html_media_path = Path(output_params.html_media_folder).joinpath(media_id).with_suffix(suffix)
-        if not html_media_path.exists():
-            try:
-                html_media_path.hardlink_to(canonical_media_path)
-            except OSError:
-                shutil.copy2(canonical_media_path, html_media_path)
-
-        media_item.extraction_path = f"media/{media_id}{suffix}"
-        media_item.metadata = "not parsed yet"
-        media_item.is_embedded = 1 if is_embedded else 0
-        lava_insert_sqlite_media_item(media_item)
-
-    # Always set the reference
-    set_media_references(media_ref_id, media_id, Context.get_module_name(), Context.get_artifact_name(), name)
-    return media_ref_id
+            # 2. Create the HTML media file link/copy
+            html_media_path = Path(output_params.html_media_folder).joinpath(media_id).with_suffix(suffix)
+            if not html_media_path.exists():
+                try:
+                    html_media_path.hardlink_to(canonical_media_path)
+                except OSError:
+                    shutil.copy2(canonical_media_path, html_media_path)
+
+            media_item.extraction_path = f"media/{media_id}{suffix}"
+            media_item.metadata = "not parsed yet"
+            media_item.is_embedded = 1 if is_embedded else 0
+            with _media_check_in_lock:
+                # Another thread may have stored the same content meanwhile
+                if not lava_media_item_exists(media_id):
+                    lava_insert_sqlite_media_item(media_item)
+
+        # Always set the reference
+        with _media_check_in_lock:
+            if record_source:
+                lava_insert_sqlite_media_source(item_source_path, media_id)
+            set_media_references(media_ref_id, media_id, Context.get_module_name(), Context.get_artifact_name(), name)
+        return media_ref_id
+    finally:
+        # The content of the copied file was already in the media folder
+        if temp_media_path:
+            temp_media_path.unlink(missing_ok=True)
 
 def check_in_media(file_path, name="", converted_file_path=False, force_type=None, force_extension=None,
                    force_creation_date=None, force_modification_date=None):
@@ -327,14 +441,49 @@ def check_in_media(file_path, name="", converted_file_path=False, force_type=Non
 
     file_info = Context.get_seeker().file_infos.get(extraction_path)
     if file_info:
-        media_id = hashlib.sha1(f"{file_info.source_path}".encode()).hexdigest()
-        with open(extraction_path, "rb") as f:
-            file_data = f.read()
-        return _check_in_media(media_id, file_path, False, name, media_data=file_data, converted_file_path=converted_file_path,
+        # The media ID is the digest of the content of the file, computed when it is copied
+        return _check_in_media(None, file_path, False, name, converted_file_path=converted_file_path,
                                force_type=force_type, force_extension=force_extension,
                                force_creation_date=force_creation_date, force_modification_date=force_modification_date)
     return None
 
+def check_in_media_list(file_paths, names=None, max_workers=None, **kwargs):
+    '''
+    Check in several media files, concurrently in a pool of threads, which copies the media
+    files of an artifact faster from slow storage.
+    Args:
+        file_paths: The file paths of the media files.
+        names: The names of the media (optional), in the order of file_paths.
+        max_workers: The number of threads (optional, default from ThreadPoolExecutor, 1 to
+            check in the media in the current thread).
+        kwargs: The other arguments of check_in_media, the same for all the media files.
+    Returns:
+        The list of the media reference IDs or None, in the order of file_paths.
+    '''
+    file_paths = list(file_paths)
+    names = list(names) if names is not None else [""] * len(file_paths)
+    media_ref_ids = [None] * len(file_paths)
+
+    # The check-ins of the same file are done by the same thread, as they share the media item
+    tasks = {}
+    Context.get_filename_lookup_map()
+    for index, file_path in enumerate(file_paths):
+        extraction_path = Context.get_source_file_path(file_path)
+        tasks.setdefault(extraction_path or file_path, []).append(index)
+
+    def check_in_task(indexes):
+        for index in indexes:
+            media_ref_ids[index] = check_in_media(file_paths[index], names[index], **kwargs)
+
+    if max_workers == 1 or len(tasks) < 2:
+        for indexes in tasks.values():
+            check_in_task(indexes)
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='check_in_media') as executor:
+            for future in [executor.submit(check_in_task, indexes) for indexes in tasks.values()]:
+                future.result()
+    return media_ref_ids
+
 def check_in_embedded_media(source_file, data, name="", force_type=None, force_extension=None,
                             force_creation_date=None, force_modification_date=None):
     '''
@@ -393,6 +542,17 @@ def get_data_list_with_media(media_header_info, data_list):
     # Get the correct output paths from the context
     output_params = Context.get_output_params()
 
+    # Read the media information of all the rows at once
+    all_media_ref_ids = []
+    for data in data_list:
+        for idx in media_header_info:
+            media_ref_id_cell = data[idx]
+            if media_ref_id_cell:
+                all_media_ref_ids.extend(media_ref_id_cell if isinstance(media_ref_id_cell, list)
+                                         else [media_ref_id_cell])
+    media_infos = lava_get_full_media_infos(all_media_ref_ids)
+    linked_html_paths = set()
+
     for data in data_list:
         html_row = list(data)
         txt_row = list(data)
@@ -411,7 +571,7 @@ def get_data_list_with_media(media_header_info, data_list):
             media_ref_ids = media_ref_id_cell if isinstance(media_ref_id_cell, list) else [media_ref_id_cell]
 
             for ref_id in media_ref_ids:
-                media_item = lava_get_full_media_info(ref_id)
+                media_item = media_infos.get(ref_id)
                 if not (media_item and media_item['extraction_path']):
                     continue
 
@@ -422,11 +582,13 @@ def get_data_list_with_media(media_header_info, data_list):
                 html_path = os.path.join(output_params.html_media_folder, Path(canonical_path).name)
 
                 # Create the link/copy for the HTML report if it doesn't exist
-                if os.path.exists(canonical_path) and not os.path.exists(html_path):
-                    try:
-                        os.link(canonical_path, html_path)
-                    except OSError:
-                        shutil.copy2(canonical_path, html_path)
+                if html_path not in linked_html_paths:
+                    linked_html_paths.add(html_path)
+                    if os.path.exists(canonical_path) and not os.path.exists(html_path):
+                        try:
+                            os.link(canonical_path, html_path)
+                        except OSError:
+                            shutil.copy2(canonical_path, html_path)
                 
                 # Generate the HTML tag and add the path for the text report
                 html_code += html_media_tag(media_item['extraction_path'], media_item['type'], style, media_item['name'])
@@ -444,6 +606,60 @@ def get_data_list_with_media(media_header_info, data_list):
         
     return html_data_list, txt_data_list
 
+def get_artifact_cache_folder():
+    '''Returns the folder of the cached artifact results, or None if the cache is not used'''
+    try:
+        return Context.get_output_params().artifact_cache_folder
+    except ValueError:
+        return None
+
+def get_export_format():
+    '''Returns the format of the columnar exports, or None if the artifacts are not exported'''
+    try:
+        return Context.get_output_params().export_format
+    except ValueError:
+        return None
+
+def get_tsv_compression():
+    '''Returns the compression format of the TSV exports, or None if they are not compressed'''
+    try:
+        return Context.get_output_params().tsv_compression
+    except ValueError:
+        return None
+
+def get_artifact_side_effects(report_folder):
+    '''Returns the state changed by the artifacts storing device information, setting the iOS
+    version or writing files in their report folder. The results of an artifact are only cached
+    when this state is the same before and after its execution.'''
+    try:
+        devinfo_size = os.path.getsize(OutputParameters.screen_output_file_path_devinfo)
+    except (AttributeError, OSError):
+        devinfo_size = None
+    try:
+        report_files = sorted(os.listdir(report_folder))
+    except OSError:
+        report_files = None
+    return (repr(identifiers), iOS.get_version(), Context.get_installed_os_version(), devinfo_size,
+            report_files)
+
+class SearchRecordingSeeker:
+    '''
+    Delegates to a seeker, recording if the artifact searches files itself. The results of such
+    an artifact are not cached: the files it searches are not part of the cache key and would
+    not be extracted when the results are reused.
+    '''
+
+    def __init__(self, seeker):
+        self.seeker = seeker
+        self.has_searched = False
+
+    def search(self, *args, **kwargs):
+        self.has_searched = True
+        return self.seeker.search(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.seeker, name)
+
 def artifact_processor(func):
     @wraps(func)
     def wrapper(files_found, report_folder, seeker, wrap_text, timezone_offset):
@@ -472,21 +688,43 @@ def artifact_processor(func):
         Context.set_module_file_path(module_file_path)
         Context.set_artifact_name(artifact_name)
 
-        sig = inspect.signature(func)
-        if len(sig.parameters) == 1:
-            data_headers, data_list, source_path = func(Context)
+        cache_folder = get_artifact_cache_folder()
+        cache_key = None
+        cached_result = None
+        if cache_folder and files_found:
+            cache_key = get_artifact_cache_key(f'{module_name}.{func_name}', module_file_path, files_found,
+                                               timezone_offset, (iOS.get_version(), Context.get_installed_os_version()))
+            if cache_key:
+                cached_result = load_artifact_result(cache_folder, cache_key, files_found)
+
+        if cached_result:
+            logfunc(f"Reusing the cached results of {artifact_name}")
+            data_headers, data_list, source_path = cached_result
         else:
-            data_headers, data_list, source_path = func(files_found, report_folder, seeker, wrap_text, timezone_offset)
+            side_effects = None
+            if cache_key:
+                side_effects = get_artifact_side_effects(report_folder)
+                seeker = SearchRecordingSeeker(seeker)
+                Context.set_seeker(seeker)
+            sig = inspect.signature(func)
+            if len(sig.parameters) == 1:
+                data_headers, data_list, source_path = func(Context)
+            else:
+                data_headers, data_list, source_path = func(files_found, report_folder, seeker, wrap_text, timezone_offset)
+            if cache_key and not seeker.has_searched and not get_media_header_info(data_headers) \
+                    and not isinstance(data_list, Iterator) and side_effects == get_artifact_side_effects(report_folder):
+                save_artifact_result(cache_folder, cache_key, files_found, (data_headers, data_list, source_path))
 
         if not source_path:
             logfunc("No source_path provided")
 
-        if len(data_list):
+        if not isinstance(data_list, Iterator) and len(data_list):
             if isinstance(data_list, tuple):
                 data_list, html_data_list = data_list
             else:
                 html_data_list = data_list
             logfunc(f"Found {len(data_list):,} {'records' if len(data_list)>1 else 'record'} for {artifact_name}")
+            journal_records(len(data_list))
             icons.setdefault(category, {artifact_name: icon}).update({artifact_name: icon})
 
             # Strip tuples from headers for HTML, TSV, and timeline
@@ -502,7 +740,8 @@ def artifact_processor(func):
                 report = artifact_report.ArtifactHtmlReport(artifact_name)
                 report.start_artifact_report(report_folder, artifact_name, description)
                 report.add_script()
-                report.write_artifact_data_table(stripped_headers, html_data_list, source_path, html_no_escape=html_columns)
+                report.write_artifact_data_table(stripped_headers, html_data_list, source_path, html_no_escape=html_columns,
+                                                 shard_threshold=artifact_report.html_table_shard_threshold)
                 report.end_artifact_report()
 
             if check_output_types('tsv', output_types):
@@ -528,16 +767,156 @@ def artifact_processor(func):
             if check_output_types('kml', output_types):
                 kmlgen(report_folder, artifact_name, txt_data_list if media_header_info else data_list, stripped_headers)
 
+            export_format = get_export_format()
+            if export_format and (check_output_types('tsv', output_types) or check_output_types('lava', output_types)):
+                columnar_export(report_folder, artifact_name, category, data_headers,
+                                txt_data_list if media_header_info else data_list, export_format)
+
+        elif isinstance(data_list, Iterator):
+            write_streamed_data(report_folder, artifact_info, func_name, module_name, artifact_name, category,
+                                description, icon, html_columns, output_types, data_headers, data_list, source_path)
+
         else:
             if output_types != 'none':
                 logfunc(f"No data found for {artifact_name}")
                 if is_lava_only:
                     lava_only_info(category, artifact_name, artifact_name, 0)
 
+        lava_commit()
         return data_headers, data_list, source_path
     return wrapper
 
 
+class DataBatch(list):
+    '''
+    A list of rows yielded at once by a streamed data list. Any other item yielded, list or
+    tuple, is a single row: a streamed artifact yields its rows as they are, or wraps
+    several of them in a DataBatch, e.g. yield DataBatch(rows).
+    '''
+
+
+def get_data_chunks(data_rows, chunk_size):
+    '''
+    Groups the rows yielded by a streamed data list in chunks.
+    Args:
+        data_rows: An iterator of rows, or of DataBatch of rows.
+        chunk_size: The number of rows of a chunk.
+    Returns:
+        A generator of lists of chunk_size rows, the last one being shorter.
+    '''
+    chunk = []
+    for item in data_rows:
+        if isinstance(item, DataBatch):
+            chunk.extend(item)
+        else:
+            chunk.append(item)
+        while len(chunk) >= chunk_size:
+            yield chunk[:chunk_size]
+            chunk = chunk[chunk_size:]
+    if chunk:
+        yield chunk
+
+def write_streamed_data(report_folder, artifact_info, func_name, module_name, artifact_name, category, description,
+                        icon, html_columns, output_types, data_headers, data_rows, source_path):
+    '''
+    Writes the outputs of an artifact whose data list is streamed: the artifact yields its rows,
+    or DataBatch of rows, which are written by chunks of data_chunk_size rows, so only a chunk is
+    kept in memory.
+    Args:
+        data_rows: The iterator returned by the artifact as data list.
+        The other arguments are those used by artifact_processor for a data list.
+    Returns:
+        The number of records.
+    '''
+    is_lava_only = 'lava_only' in output_types
+    stripped_headers = strip_tuple_from_headers(data_headers)
+    media_header_info = get_media_header_info(data_headers)
+    has_locations = 'Longitude' in stripped_headers and 'Latitude' in stripped_headers
+    record_count = 0
+    report = None
+    table_name = None
+    location_export = None
+    columnar_exporter = None
+    tsv_writer = None
+    export_format = get_export_format()
+
+    for chunk in get_data_chunks(data_rows, data_chunk_size):
+        if not record_count:
+            icons.setdefault(category, {artifact_name: icon}).update({artifact_name: icon})
+            if media_header_info:
+                html_columns.extend([data_headers[idx][0] for idx in media_header_info])
+            if check_output_types('html', output_types):
+                report = artifact_report.ArtifactHtmlReport(artifact_name)
+                report.start_artifact_report(report_folder, artifact_name, description)
+                report.add_script()
+            if check_output_types('lava', output_types):
+                table_name, object_columns, column_map = lava_process_artifact(category,
+                                                                               module_name,
+                                                                               artifact_name,
+                                                                               data_headers,
+                                                                               0,
+                                                                               func_name=func_name,
+                                                                               data_views=artifact_info.get("data_views"),
+                                                                               artifact_icon=icon,
+                                                                               source_path=source_path)
+            if check_output_types('tsv', output_types):
+                tsv_writer = open_tsv_writer(report_folder, artifact_name)
+                tsv_writer.write_rows([stripped_headers])
+            if check_output_types('kml', output_types) and has_locations:
+                location_export = LocationExport(get_report_folder_base(report_folder), artifact_name,
+                                                 stripped_headers)
+            if export_format and (check_output_types('tsv', output_types) or check_output_types('lava', output_types)):
+                columnar_exporter = ColumnarExport(get_report_folder_base(report_folder), artifact_name, category,
+                                                   data_headers, export_format)
+
+        html_chunk = txt_chunk = chunk
+        if media_header_info:
+            html_chunk, txt_chunk = get_data_list_with_media(media_header_info, chunk)
+
+        if report:
+            report.write_artifact_data_rows(stripped_headers, html_chunk, html_no_escape=html_columns)
+
+        if tsv_writer:
+            tsv_writer.write_rows(txt_chunk)
+
+        if check_output_types('timeline', output_types):
+            timeline(report_folder, artifact_name, txt_chunk, stripped_headers)
+
+        if table_name:
+            lava_insert_sqlite_data(table_name, chunk, object_columns, data_headers, column_map)
+
+        if location_export:
+            location_export.add_rows(txt_chunk)
+
+        if columnar_exporter:
+            columnar_exporter.add_rows(txt_chunk)
+
+        record_count += len(chunk)
+
+    if tsv_writer:
+        tsv_writer.close()
+    if location_export:
+        location_export.close()
+    if columnar_exporter:
+        log_columnar_export_nulls(artifact_name, columnar_exporter.close())
+
+    if record_count:
+        logfunc(f"Found {record_count:,} {'records' if record_count>1 else 'record'} for {artifact_name}")
+        journal_records(record_count)
+        if report:
+            report.write_artifact_data_table(stripped_headers, None, source_path, html_no_escape=html_columns,
+                                             shard_threshold=artifact_report.html_table_shard_threshold)
+            report.end_artifact_report()
+        if table_name:
+            lava_set_record_count(category, table_name, record_count)
+            if is_lava_only:
+                lava_only_info(category, artifact_name, table_name, record_count)
+    elif output_types != 'none':
+        logfunc(f"No data found for {artifact_name}")
+        if is_lava_only:
+            lava_only_info(category, artifact_name, artifact_name, 0)
+    return record_count
+
 def is_platform_linux():
     '''Returns True if running on Linux'''
     return sys.platform == 'linux'
@@ -672,12 +1051,32 @@ def get_sqlite_db_path(path):
     else:
         return path
 
+def get_sqlite_db_uri_params(path):
+    '''Returns the URI parameters opening a sqlite db in read-only mode.
+    A db outside of the report folder (evidence read in place) is also opened as immutable when
+    no -wal or -journal file with data is next to it, so SQLite neither locks it nor creates files
+    next to it. Copies and databases written by the run itself are not opened as immutable.'''
+    try:
+        output_folder = os.path.join(os.path.abspath(Context.get_output_params().output_folder_base), '')
+    except ValueError:
+        return 'mode=ro'
+    if os.path.abspath(path).startswith(output_folder):
+        return 'mode=ro'
+    for suffix in ('-wal', '-journal'):
+        try:
+            if os.path.getsize(f'{path}{suffix}') > 0:
+                return 'mode=ro'
+        except OSError:
+            pass
+    return 'mode=ro&immutable=1'
+
 def open_sqlite_db_readonly(path):
     '''Opens a sqlite db in read-only mode, so original db (and -wal/journal are intact)'''
     try:
         if path:
+            uri_params = get_sqlite_db_uri_params(path)
             path = get_sqlite_db_path(path)
-            with sqlite3.connect(f"file:{path}?mode=ro", uri=True) as db:
+            with sqlite3.connect(f"file:{path}?{uri_params}", uri=True) as db:
                 return db
     except sqlite3.OperationalError as e:
         logfunc(f"Error with {path}:")
@@ -688,8 +1087,9 @@ def attach_sqlite_db_readonly(path, db_name):
     '''Return the query to attach a sqlite db in read-only mode.
     path: str --> Path of the SQLite DB to attach
     db_name: str --> Name of the SQLite DB in the query'''
+    uri_params = get_sqlite_db_uri_params(path)
     path = get_sqlite_db_path(path)
-    return  f'''ATTACH DATABASE "file:{path}?mode=ro" AS {db_name}'''
+    return  f'''ATTACH DATABASE "file:{path}?{uri_params}" AS {db_name}'''
 
 def get_sqlite_db_records(path, query, attach_query=None):
     db = open_sqlite_db_readonly(path)
@@ -760,6 +1160,8 @@ def does_table_exist_in_db(path, table_name):
                 return True
         except sqlite3.Error as ex:
             logfunc(f"Query error, query={query} Error={str(ex)}")
+        finally:
+            db.close()
     return False
 
 def does_view_exist_in_db(path, table_name):
@@ -776,118 +1178,61 @@ def does_view_exist_in_db(path, table_name):
     return False
 
 
-def tsv(report_folder, data_headers, data_list, tsvname, source_file=None):
+def get_report_folder_base(report_folder):
+    '''Returns the report folder of the run from the report folder of an artifact'''
     report_folder = report_folder.rstrip('/')
     report_folder = report_folder.rstrip('\\')
-    report_folder_base = os.path.dirname(os.path.dirname(report_folder))
-    tsv_report_folder = os.path.join(report_folder_base, '_TSV Exports')
+    return os.path.dirname(os.path.dirname(report_folder))
+
+def open_tsv_writer(report_folder, tsvname):
+    '''Returns the TsvWriter of the TSV export of an artifact, compressed as set by --tsv-compress'''
+    report_folder_base = get_report_folder_base(report_folder)
+    compression = get_tsv_compression()
+    journal_output('tsv', get_tsv_path(report_folder_base, tsvname, compression))
+    return TsvWriter(report_folder_base, tsvname, compression)
+
+def tsv(report_folder, data_headers, data_list, tsvname, source_file=None, write_headers=True):
+    tsv_writer = open_tsv_writer(report_folder, tsvname)
+    try:
+        if write_headers:
+            tsv_writer.write_rows([data_headers])
+        tsv_writer.write_rows(data_list)
+    finally:
+        tsv_writer.close()
 
-    if os.path.isdir(tsv_report_folder):
-        pass
-    else:
-        os.makedirs(tsv_report_folder)
-    
-    with codecs.open(os.path.join(tsv_report_folder, tsvname + '.tsv'), 'a', 'utf-8-sig') as tsvfile:
-        tsv_writer = csv.writer(tsvfile, delimiter='\t')
-        tsv_writer.writerow(data_headers)
-        
-        for i in data_list:
-            tsv_writer.writerow(i)
-            
 def timeline(report_folder, tlactivity, data_list, data_headers):
     report_folder = report_folder.rstrip('/')
     report_folder = report_folder.rstrip('\\')
-    report_folder_base = os.path.dirname(os.path.dirname(report_folder))
-    tl_report_folder = os.path.join(report_folder_base, '_Timeline')
-
-    if os.path.isdir(tl_report_folder):
-        tldb = os.path.join(tl_report_folder, 'tl.db')
-        db = sqlite3.connect(tldb)
-        cursor = db.cursor()
-        cursor.execute('''PRAGMA synchronous = EXTRA''')
-        cursor.execute('''PRAGMA journal_mode = WAL''')
-        db.commit()
-    else:
-        os.makedirs(tl_report_folder)
-        # create database
-        tldb = os.path.join(tl_report_folder, 'tl.db')
-        db = sqlite3.connect(tldb, isolation_level = 'exclusive')
-        cursor = db.cursor()
-        cursor.execute(
-            """
-            CREATE TABLE data(key TEXT, activity TEXT, datalist TEXT)
-            """
-        )
-        db.commit()
-    
-    for entry in data_list:
-        entry = [str(field) for field in entry]
-        
-        data_dict = dict(zip(data_headers, entry))
 
-        data_str = json.dumps(data_dict)
-        cursor.executemany(
-            "INSERT INTO data VALUES(?,?,?)", [(str(entry[0]), tlactivity, data_str)])
-
-    db.commit()
-    db.close()
+    journal_output('timeline', tlactivity)
+    # The report folder of an artifact is named after its category
+    write_timeline(get_report_folder_base(report_folder), tlactivity, os.path.basename(report_folder), data_list,
+                   data_headers)
 
 def kmlgen(report_folder, kmlactivity, data_list, data_headers):
     if 'Longitude' not in data_headers or 'Latitude' not in data_headers:
         return
 
-    data = []
-    kml = simplekml.Kml(open=1)    
-    a = 0
-    length = len(data_list)
-    while a < length:
-        modifiedDict = dict(zip(data_headers, data_list[a]))
-        lon = modifiedDict['Longitude']
-        lat = modifiedDict['Latitude']
-        times_header = "Timestamp"
-        if lat and lon:
-            pnt = kml.newpoint()
-            times = modifiedDict.get('Timestamp','N/A')
-            if times == 'N/A':
-                for key, value in modifiedDict.items():
-                    if isinstance(value, datetime):
-                        times_header = key
-                        times = value
-                        break
-            pnt.name = times
-            pnt.description = f"{times_header}: {times} - {kmlactivity}"
-            pnt.coords = [(lon, lat)]
-            data.append((times, lat, lon, kmlactivity))
-        a += 1
-
-    if len(data) > 0:
-        report_folder = report_folder.rstrip('/')
-        report_folder = report_folder.rstrip('\\')
-        report_folder_base = os.path.dirname(os.path.dirname(report_folder))
-        kml_report_folder = os.path.join(report_folder_base, '_KML Exports')
-        if os.path.isdir(kml_report_folder):
-            latlongdb = os.path.join(kml_report_folder, '_latlong.db')
-            db = sqlite3.connect(latlongdb)
-            cursor = db.cursor()
-            cursor.execute('''PRAGMA synchronous = EXTRA''')
-            cursor.execute('''PRAGMA journal_mode = WAL''')
-            db.commit()
-        else:
-            os.makedirs(kml_report_folder)
-            latlongdb = os.path.join(kml_report_folder, '_latlong.db')
-            db = sqlite3.connect(latlongdb)
-            cursor = db.cursor()
-            cursor.execute(
-            """
-            CREATE TABLE data(timestamp TEXT, latitude TEXT, longitude TEXT, activity TEXT)
-            """
-                )
-            db.commit()
-        
-        cursor.executemany("INSERT INTO data VALUES(?, ?, ?, ?)", data)
-        db.commit()
-        db.close()
-        kml.save(os.path.join(kml_report_folder, f'{kmlactivity}.kml'))
+    location_export = LocationExport(get_report_folder_base(report_folder), kmlactivity, data_headers)
+    try:
+        location_export.add_rows(data_list)
+    finally:
+        location_export.close()
+
+def columnar_export(report_folder, artifact_name, category, data_headers, data_list, export_format):
+    '''Writes the rows of an artifact to its Parquet or Arrow IPC export file'''
+    columnar_exporter = ColumnarExport(get_report_folder_base(report_folder), artifact_name, category,
+                                       data_headers, export_format)
+    try:
+        columnar_exporter.add_rows(data_list)
+    finally:
+        null_count = columnar_exporter.close()
+    log_columnar_export_nulls(artifact_name, null_count)
+
+def log_columnar_export_nulls(artifact_name, null_count):
+    if null_count:
+        logfunc(f"{null_count:,} {'values' if null_count > 1 else 'value'} of {artifact_name} exported as null "
+                "because they don't match the type of their column")
 
 def media_to_html(media_path, files_found, report_folder):
 
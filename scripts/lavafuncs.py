@@ -3,42 +3,354 @@ This module provides functionality for initializing, processing, and finalizing
 artifact data from forensic analysis. It manages both a SQLite database for
 structured data storage and a JSON file for metadata and configuration.
 
+During a run, the database is written in ingest mode: in WAL mode, only synced by the
+checkpoints of the WAL and by lava_sync, by a writer thread fed by a queue, in one transaction per artifact (per write in the worker
+processes of a parallel run), with the media items and references inserted by batches.
+When a write of an artifact fails, its transaction is rolled back and the tables it
+created are dropped and removed from the LAVA data. The media checked in but not yet
+written are kept in memory so that they are found by the lookups. lava_finalize_output
+writes the database back to the rollback journal mode with fsync. Without
+initialize_lava, the database is written directly.
+
+The ids of the media items and references known to be in the database are kept in a
+registry, so checking in a media already checked in does not query the database, and
+the media information of a whole data list is read with a few batched queries.
+
+The media items are identified by the SHA1 digest of their content, so a media reached
+through several paths or artifacts is stored once, with a media reference per artifact.
+The _lava_media_sources table maps the source path of each media file checked in to its
+media item, so a file is only read once.
+
 Global Variables:
     lava_data (dict): Main data structure containing artifacts, modules, and metadata.
-    lava_db (sqlite3.Connection): SQLite database connection for artifact storage.
+    lava_db (sqlite3.Connection): SQLite database connection for artifact storage, used to read
+        the database in ingest mode.
     lava_db_name (str): Name of the SQLite database file.
     lava_json_name (str): Name of the JSON metadata file.
+    lava_media_batch_size (int): Number of media items or references inserted at once in ingest mode.
+    lava_media_info_batch_size (int): Number of media references read by a query of lava_get_full_media_infos.
 
 Functions:
     sanitize_sql_name: Sanitizes strings for use as SQL identifiers.
     get_sql_type: Maps Python types to SQL types.
     initialize_lava: Initializes the LAVA data structure and database.
     lava_process_artifact: Processes and stores artifact data.
+    lava_set_record_count: Sets the number of records of an artifact whose data was streamed.
     lava_add_module: Adds module information to the LAVA data.
     lava_create_sqlite_table: Creates a SQLite table for artifact data.
     lava_insert_sqlite_data: Inserts data rows into a SQLite table.
     lava_get_media_item: Retrieves media item information from database.
+    lava_media_item_exists: Checks if a media item is in the database.
     lava_insert_sqlite_media_item: Inserts media item metadata into database.
     lava_get_media_references: Retrieves media reference information.
+    lava_media_reference_exists: Checks if a media reference is in the database.
     lava_insert_sqlite_media_references: Inserts media reference into database.
+    lava_get_media_source: Retrieves the media item ID of a source path.
+    lava_insert_sqlite_media_source: Inserts the media item ID of a source path into database.
     lava_get_full_media_info: Retrieves complete media information with joins.
+    lava_get_full_media_infos: Retrieves complete media information of several references at once.
+    lava_commit: Commits the data written by the current artifact.
+    lava_sync: Commits the data written by the current artifact and writes the database to disk.
     lava_finalize_output: Finalizes and saves LAVA output files.
+    initialize_lava_worker: Connects a worker process to the LAVA database.
+    lava_collect_worker_data: Returns and resets the LAVA data gathered by a worker process.
+    lava_merge_worker_data: Merges the LAVA data of a worker process into the main LAVA data.
+    lava_get_data: Returns the LAVA data, saved in the run journal to resume a run.
+    resume_lava: Reconnects to the LAVA database of a resumed run and restores its LAVA data.
 """
 
 import json
+import queue
 import sqlite3
 import os
+import threading
 from collections import OrderedDict
 import re
 import datetime
 
 from scripts.context import Context
+from scripts.run_journal import journal_output
 
 # Global variables
 lava_data = None
 lava_db = None
 lava_db_name = '_lava_artifacts.db'
 lava_json_name = '_lava_data.lava'
+# Seconds a worker process waits for another process to release the LAVA database
+lava_db_timeout = 600
+lava_media_batch_size = 1000
+lava_media_info_batch_size = 500
+
+# Ingest mode: queue of the writer thread and media not yet written
+_lava_writer_queue = None
+_pending_media_items = {}
+_pending_media_references = {}
+
+# Media registry: ids of the media items and references known to be in the database
+_media_item_ids = set()
+_media_reference_ids = set()
+_media_source_ids = {}
+
+_media_item_insert = '''INSERT INTO _lava_media_items
+                ("id", "source_path", "extraction_path", "type", "metadata", "created_at", "updated_at", "is_embedded")
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)'''
+_media_references_insert = '''INSERT INTO _lava_media_references
+                ("id", "media_item_id", "module_name", "artifact_name", "name")
+                VALUES (?, ?, ?, ?, ?)'''
+_media_source_insert = '''INSERT OR IGNORE INTO _lava_media_sources
+                ("source_path", "media_item_id")
+                VALUES (?, ?)'''
+
+
+def _insert_media_rows(db, sql, rows, ignore_duplicates):
+    """Inserts a batch of media rows, one by one if the batch contains an existing id"""
+    db.execute('SAVEPOINT media_batch')
+    try:
+        db.executemany(sql, rows)
+        db.execute('RELEASE media_batch')
+        return
+    except sqlite3.IntegrityError:
+        db.execute('ROLLBACK TO media_batch')
+        db.execute('RELEASE media_batch')
+    for row in rows:
+        try:
+            db.execute(sql, row)
+        except sqlite3.IntegrityError:
+            # The media items checked in by several processes are expected duplicates
+            if not ignore_duplicates:
+                raise
+
+
+def _lava_writer_loop(db_path, requests, autocommit):
+    """Executes the write requests of the queue on a connection of the writer thread. The
+    requests are executed in one transaction committed by a 'commit' request, or each in
+    its own transaction with autocommit, the media rows are inserted by batches. A 'query'
+    request is answered inside the transaction, so it sees the data not committed yet. An error
+    is reported to the next 'commit' request, which rolls the transaction back instead and
+    drops the tables created since the previous 'commit' request."""
+    db = sqlite3.connect(db_path, timeout=lava_db_timeout)
+    # The commits are not synced, the checkpoints are so the WAL is never reset before the
+    # database is on disk
+    db.execute('PRAGMA synchronous = NORMAL')
+    media_items = []
+    media_references = []
+    media_sources = []
+    created_tables = []
+    error = None
+
+    def write_media():
+        if media_items:
+            _insert_media_rows(db, _media_item_insert, media_items, True)
+            media_items.clear()
+        if media_references:
+            _insert_media_rows(db, _media_references_insert, media_references, False)
+            media_references.clear()
+        if media_sources:
+            db.executemany(_media_source_insert, media_sources)
+            media_sources.clear()
+
+    while True:
+        kind, *args = requests.get()
+        if kind in ('commit', 'close'):
+            done, result = args
+            if error is None:
+                try:
+                    write_media()
+                    db.commit()
+                except Exception as ex:
+                    error = ex
+            if error is not None:
+                db.rollback()
+                try:
+                    # The tables are created outside of the transaction
+                    for table_name in created_tables:
+                        db.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+                    db.commit()
+                except sqlite3.Error:
+                    pass
+            media_items.clear()
+            media_references.clear()
+            media_sources.clear()
+            result.append((error, list(created_tables) if error is not None else []))
+            created_tables.clear()
+            error = None
+            if kind == 'close':
+                db.close()
+                done.set()
+                return
+            done.set()
+            continue
+        if kind == 'query':
+            done, result, sql, params = args
+            try:
+                if error is None:
+                    try:
+                        write_media()
+                        if autocommit and db.in_transaction:
+                            db.commit()
+                    except Exception as ex:
+                        error = ex
+                cursor = db.cursor()
+                cursor.row_factory = sqlite3.Row
+                result.append((cursor.execute(sql, params).fetchall(), None))
+            except Exception as ex:
+                result.append((None, ex))
+            done.set()
+            continue
+        if error is not None:
+            continue  # The rest of the data of the failed artifact is not written
+        try:
+            if kind == 'media_item':
+                media_items.append(args[0])
+                if len(media_items) >= lava_media_batch_size:
+                    write_media()
+            elif kind == 'media_reference':
+                media_references.append(args[0])
+                if len(media_references) >= lava_media_batch_size:
+                    write_media()
+            elif kind == 'media_source':
+                media_sources.append(args[0])
+                if len(media_sources) >= lava_media_batch_size:
+                    write_media()
+            else:
+                write_media()
+                if kind == 'create_table':
+                    table_name, sql = args
+                    if not db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                      (table_name,)).fetchone():
+                        created_tables.append(table_name)
+                    db.execute(sql)
+                elif kind == 'execute':
+                    db.execute(*args)
+                else:
+                    db.executemany(*args)
+            if autocommit and db.in_transaction:
+                db.commit()
+        except Exception as ex:
+            error = ex
+
+
+def _start_lava_writer(db_path, autocommit=False):
+    """Starts the writer thread of the ingest mode"""
+    global _lava_writer_queue
+
+    _pending_media_items.clear()
+    _pending_media_references.clear()
+    _media_item_ids.clear()
+    _media_reference_ids.clear()
+    _media_source_ids.clear()
+    _lava_writer_queue = queue.Queue()
+    threading.Thread(target=_lava_writer_loop, args=(db_path, _lava_writer_queue, autocommit),
+                     name='lava_writer', daemon=True).start()
+
+
+def _lava_writer_request(kind):
+    """Sends a 'commit' or 'close' request to the writer thread, waits until it is executed and
+    raises the error of the requests executed since the previous commit, whose tables are then
+    removed from the LAVA data"""
+    done = threading.Event()
+    result = []
+    _lava_writer_queue.put((kind, done, result))
+    done.wait()
+    _pending_media_items.clear()
+    _pending_media_references.clear()
+    error, rolled_back_tables = result[0]
+    if error is not None:
+        # Media of the registry may not have been written
+        _media_item_ids.clear()
+        _media_reference_ids.clear()
+        _media_source_ids.clear()
+        _remove_lava_artifacts(rolled_back_tables)
+        raise error
+
+
+def _lava_query(sql, params=()):
+    """Returns the sqlite3.Row of a query, executed by the writer thread in ingest mode so that
+    the data written by the current artifact is seen without committing it"""
+    if not _lava_writer_queue:
+        lava_db.row_factory = sqlite3.Row
+        return lava_db.execute(sql, params).fetchall()
+    done = threading.Event()
+    result = []
+    _lava_writer_queue.put(('query', done, result, sql, params))
+    done.wait()
+    rows, error = result[0]
+    if error is not None:
+        raise error
+    return rows
+
+
+def _remove_lava_artifacts(table_names):
+    """Removes the artifacts stored in tables that were rolled back from the LAVA data"""
+    if not table_names or not lava_data:
+        return
+    for category in list(lava_data["artifacts"]):
+        lava_data["artifacts"][category] = [artifact for artifact in lava_data["artifacts"][category]
+                                            if artifact["tablename"] not in table_names]
+        if not lava_data["artifacts"][category]:
+            del lava_data["artifacts"][category]
+    for module_info in lava_data["meta"]["modules"]:
+        module_info["artifacts"] = [artifact for artifact in module_info["artifacts"]
+                                    if artifact["tablename"] not in table_names]
+
+
+def _lava_execute(sql, params=()):
+    """Executes a write statement, in the writer thread in ingest mode"""
+    if _lava_writer_queue:
+        _lava_writer_queue.put(('execute', sql, params))
+    else:
+        lava_db.execute(sql, params)
+        lava_db.commit()
+
+
+def _lava_create_table(table_name, sql):
+    """Creates a table, in the writer thread in ingest mode"""
+    if _lava_writer_queue:
+        _lava_writer_queue.put(('create_table', table_name, sql))
+    else:
+        lava_db.execute(sql)
+        lava_db.commit()
+
+
+def _lava_executemany(sql, rows):
+    """Executes a write statement for several rows, in the writer thread in ingest mode"""
+    if _lava_writer_queue:
+        _lava_writer_queue.put(('executemany', sql, rows))
+    else:
+        lava_db.executemany(sql, rows)
+        lava_db.commit()
+
+
+def lava_commit():
+    """
+    Commits the data written by the current artifact. In ingest mode, waits until the
+    writer thread has written all the data queued, and raises the error that prevented
+    writing it, if any.
+    """
+
+    if _lava_writer_queue:
+        _lava_writer_request('commit')
+
+
+def lava_sync():
+    """
+    Commits the data written by the current artifact, then writes the data committed to the
+    LAVA database by all the processes to disk, so the artifacts recorded as completed in the
+    run journal afterwards keep their data after a crash of the system. In ingest mode, the
+    commits are not synced: the WAL file is.
+    """
+
+    try:
+        lava_commit()
+    finally:
+        db_path = lava_db.execute('PRAGMA database_list').fetchone()[2]
+        for path in (db_path + '-wal', db_path):
+            try:
+                # Opened for writing as required by os.fsync on Windows, nothing is written
+                with open(path, 'r+b') as f:
+                    os.fsync(f.fileno())
+            except FileNotFoundError:
+                pass
 
 
 def sanitize_sql_name(name):
@@ -105,7 +417,7 @@ def initialize_lava(input_path, output_path, input_type):
     }
 
     db_path = os.path.join(output_path, lava_db_name)
-    lava_db = sqlite3.connect(db_path)
+    lava_db = sqlite3.connect(db_path, check_same_thread=False)
 
     cursor = lava_db.cursor()
     cursor.execute('''CREATE TABLE _lava_media_items (
@@ -124,6 +436,10 @@ def initialize_lava(input_path, output_path, input_type):
                         artifact_name TEXT,
                         name TEXT,
                         FOREIGN KEY (media_item_id) REFERENCES _lava_media_items(id))''')
+    cursor.execute('''CREATE TABLE _lava_media_sources (
+                        source_path TEXT PRIMARY KEY,
+                        media_item_id TEXT,
+                        FOREIGN KEY (media_item_id) REFERENCES _lava_media_items(id))''')
     cursor.execute('''CREATE VIEW _lava_media_info AS
                         SELECT
                             lmr.id as 'media_ref_id',
@@ -140,6 +456,10 @@ def initialize_lava(input_path, output_path, input_type):
                             lmi.is_embedded
                         FROM _lava_media_references as lmr
                         LEFT JOIN _lava_media_items as lmi ON lmr.media_item_id = lmi.id''')
+    lava_db.commit()
+
+    lava_db.execute('PRAGMA journal_mode = WAL')
+    _start_lava_writer(db_path)
 
 
 def lava_process_artifact(
@@ -261,6 +581,21 @@ def lava_process_artifact(
     return sanitized_table_name, object_columns, column_map
 
 
+def lava_set_record_count(category, table_name, record_count):
+    '''
+    Sets the number of records of an artifact processed by lava_process_artifact before its
+    records were counted, when the data of the artifact is streamed.
+    Args:
+        category: The category of the artifact.
+        table_name: The name of the table of the artifact returned by lava_process_artifact.
+        record_count: The number of records in the artifact.
+    '''
+    for artifact in reversed(lava_data["artifacts"].get(category, [])):
+        if artifact["tablename"] == table_name:
+            artifact["record_count"] = record_count
+            return
+
+
 def lava_add_module(module_name, module_status, file_count=None):
     """
     Adds a module to the global lava_data structure.
@@ -307,7 +642,7 @@ def lava_create_sqlite_table(table_name, data):
         return None, None, None
 
     sanitized_table_name = sanitize_sql_name(table_name)
-    cursor = lava_db.cursor()
+    journal_output('lava_table', sanitized_table_name)
 
     columns = []
     column_map = {}
@@ -328,8 +663,7 @@ def lava_create_sqlite_table(table_name, data):
         column_map[sanitized_name] = original_name
 
     columns_sql = ', '.join(columns)
-    cursor.execute(f"CREATE TABLE IF NOT EXISTS {sanitized_table_name} ({columns_sql})")
-    lava_db.commit()
+    _lava_create_table(sanitized_table_name, f"CREATE TABLE IF NOT EXISTS {sanitized_table_name} ({columns_sql})")
 
     return sanitized_table_name, column_map, object_columns
 
@@ -357,8 +691,6 @@ def lava_insert_sqlite_data(table_name, data, object_columns, headers, column_ma
     if not data:
         return
 
-    cursor = lava_db.cursor()
-
     # Use the sanitized column names directly
     sanitized_columns = [sanitize_sql_name(h[0] if isinstance(h, tuple) else h) for h in headers]
 
@@ -388,8 +720,7 @@ def lava_insert_sqlite_data(table_name, data, object_columns, headers, column_ma
         rows_to_insert.append(tuple(processed_row))
 
     # Execute the insert
-    cursor.executemany(query, rows_to_insert)
-    lava_db.commit()
+    _lava_executemany(query, rows_to_insert)
 
 
 def lava_get_media_item(media_id):
@@ -402,10 +733,27 @@ def lava_get_media_item(media_id):
     """
 
     global lava_db
-    cursor = lava_db.cursor()
-    query = f"SELECT * FROM _lava_media_items WHERE id='{media_id}'"
-    return cursor.execute(query).fetchone()
-    # return result.fetchone()
+    if media_id in _pending_media_items:
+        return _pending_media_items[media_id]
+    return lava_db.execute("SELECT * FROM _lava_media_items WHERE id = ?", (media_id,)).fetchone()
+
+
+def lava_media_item_exists(media_id):
+    """
+    Checks if a media item is in the lava database, without querying it when the media
+    item was already inserted or found.
+    Args:
+        media_id (str): The unique identifier of the media item.
+    Returns:
+        bool: True if the media item exists.
+    """
+
+    if media_id in _media_item_ids:
+        return True
+    if lava_get_media_item(media_id):
+        _media_item_ids.add(media_id)
+        return True
+    return False
 
 
 def lava_insert_sqlite_media_item(media_item):
@@ -425,11 +773,6 @@ def lava_insert_sqlite_media_item(media_item):
     """
 
     global lava_db
-    cursor = lava_db.cursor()
-    sql = '''INSERT INTO _lava_media_items
-                ("id", "source_path", "extraction_path", "type", "metadata", "created_at", "updated_at", "is_embedded")
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)'''
-
     params = (
         media_item.id,
         str(media_item.source_path),
@@ -441,8 +784,14 @@ def lava_insert_sqlite_media_item(media_item):
         media_item.is_embedded
     )
 
+    _media_item_ids.add(media_item.id)
+    if _lava_writer_queue:
+        _pending_media_items[media_item.id] = params
+        _lava_writer_queue.put(('media_item', params))
+        return
+
     try:
-        cursor.execute(sql, params)
+        lava_db.execute(_media_item_insert, params)
         lava_db.commit()
     except sqlite3.IntegrityError as e:
         print(str(e))
@@ -458,9 +807,27 @@ def lava_get_media_references(media_ref):
     """
 
     global lava_db
-    cursor = lava_db.cursor()
-    query = f"SELECT * FROM _lava_media_references WHERE id='{media_ref}'"
-    return cursor.execute(query).fetchone()
+    if media_ref in _pending_media_references:
+        return _pending_media_references[media_ref]
+    return lava_db.execute("SELECT * FROM _lava_media_references WHERE id = ?", (media_ref,)).fetchone()
+
+
+def lava_media_reference_exists(media_ref):
+    """
+    Checks if a media reference is in the lava database, without querying it when the
+    media reference was already inserted or found.
+    Args:
+        media_ref (str): The ID of the media reference.
+    Returns:
+        bool: True if the media reference exists.
+    """
+
+    if media_ref in _media_reference_ids:
+        return True
+    if lava_get_media_references(media_ref):
+        _media_reference_ids.add(media_ref)
+        return True
+    return False
 
 
 def lava_insert_sqlite_media_references(media_references):
@@ -479,11 +846,7 @@ def lava_insert_sqlite_media_references(media_references):
     """
 
     global lava_db
-    cursor = lava_db.cursor()
-    sql = '''INSERT INTO _lava_media_references
-                ("id", "media_item_id", "module_name", "artifact_name", "name")
-                VALUES (?, ?, ?, ?, ?)'''
-
+    journal_output('lava_media', media_references.artifact_name)
     params = (
         media_references.id,
         media_references.media_item_id,
@@ -491,7 +854,53 @@ def lava_insert_sqlite_media_references(media_references):
         media_references.artifact_name,
         media_references.name
     )
-    cursor.execute(sql, params)
+    _media_reference_ids.add(media_references.id)
+    if _lava_writer_queue:
+        _pending_media_references[media_references.id] = params
+        _lava_writer_queue.put(('media_reference', params))
+        return
+    lava_db.execute(_media_references_insert, params)
+    lava_db.commit()
+
+
+def lava_get_media_source(source_path):
+    """
+    Retrieves the ID of the media item stored for a source path, without querying the
+    database when the source path was already checked in or found.
+    Args:
+        source_path (str): The source path of the media file.
+    Returns:
+        str or None: The ID of the media item, or None if the source path was not checked in.
+    """
+
+    global lava_db
+    if source_path in _media_source_ids:
+        return _media_source_ids[source_path]
+    row = lava_db.execute("SELECT media_item_id FROM _lava_media_sources WHERE source_path = ?",
+                          (source_path,)).fetchone()
+    if row:
+        _media_source_ids[source_path] = row[0]
+        return row[0]
+    return None
+
+
+def lava_insert_sqlite_media_source(source_path, media_id):
+    """
+    Insert the ID of the media item stored for a source path into the _lava_media_sources
+    table, the manifest of the media files checked in.
+    Args:
+        source_path (str): The source path of the media file.
+        media_id (str): The ID of the media item, the digest of the content of the file.
+    Returns:
+        None
+    """
+
+    global lava_db
+    _media_source_ids[source_path] = media_id
+    if _lava_writer_queue:
+        _lava_writer_queue.put(('media_source', (source_path, media_id)))
+        return
+    lava_db.execute(_media_source_insert, (source_path, media_id))
     lava_db.commit()
 
 
@@ -499,8 +908,9 @@ def lava_get_full_media_info(media_ref_id):
     """
     Retrieves complete media information for a given media reference ID from the LAVA database.
     This function queries the _lava_media_info table to fetch all columns for a specific
-    media item identified by its reference ID. The function uses a global database connection
-    and sets the row factory to sqlite3.Row for dictionary-like access to results.
+    media item identified by its reference ID. In ingest mode, the query is executed by the
+    writer thread, so the media written by the current artifact are found without committing
+    them. The results are sqlite3.Row objects for dictionary-like access.
     Args:
         media_ref_id (str): The unique media reference identifier to look up in the database.
     Returns:
@@ -508,15 +918,28 @@ def lava_get_full_media_info(media_ref_id):
                             None if no matching media_ref_id exists in the database.
     """
 
-    global lava_db
-    lava_db.row_factory = sqlite3.Row
-    cursor = lava_db.cursor()
-    query = f'''
-    SELECT *
-    FROM _lava_media_info
-    WHERE media_ref_id = '{media_ref_id}'
-    '''
-    return cursor.execute(query).fetchone()
+    rows = _lava_query("SELECT * FROM _lava_media_info WHERE media_ref_id = ?", (media_ref_id,))
+    return rows[0] if rows else None
+
+
+def lava_get_full_media_infos(media_ref_ids):
+    """
+    Retrieves complete media information for several media reference IDs, with one query
+    of the _lava_media_info view per lava_media_info_batch_size references.
+    Args:
+        media_ref_ids (iterable): The media reference identifiers to look up, duplicates allowed.
+    Returns:
+        dict: The sqlite3.Row of each media reference found, by media reference ID.
+    """
+
+    media_ref_ids = list(dict.fromkeys(media_ref_ids))
+    media_infos = {}
+    for start in range(0, len(media_ref_ids), lava_media_info_batch_size):
+        batch = media_ref_ids[start:start + lava_media_info_batch_size]
+        placeholders = ', '.join('?' * len(batch))
+        for row in _lava_query(f"SELECT * FROM _lava_media_info WHERE media_ref_id IN ({placeholders})", batch):
+            media_infos[row['media_ref_id']] = row
+    return media_infos
 
 
 def lava_finalize_output(output_path):
@@ -528,7 +951,8 @@ def lava_finalize_output(output_path):
     3. Sorts artifact categories alphabetically
     4. Sorts artifacts within each category alphabetically by name
     5. Saves the LAVA data structure to a JSON file
-    6. Closes the SQLite database connection
+    6. Stops the writer thread, checkpoints the WAL and restores the rollback journal mode
+    7. Closes the SQLite database connection
     Args:
         output_path (str): The directory path where the LAVA JSON output file will be saved
     Global Variables:
@@ -538,7 +962,7 @@ def lava_finalize_output(output_path):
         lava_json_name (str): The filename for the LAVA JSON output file
     """
 
-    global lava_data, lava_db
+    global lava_data, lava_db, _lava_writer_queue
 
     lava_data["processing_status"] = "Complete"
 
@@ -556,5 +980,123 @@ def lava_finalize_output(output_path):
     with open(os.path.join(output_path, lava_json_name), 'w', encoding='utf-8') as f:
         json.dump(lava_data, f, indent=4)
 
+    # Write the remaining data and leave the ingest mode
+    if _lava_writer_queue:
+        _lava_writer_request('close')
+        _lava_writer_queue = None
+        lava_db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        try:
+            lava_db.execute('PRAGMA journal_mode = DELETE')
+        except sqlite3.OperationalError:
+            pass  # Another connection is still open, the database stays in WAL mode
+        lava_db.execute('PRAGMA synchronous = FULL')
+
     # Close the SQLite database
     lava_db.close()
+
+
+def initialize_lava_worker(output_path):
+    """
+    Initializes the LAVA data of a worker process used for parallel artifact processing.
+    The worker shares the SQLite database created by initialize_lava but keeps its own
+    artifacts and modules metadata, which is sent back to the main process with
+    lava_collect_worker_data once an artifact is completed.
+    The writer thread of a worker commits each table creation, data insertion and media
+    batch on its own, so the write lock of the database is never held by a worker for a
+    whole artifact and the workers write concurrently. The tables created by an artifact
+    that failed are still dropped, but the media it checked in are kept.
+    Args:
+        output_path (str): The path to the output folder containing the LAVA database.
+    """
+
+    global lava_data, lava_db
+
+    lava_data = {
+        "modules": [],
+        "artifacts": OrderedDict(),
+        "meta": {
+            "modules": []
+        }
+    }
+
+    db_path = os.path.join(output_path, lava_db_name)
+    lava_db = sqlite3.connect(db_path, timeout=lava_db_timeout, check_same_thread=False)
+    _start_lava_writer(db_path, autocommit=True)
+
+
+def lava_collect_worker_data():
+    """
+    Returns the artifacts and modules metadata gathered by a worker process since the
+    previous call and resets them.
+    Returns:
+        dict: A dictionary with the 'artifacts', 'modules' and 'meta_modules' of the worker.
+    """
+
+    global lava_data
+
+    worker_data = {
+        "artifacts": dict(lava_data["artifacts"]),
+        "modules": lava_data["modules"],
+        "meta_modules": lava_data["meta"]["modules"]
+    }
+    lava_data["artifacts"] = OrderedDict()
+    lava_data["modules"] = []
+    lava_data["meta"]["modules"] = []
+    return worker_data
+
+
+def lava_merge_worker_data(worker_data):
+    """
+    Merges the metadata returned by lava_collect_worker_data into the LAVA data of the
+    main process.
+    Args:
+        worker_data (dict): The data returned by lava_collect_worker_data in a worker process.
+    """
+
+    global lava_data
+
+    for category, artifacts in worker_data["artifacts"].items():
+        lava_data["artifacts"].setdefault(category, []).extend(artifacts)
+
+    lava_data["modules"].extend(worker_data["modules"])
+
+    for worker_module_info in worker_data["meta_modules"]:
+        module_info = next((m for m in lava_data['meta']['modules']
+                            if m['module_name'] == worker_module_info['module_name']), None)
+        if module_info:
+            module_info['artifacts'].extend(worker_module_info['artifacts'])
+        else:
+            lava_data['meta']['modules'].append(worker_module_info)
+
+
+def lava_get_data():
+    """
+    Returns the LAVA data of the main process, saved in the run journal when a plugin is
+    completed so that an interrupted run can be resumed.
+    Returns:
+        dict: The LAVA data.
+    """
+
+    return lava_data
+
+
+def resume_lava(output_path, saved_lava_data):
+    """
+    Reconnects to the LAVA database of an interrupted run and restores the LAVA data
+    saved in its run journal.
+    Args:
+        output_path (str): The path to the output folder containing the LAVA database.
+        saved_lava_data (dict): The LAVA data returned by lava_get_data when the last
+            plugin of the interrupted run was completed.
+    """
+
+    global lava_data, lava_db
+
+    lava_data = saved_lava_data
+    lava_data["processing_status"] = "In Progress"
+    lava_data["artifacts"] = OrderedDict(lava_data["artifacts"])
+
+    db_path = os.path.join(output_path, lava_db_name)
+    lava_db = sqlite3.connect(db_path, check_same_thread=False)
+    lava_db.execute('PRAGMA journal_mode = WAL')
+    _start_lava_writer(db_path)
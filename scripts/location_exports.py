@@ -0,0 +1,269 @@
+"""
+This module provides the location exports of a report. The rows of the artifacts with
+Latitude and Longitude columns are written as they are produced to a KML file and a
+GeoJSON file per artifact in the _KML Exports folder, and stored in the _latlong.db SQLite
+database, so the locations of an artifact are never held in memory.
+
+The columns of the timestamp, latitude and longitude are found once per artifact. When a
+row has no Timestamp value, its first datetime value is used, as before.
+
+The data table of the database keeps its timestamp, latitude, longitude and activity
+columns, latitude and longitude now being REAL, and adds the timestamp in microseconds
+since the epoch in UTC. Each process keeps a single connection to the database. When the
+report is generated, the timestamp and activity indexes are created and the valid
+coordinates are loaded in the data_rtree R*Tree index, keyed by the id of their row, so
+bounding box and time window queries over all the locations don't scan the table. The
+R*Tree stores 32-bit floats rounded outwards: its matches are filtered on the data table
+for exact bounds.
+
+Global Variables:
+    kml_folder_name (str): Name of the location exports folder in the report folder.
+    latlong_db_name (str): Name of the location database in the exports folder.
+    latlong_db_timeout (int): Seconds a process waits for another process to release the
+        database.
+
+Classes:
+    LocationExport: Streams the locations of an artifact to its KML and GeoJSON files and
+        to the location database.
+
+Functions:
+    close_locations: Closes the connection of the process to the location database.
+    finalize_locations: Indexes the location database.
+"""
+
+import json
+import math
+import os
+import re
+import sqlite3
+
+from datetime import datetime
+
+from scripts.run_journal import journal_output
+from scripts.timeline_db import get_timestamp_us
+
+kml_folder_name = '_KML Exports'
+latlong_db_name = '_latlong.db'
+latlong_db_timeout = 600
+
+_latlong_db = None
+_latlong_db_path = None
+# Characters that can't be written in an XML document
+_invalid_xml_characters = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f￾￿]')
+
+_kml_header = '''<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2" xmlns:gx="http://www.google.com/kml/ext/2.2">
+    <Document id="1">
+        <open>1</open>
+'''
+_kml_placemark = '''        <Placemark id="{1}">
+{2}            <description>{3}</description>
+            <Point id="{0}">
+                <coordinates>{4},{5},0.0</coordinates>
+            </Point>
+        </Placemark>
+'''
+_kml_footer = '''    </Document>
+</kml>
+'''
+
+
+def _escape_xml(text):
+    return _invalid_xml_characters.sub('', text.replace('&', '&amp;').replace('<', '&lt;')
+                                       .replace('>', '&gt;').replace('"', '&quot;'))
+
+
+def _get_coordinate(value):
+    try:
+        coordinate = float(value)
+    except (TypeError, ValueError):
+        return None
+    return coordinate if math.isfinite(coordinate) else None
+
+
+def _get_latlong_db(report_folder_base):
+    global _latlong_db, _latlong_db_path
+
+    db_path = os.path.join(report_folder_base, kml_folder_name, latlong_db_name)
+    if _latlong_db and _latlong_db_path == db_path:
+        return _latlong_db
+    close_locations()
+    # The folder and table may be created concurrently by parallel workers
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    _latlong_db = sqlite3.connect(db_path, timeout=latlong_db_timeout, check_same_thread=False)
+    _latlong_db_path = db_path
+    _latlong_db.execute('PRAGMA journal_mode = WAL')
+    _latlong_db.execute('PRAGMA synchronous = NORMAL')
+    _latlong_db.execute('''CREATE TABLE IF NOT EXISTS data(timestamp TEXT, latitude REAL, longitude REAL,
+                           activity TEXT, timestamp_us INTEGER, id INTEGER PRIMARY KEY)''')
+    _latlong_db.commit()
+    return _latlong_db
+
+
+class LocationExport:
+    """
+    Streams the locations of an artifact to its KML and GeoJSON files and to the location
+    database. The files are created with the first location, so an artifact without
+    location has no files.
+    Args:
+        report_folder_base (str): The path of the report folder.
+        activity (str): The name of the artifact.
+        data_headers (list): The names of the columns, with Latitude and Longitude.
+    """
+
+    def __init__(self, report_folder_base, activity, data_headers):
+        self.report_folder_base = report_folder_base
+        self.activity = activity
+        self.kml_path = os.path.join(report_folder_base, kml_folder_name, f'{activity}.kml')
+        self.geojson_path = os.path.join(report_folder_base, kml_folder_name, f'{activity}.geojson')
+        self.kml_file = None
+        self.geojson_file = None
+        self.location_count = 0
+        self.feature_count = 0
+        # The value of a header is the value of its last column, the datetime values are
+        # searched in the order of the first columns of the headers
+        columns = {}
+        for index, header in enumerate(data_headers):
+            columns[header] = index
+        self.latitude_index = columns['Latitude']
+        self.longitude_index = columns['Longitude']
+        self.timestamp_index = columns.get('Timestamp')
+        self.datetime_columns = [(str(header), index) for header, index in columns.items()]
+        self.column_count = len(data_headers)
+
+    def __del__(self):
+        self.close()
+
+    def _open_files(self):
+        os.makedirs(os.path.dirname(self.kml_path), exist_ok=True)
+        journal_output('latlong', self.activity)
+        journal_output('kml', self.kml_path)
+        journal_output('kml', self.geojson_path)
+        self.kml_file = open(self.kml_path, 'w', encoding='utf-8')
+        self.kml_file.write(_kml_header)
+        self.geojson_file = open(self.geojson_path, 'w', encoding='utf-8')
+        self.geojson_file.write('{"type":"FeatureCollection","features":[\n')
+
+    def add_rows(self, data_list):
+        """
+        Writes the rows of the artifact with a location.
+        Args:
+            data_list (list): Rows of the artifact.
+        Returns:
+            int: The number of locations written.
+        """
+        db_rows = []
+        kml_placemarks = []
+        geojson_features = []
+        activity_text = _escape_xml(str(self.activity))
+        for row in data_list:
+            if len(row) < self.column_count:
+                row = list(row) + [None] * (self.column_count - len(row))
+            latitude = row[self.latitude_index]
+            longitude = row[self.longitude_index]
+            if not (latitude and longitude):
+                continue
+            times_header = 'Timestamp'
+            times = row[self.timestamp_index] if self.timestamp_index is not None else 'N/A'
+            if times == 'N/A':
+                for header, index in self.datetime_columns:
+                    if isinstance(row[index], datetime):
+                        times_header = header
+                        times = row[index]
+                        break
+            times_text = str(times)
+            # Like simplekml, the placemark has no name without timestamp
+            name = f'            <name>{_escape_xml(times_text)}</name>\n' if times is not None else ''
+            point_id = 2 * (self.location_count + len(db_rows)) + 2
+            kml_placemarks.append(_kml_placemark.format(
+                point_id, point_id + 1, name,
+                _escape_xml(f'{times_header}: {times_text} - ') + activity_text, longitude, latitude))
+            latitude_value = _get_coordinate(latitude)
+            longitude_value = _get_coordinate(longitude)
+            timestamp = None if times is None else times_text
+            timestamp_us = get_timestamp_us(times)
+            if latitude_value is not None and longitude_value is not None:
+                geojson_features.append(json.dumps({
+                    'type': 'Feature',
+                    'geometry': {'type': 'Point', 'coordinates': [longitude_value, latitude_value]},
+                    'properties': {'name': timestamp, 'description': f'{times_header}: {times_text} - {self.activity}',
+                                   'activity': self.activity, 'timestamp_us': timestamp_us}},
+                    separators=(',', ':')))
+            # The coordinates that are not numbers are kept as text
+            db_rows.append((timestamp, str(latitude) if latitude_value is None else latitude_value,
+                            str(longitude) if longitude_value is None else longitude_value, self.activity,
+                            timestamp_us))
+        if not db_rows:
+            return 0
+
+        if not self.kml_file:
+            self._open_files()
+        self.kml_file.write(''.join(kml_placemarks))
+        if geojson_features:
+            self.geojson_file.write((',\n' if self.feature_count else '') + ',\n'.join(geojson_features))
+            self.feature_count += len(geojson_features)
+        db = _get_latlong_db(self.report_folder_base)
+        with db:
+            db.executemany('INSERT INTO data (timestamp, latitude, longitude, activity, timestamp_us) '
+                           'VALUES (?, ?, ?, ?, ?)', db_rows)
+        self.location_count += len(db_rows)
+        return len(db_rows)
+
+    def close(self):
+        """
+        Completes the KML and GeoJSON files.
+        Returns:
+            int: The number of locations written.
+        """
+        if self.kml_file:
+            self.kml_file.write(_kml_footer)
+            self.kml_file.close()
+            self.kml_file = None
+        if self.geojson_file:
+            self.geojson_file.write('\n]}\n')
+            self.geojson_file.close()
+            self.geojson_file = None
+        return self.location_count
+
+
+def close_locations():
+    """Closes the connection of the process to the location database."""
+    global _latlong_db, _latlong_db_path
+
+    if _latlong_db:
+        _latlong_db.close()
+        _latlong_db = None
+        _latlong_db_path = None
+
+
+def finalize_locations(report_folder_base):
+    """
+    Creates the timestamp and activity indexes of the location database and loads the
+    valid coordinates in its R*Tree index, then closes the connection of the process.
+    Args:
+        report_folder_base (str): The path of the report folder.
+    Returns:
+        bool: True if the R*Tree index was created, False if there are no locations or
+            SQLite has no R*Tree module.
+    """
+    if not os.path.isfile(os.path.join(report_folder_base, kml_folder_name, latlong_db_name)):
+        close_locations()
+        return False
+    db = _get_latlong_db(report_folder_base)
+    try:
+        with db:
+            db.execute('CREATE INDEX IF NOT EXISTS data_timestamp ON data(timestamp_us)')
+            db.execute('CREATE INDEX IF NOT EXISTS data_activity ON data(activity)')
+        try:
+            db.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS data_rtree USING rtree(id, min_latitude, max_latitude,
+                          min_longitude, max_longitude)''')
+        except sqlite3.OperationalError:
+            return False
+        # Rebuilt from the table, whose rows of the plugins rolled back by a resumed run are deleted
+        with db:
+            db.execute('DELETE FROM data_rtree')
+            db.execute('''INSERT INTO data_rtree SELECT id, latitude, latitude, longitude, longitude FROM data
+                          WHERE latitude BETWEEN -90 AND 90 AND longitude BETWEEN -180 AND 180''')
+        return True
+    finally:
+        close_locations()
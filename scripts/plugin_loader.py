@@ -5,6 +5,19 @@ Provides functionality to discover and load modules from the artifacts directory
 It supports both v1 and v2 artifact formats and manages theit metadata through
 the PluginSpec dataclass.
 
+The artifacts are listed from a manifest of the artifacts directory, built by parsing
+the __artifacts_v2__ or __artifacts__ dictionary of each module with ast, without
+executing the modules and their imports. Listing the artifacts, their paths, creating
+profiles and selecting the artifacts to run only use this metadata: a module is imported
+the first time one of its artifacts is executed. The manifest of each module is saved in
+a cache file of the cache folder of the user, and parsed again when the size or the
+modification time of the module changes. The modules whose artifacts dictionary is not
+made of literal values are imported when the artifacts are listed, as before.
+
+The cache file is JSON, so loading it never executes code: the tuples and dicts of the
+manifest are tagged in the file and rebuilt when it is loaded. The manifests with other
+values than JSON values, tuples and dicts are not cached and parsed at each run.
+
 Classes:
     PluginSpec: A frozen dataclass containing artifact metadata including name, module name,
                 category, search paths, callable method, and artifact information.
@@ -12,20 +25,34 @@ Classes:
                   the artifacts directory, extracts artifact definitions, and provides access
                   to loaded artifacts.
 
+Functions:
+    get_default_manifest_cache_folder: Returns the default folder of the cached manifests.
+
 Constants:
     PLUGINPATH: Default path to the artifacts directory, resolved relative to this file's
                 location for PyInstaller compatibility.
+    MANIFEST_VERSION: Version of the format of the cached manifest.
 
 """
 
+import ast
+import hashlib
+import json
+import os
 import pathlib
 import dataclasses
 import typing
 import importlib.util
 
+try:
+    from scripts.files_index import get_default_index_cache_folder
+except ImportError:  # plugin_loader imported alone, by the PyInstaller hook
+    get_default_index_cache_folder = None
+
 # PLUGINPATH = pathlib.Path("./scripts/artifacts")
 # a bit long-winded to make compatible with PyInstaller
 PLUGINPATH = pathlib.Path(__file__).resolve().parent / pathlib.Path("artifacts")
+MANIFEST_VERSION = 2
 
 
 @dataclasses.dataclass(frozen=True)
@@ -40,6 +67,8 @@ class PluginSpec:
         category (str): The category this artifact belongs to.
         search (str): Search pattern used to identify relevant files.
         method (Callable): The callable function that executes the artifact's main logic.
+            For the artifacts listed from the manifest, it imports the module of the
+            artifact when it is first called.
         artifact_info (dict): Dictionary containing metadata and information about artifacts.
     """
 
@@ -51,6 +80,181 @@ class PluginSpec:
     artifact_info: dict  # Add this line to include artifact_info
 
 
+def get_default_manifest_cache_folder():
+    """
+    Returns the default folder of the cached manifests, next to the index files in the
+    cache folder of the user.
+    Returns:
+        str or None: The path of the folder, None if the cache folder is unknown.
+    """
+    if get_default_index_cache_folder is None:
+        return None
+    return os.path.join(os.path.dirname(get_default_index_cache_folder()), 'plugin_manifest')
+
+
+def _encode_manifest_value(value):
+    """Returns a value of a manifest as JSON data, its tuples and dicts being tagged"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, list):
+        return [_encode_manifest_value(item) for item in value]
+    if isinstance(value, tuple):
+        return {'tuple': [_encode_manifest_value(item) for item in value]}
+    if isinstance(value, dict):
+        return {'dict': [[_encode_manifest_value(key), _encode_manifest_value(item)] for key, item in value.items()]}
+    raise TypeError(f'{type(value).__name__} value in the manifest')
+
+
+def _decode_manifest_value(value):
+    """Rebuilds a value of a manifest encoded by _encode_manifest_value"""
+    if isinstance(value, list):
+        return [_decode_manifest_value(item) for item in value]
+    if isinstance(value, dict):
+        if 'tuple' in value:
+            return tuple(_decode_manifest_value(item) for item in value['tuple'])
+        return {_decode_manifest_value(key): _decode_manifest_value(item) for key, item in value['dict']}
+    return value
+
+
+class _FoldStringConcatenation(ast.NodeTransformer):
+    """Replaces the concatenations of string literals by their value, for literal_eval"""
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Add) and isinstance(node.left, ast.Constant) \
+                and isinstance(node.right, ast.Constant) \
+                and isinstance(node.left.value, str) and isinstance(node.right.value, str):
+            return ast.copy_location(ast.Constant(node.left.value + node.right.value), node)
+        return node
+
+
+def _get_module_manifest(py_file: pathlib.Path):
+    """
+    Parses a module of the artifacts directory without executing it.
+    Returns:
+        dict or None: The 'version' of its artifacts dictionary and the 'artifacts', a list
+            of (name, artifact_name, category, search, artifact_info, function_name)
+            tuples, or None if the artifacts dictionary is not made of literal values.
+            The version is None if the module defines no artifacts.
+    """
+    tree = ast.parse(py_file.read_bytes(), str(py_file))
+    values = {}
+    decorated_functions = set()
+    module_names = set()
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            module_names.add(node.name)
+            if node.decorator_list and not isinstance(node, ast.ClassDef):
+                decorated_functions.add(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                module_names.add((alias.asname or alias.name).split('.')[0])
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for target in targets:
+                if isinstance(target, ast.Name):
+                    module_names.add(target.id)
+                    if target.id in ('__artifacts_v2__', '__artifacts__') and node.value is not None:
+                        values[target.id] = node.value
+        else:
+            for child in ast.walk(node):
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                    module_names.add(child.name)
+                elif isinstance(child, (ast.Import, ast.ImportFrom)):
+                    module_names.update((alias.asname or alias.name).split('.')[0] for alias in child.names)
+                elif isinstance(child, ast.Name) and isinstance(child.ctx, ast.Store):
+                    if child.id in ('__artifacts_v2__', '__artifacts__'):
+                        # The artifacts are defined conditionally
+                        return None
+                    module_names.add(child.id)
+
+    try:
+        if '__artifacts_v2__' in values:
+            mod_artifacts = ast.literal_eval(_FoldStringConcatenation().visit(values['__artifacts_v2__']))
+        elif '__artifacts__' in values:
+            artifacts_node = values['__artifacts__']
+            if not isinstance(artifacts_node, ast.Dict):
+                return None
+            mod_artifacts = {}
+            for key, value in zip(artifacts_node.keys, artifacts_node.values):
+                if not isinstance(value, ast.Tuple) or len(value.elts) != 3 \
+                        or not isinstance(value.elts[2], ast.Name):
+                    return None
+                mod_artifacts[ast.literal_eval(key)] = (ast.literal_eval(value.elts[0]),
+                                                        ast.literal_eval(value.elts[1]), value.elts[2].id)
+        else:
+            return {'version': None, 'artifacts': []}
+    except (ValueError, TypeError, SyntaxError, RecursionError):
+        return None
+    if not isinstance(mod_artifacts, dict) or not mod_artifacts:
+        # An empty __artifacts_v2__ falls back to __artifacts__ when the module is imported
+        return None
+
+    artifacts = []
+    for name, artifact in mod_artifacts.items():
+        if '__artifacts_v2__' in values:
+            if name in decorated_functions:
+                function_name = name
+            elif artifact.get('function') in module_names:
+                function_name = artifact.get('function')
+            else:
+                function_name = None
+            artifacts.append((name, artifact.get('name'), artifact.get('category'), artifact.get('paths'),
+                              artifact, function_name))
+        else:
+            category, search, function_name = artifact
+            artifacts.append((name, name, category, search, {'category': category, 'paths': search}, function_name))
+    return {'version': 2 if '__artifacts_v2__' in values else 1, 'artifacts': artifacts}
+
+
+def _get_artifact_function(mod, name, artifact):
+    """Returns the function of a v2 artifact of an imported module, or None"""
+    # 1. Look for a wrapped function with the name of the dictionary
+    item = getattr(mod, name, None)
+    if callable(item) and hasattr(item, '__wrapped__'):
+        return item
+
+    # 2. If no wrapped function, look for declared function
+    func_name = artifact.get('function')
+    if func_name:
+        return getattr(mod, func_name, None)
+    return None
+
+
+class _LazyArtifactFunction:
+    """
+    The function of an artifact listed from the manifest. The module of the artifact is
+    imported when the function is first called, once for all the artifacts of the module.
+    """
+
+    def __init__(self, loader, py_file, name, function_name, version):
+        self._loader = loader
+        self._py_file = py_file
+        self._name = name
+        self._function_name = function_name
+        self._version = version
+        self._function = None
+
+    def resolve(self):
+        """Imports the module of the artifact if needed and returns its function."""
+        if self._function is None:
+            mod = self._loader.import_module(self._py_file)
+            if self._version == 2:
+                artifact_info = getattr(mod, '__artifacts_v2__')[self._name]
+                function = _get_artifact_function(mod, self._name, artifact_info)
+                if function is None:
+                    raise AttributeError(f"No matching function found for artifact '{self._name}' "
+                                         f"in module '{self._py_file.stem}'")
+                function.artifact_info = artifact_info  # Attach artifact_info to the function
+            else:
+                function = getattr(mod, self._function_name)
+            self._function = function
+        return self._function
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+
 class PluginLoader:
     """
     A class responsible for dynamically loading and managing artifacts from Python files.
@@ -64,13 +268,18 @@ class PluginLoader:
     Args:
         plugin_path (typing.Optional[pathlib.Path]): Optional path to LEAPPs module directory.
             If not provided, defaults to PLUGINPATH.
+        manifest_cache_folder (typing.Optional[str]): Optional folder of the cached manifests.
+            If not provided, defaults to get_default_manifest_cache_folder().
     Raises:
         KeyError: If duplicate function names are found across different modules.
     """
 
-    def __init__(self, plugin_path: typing.Optional[pathlib.Path] = None):
+    def __init__(self, plugin_path: typing.Optional[pathlib.Path] = None,
+                 manifest_cache_folder: typing.Optional[str] = None):
         self._plugin_path = plugin_path or PLUGINPATH
+        self._manifest_cache_folder = manifest_cache_folder or get_default_manifest_cache_folder()
         self._plugins: dict[str, PluginSpec] = {}
+        self._modules = {}
         self._load_plugins()
 
     @staticmethod
@@ -95,51 +304,121 @@ class PluginLoader:
         loader.exec_module(mod)
         return mod
 
+    def import_module(self, path: pathlib.Path):
+        """
+        Returns the module of a file of the artifacts directory, loaded once by the loader.
+        Args:
+            path (pathlib.Path): The file path to the Python module.
+        Returns:
+            module: The module, executed lazily upon first attribute access.
+        """
+        if path not in self._modules:
+            self._modules[path] = PluginLoader.load_module_lazy(path)
+        return self._modules[path]
+
+    def _get_manifest_cache_path(self):
+        if not self._manifest_cache_folder:
+            return None
+        folder_hash = hashlib.sha256(str(self._plugin_path.resolve()).encode('utf-8', 'surrogateescape'))
+        return os.path.join(self._manifest_cache_folder, f'{folder_hash.hexdigest()[:16]}.json')
+
+    def _get_manifests(self, py_files):
+        """Returns the manifests of the modules, parsed again if their file changed"""
+        cache_path = self._get_manifest_cache_path()
+        cached = {}
+        cached_modules = None
+        if cache_path and os.path.isfile(cache_path):
+            try:
+                with open(cache_path, 'r', encoding='utf-8') as cache_file:
+                    cache_data = json.load(cache_file)
+                if cache_data['version'] == MANIFEST_VERSION:
+                    cached_modules = cache_data['modules']
+                    cached = {name: (mtime_ns, size, _decode_manifest_value(manifest))
+                              for name, (mtime_ns, size, manifest) in cached_modules.items()}
+            except Exception:
+                cached = {}
+                cached_modules = None
+
+        entries = {}
+        for py_file in py_files:
+            file_stat = py_file.stat()
+            entry = cached.get(py_file.name)
+            if not entry or entry[:2] != (file_stat.st_mtime_ns, file_stat.st_size):
+                try:
+                    manifest = _get_module_manifest(py_file)
+                except (SyntaxError, ValueError):
+                    manifest = None
+                entry = (file_stat.st_mtime_ns, file_stat.st_size, manifest)
+            entries[py_file.name] = entry
+
+        modules = {}
+        for name, (mtime_ns, size, manifest) in entries.items():
+            try:
+                modules[name] = [mtime_ns, size, _encode_manifest_value(manifest)]
+            except TypeError:
+                pass  # the module is parsed again by the next run
+        if cache_path and modules != cached_modules:
+            try:
+                os.makedirs(self._manifest_cache_folder, exist_ok=True)
+                with open(f'{cache_path}.{os.getpid()}.tmp', 'w', encoding='utf-8') as cache_file:
+                    json.dump({'version': MANIFEST_VERSION, 'modules': modules}, cache_file)
+                os.replace(f'{cache_path}.{os.getpid()}.tmp', cache_path)
+            except OSError:
+                pass  # the manifest is parsed again by the next run
+        return {name: entry[2] for name, entry in entries.items()}
+
+    def _get_imported_artifacts(self, py_file):
+        """Imports a module whose artifacts are not in the manifest and returns its artifacts"""
+        mod = self.import_module(py_file)
+        mod_artifacts = getattr(mod, '__artifacts_v2__', None) or getattr(mod, '__artifacts__', None)
+        if mod_artifacts is None:
+            return []  # no artifacts defined in this plugin
+
+        version = 2 if '__artifacts_v2__' in dir(mod) else 1  # determine the version
+
+        artifacts = []
+        for name, artifact in mod_artifacts.items():
+            if version == 2:
+                func = _get_artifact_function(mod, name, artifact)
+                # If no function is found, log the failure
+                if func is None:
+                    print(f"Warning: No matching function found for artifact '{name}' in module '{py_file.stem}'")
+                    continue
+
+                # Store the entire artifact dictionary as artifact_info
+                func.artifact_info = artifact  # Attach artifact_info to the function
+                artifacts.append((name, artifact.get('name'), artifact.get('category'), artifact.get('paths'),
+                                  artifact, func))
+
+            else:
+                # If no v2, then use v1
+                category, search, func = artifact
+                artifacts.append((name, name, category, search, {'category': category, 'paths': search}, func))
+        return artifacts
+
+    def _get_listed_artifacts(self, py_file, manifest):
+        """Returns the artifacts of the manifest of a module, without importing it"""
+        artifacts = []
+        for name, artifact_name, category, search, artifact_info, function_name in manifest['artifacts']:
+            if function_name is None:
+                print(f"Warning: No matching function found for artifact '{name}' in module '{py_file.stem}'")
+                continue
+            func = _LazyArtifactFunction(self, py_file, name, function_name, manifest['version'])
+            artifacts.append((name, artifact_name, category, search, artifact_info, func))
+        return artifacts
+
     def _load_plugins(self):
         artifact_names = {}
-        for py_file in self._plugin_path.glob("*.py"):
-            mod = PluginLoader.load_module_lazy(py_file)
-            mod_artifacts = getattr(mod, '__artifacts_v2__', None) or getattr(mod, '__artifacts__', None)
-            if mod_artifacts is None:
-                continue  # no artifacts defined in this plugin
-
-            version = 2 if '__artifacts_v2__' in dir(mod) else 1  # determine the version
-
-            for name, artifact in mod_artifacts.items():
-                if version == 2:
-                    category = artifact.get('category')
-                    search = artifact.get('paths')
-                    artifact_name = artifact.get('name')
-                    func = None
-                    # 1. Look for a wrapped function with the name of the dictionary
-                    for item_name in dir(mod):
-                        item = getattr(mod, item_name)
-                        if callable(item) and item_name == name and hasattr(item, '__wrapped__'):
-                            func = item
-                            break
-
-                    # 2. If no wrapped function, look for declared function
-                    if func is None:
-                        func_name = artifact.get('function')
-                        if func_name:
-                            func = getattr(mod, func_name, None)
-
-                    # 3. If neither above work, log the failure
-                    if func is None:
-                        print(f"Warning: No matching function found for artifact '{name}' in module '{py_file.stem}'")
-                        continue
-
-                    # Store the entire artifact dictionary as artifact_info
-                    artifact_info = artifact
-                    if func:
-                        func.artifact_info = artifact_info  # Attach artifact_info to the function
-
-                else:
-                    # 4. If no v2, then use v1
-                    artifact_name = name
-                    category, search, func = artifact
-                    artifact_info = {'category': category, 'paths': search}
+        py_files = list(self._plugin_path.glob("*.py"))
+        manifests = self._get_manifests(py_files)
+        for py_file in py_files:
+            manifest = manifests[py_file.name]
+            if manifest is None:
+                artifacts = self._get_imported_artifacts(py_file)
+            else:
+                artifacts = self._get_listed_artifacts(py_file, manifest)
 
+            for name, artifact_name, category, search, artifact_info, func in artifacts:
                 if name in self._plugins:
                     raise KeyError(f"Duplicate plugin: '{name}' in module '{py_file.stem}'")
                 if artifact_name in artifact_names:
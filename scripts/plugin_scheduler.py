@@ -0,0 +1,299 @@
+"""
+Plugin scheduler module for running artifact plugins in parallel.
+
+Builds a dependency graph of the selected artifacts and executes the ones whose
+dependencies are completed in a pool of worker processes. The HTML, TSV, timeline
+and KML outputs are written by the workers in their own files or in SQLite databases
+shared with a busy timeout, while the LAVA metadata, the device information and the
+artifact icons gathered by each worker are sent back and merged into the main process.
+The workers record their outputs in the run journal, the main process records the start
+and the completion of the plugins.
+
+Dependencies handled by the graph:
+    - last_build must be completed before any other artifact as it sets the iOS version.
+    - logarchive -> logarchive_artifacts -> the other Unified Logs artifacts, each of them
+      only being executed if the table of its predecessor exists in the LAVA database.
+    - Artifacts without search paths ('paths': None) read '_lava_artifacts.db' and are
+      executed once all the artifacts with search paths are completed.
+
+Functions:
+    build_plugin_graph: Returns the dependencies of each plugin to execute.
+    run_plugins_parallel: Executes the plugins in a pool of worker processes.
+"""
+
+import concurrent.futures
+import io
+import multiprocessing
+import os
+import traceback
+import typing
+
+from collections import OrderedDict
+from concurrent.futures.process import BrokenProcessPool
+
+import scripts.plugin_loader as plugin_loader
+from scripts.context import Context
+from scripts.ilapfuncs import GuiWindow, OutputParameters, iOS, logfunc, identifiers, icons, \
+    lava_only_artifacts, does_table_exist_in_db
+from scripts.lavafuncs import initialize_lava_worker, lava_collect_worker_data, lava_merge_worker_data, \
+    lava_db_name, lava_commit
+from scripts.run_journal import initialize_run_journal_worker, journal_plugin_started, set_journal_plugin
+
+UNIFIED_LOGS_MODULE = 'logarchive'
+
+# Worker process globals, set by _init_worker
+_worker_loader = None
+_worker_seeker = None
+
+
+def get_unified_logs_plugins(loader: plugin_loader.PluginLoader):
+    """
+    Returns the names of the Unified Logs artifacts executed from the logarchive table,
+    logarchive_artifacts excluded.
+    """
+    return [plugin.name for plugin in loader.plugins
+            if plugin.module_name == UNIFIED_LOGS_MODULE
+            and plugin.name not in ('logarchive', 'logarchive_artifacts')]
+
+
+def build_plugin_graph(plugins: typing.Sequence[plugin_loader.PluginSpec], loader: plugin_loader.PluginLoader):
+    """
+    Builds the dependency graph of the plugins to execute.
+    Args:
+        plugins: The selected plugins, last_build included.
+        loader: The plugin loader, used to add the Unified Logs artifacts after logarchive.
+    Returns:
+        tuple: A tuple containing:
+            - OrderedDict: plugin name -> set of the plugin names it depends on.
+            - dict: plugin name -> table that must exist in the LAVA database for the plugin
+              to be executed.
+    """
+    graph = OrderedDict((plugin.name, set()) for plugin in plugins)
+    required_tables = {}
+
+    if 'logarchive' in graph:
+        graph['logarchive_artifacts'] = {'logarchive'}
+        required_tables['logarchive_artifacts'] = 'logarchive'
+        for unified_log_artifact in get_unified_logs_plugins(loader):
+            graph[unified_log_artifact] = {'logarchive_artifacts'}
+            required_tables[unified_log_artifact] = 'logarchive_artifacts'
+
+    search_plugins = [name for name in graph if loader[name].search is not None]
+    for name, dependencies in graph.items():
+        if loader[name].search is None and name not in required_tables:
+            dependencies.update(search_plugins)
+        if name != 'last_build' and 'last_build' in graph:
+            dependencies.add('last_build')
+
+    return graph, required_tables
+
+
+def _init_worker(output_params, screen_output_paths, seeker):
+    """Initializes the globals of a worker process"""
+    global _worker_loader, _worker_seeker
+
+    GuiWindow.window_handle = None
+    OutputParameters.screen_output_file_path, OutputParameters.screen_output_file_path_devinfo, \
+        OutputParameters.screen_output_file_path_lava_only = screen_output_paths
+    Context.set_output_params(output_params)
+    initialize_lava_worker(output_params.output_folder_base)
+    initialize_run_journal_worker(output_params.output_folder_base)
+    _worker_loader = plugin_loader.PluginLoader()
+    _worker_seeker = seeker
+
+
+def _run_plugin_in_worker(plugin_name, files_found, category_folder, file_infos, wrap_text, time_offset,
+                          os_version, installed_os_version):
+    """Executes a plugin in a worker process and returns the data to merge in the main process"""
+    set_journal_plugin(plugin_name)
+    identifiers.clear()
+    icons.clear()
+    lava_only_artifacts.clear()
+    if os_version:
+        iOS.set_version(os_version)
+    if installed_os_version:
+        Context.set_installed_os_version(installed_os_version)
+    _worker_seeker.file_infos.update(file_infos)
+
+    plugin = _worker_loader[plugin_name]
+    completed = True
+    try:
+        plugin.method(files_found, category_folder, _worker_seeker, wrap_text, time_offset)
+    except Exception as ex:
+        logfunc('Reading {} artifact had errors!'.format(plugin.name))
+        logfunc('Error was {}'.format(str(ex)))
+        logfunc('Exception Traceback: {}'.format(traceback.format_exc()))
+        completed = False
+    try:
+        lava_commit()
+    except Exception as ex:
+        logfunc('Writing the LAVA data of {} had errors!'.format(plugin.name))
+        logfunc('Error was {}'.format(str(ex)))
+        completed = False
+
+    return {
+        'completed': completed,
+        'lava': lava_collect_worker_data(),
+        'identifiers': dict(identifiers),
+        'icons': dict(icons),
+        'lava_only_artifacts': dict(lava_only_artifacts),
+        'os_version': iOS.get_version(),
+        'installed_os_version': Context.get_installed_os_version()
+    }
+
+
+def _merge_worker_result(result):
+    """Merges the data returned by _run_plugin_in_worker into the main process"""
+    lava_merge_worker_data(result['lava'])
+
+    for category, values in result['identifiers'].items():
+        category_values = identifiers.setdefault(category, {})
+        for label, value in values.items():
+            if label not in category_values:
+                category_values[label] = value
+                continue
+            existing = category_values[label]
+            existing = existing if isinstance(existing, list) else [existing]
+            existing.extend(value if isinstance(value, list) else [value])
+            category_values[label] = existing
+
+    for category, artifact_icons in result['icons'].items():
+        icons.setdefault(category, {}).update(artifact_icons)
+
+    for category, artifacts in result['lava_only_artifacts'].items():
+        lava_only_artifacts.setdefault(category, []).extend(artifacts)
+
+    if result['os_version']:
+        iOS.set_version(result['os_version'])
+    if result['installed_os_version']:
+        Context.set_installed_os_version(result['installed_os_version'])
+
+
+def run_plugins_parallel(plugins, loader, seeker, workers, prepare_plugin, out_params, wrap_text, time_offset,
+                         completed_plugins=frozenset(), checkpoint=None):
+    """
+    Executes the plugins in a pool of worker processes, following their dependencies.
+    last_build is executed in the main process so the iOS version is known before the
+    workers are started.
+    Args:
+        plugins: The selected plugins, last_build included.
+        loader: The plugin loader.
+        seeker: The seeker of the extraction. It must be picklable.
+        workers (int): The number of worker processes.
+        prepare_plugin (Callable): Function searching the files of a plugin and creating its
+            report folder. Returns a (files_found, category_folder) tuple or None if the plugin
+            must not be executed.
+        out_params: The OutputParameters of the run.
+        wrap_text: The wrap_text parameter of the plugins.
+        time_offset: The timezone parameter of the plugins.
+        completed_plugins: The plugins completed before a resumed run was interrupted, which are
+            not executed again.
+        checkpoint (Callable): Function recording in the run journal that plugins are completed.
+            Called with the list of the completed plugin names.
+    """
+    graph, required_tables = build_plugin_graph(plugins, loader)
+    lava_db_path = os.path.join(out_params.output_folder_base, lava_db_name)
+    total = len(graph)
+    done = {name for name in graph if name in completed_plugins}
+    started = len(done)
+    running = {}
+
+    def start_plugin(name):
+        nonlocal started
+        started += 1
+        plugin = loader[name]
+        journal_plugin_started(name)
+        logfunc()
+        logfunc('[{}/{}] {} [{}] artifact started'.format(started, total, plugin.name, plugin.module_name))
+        if name in required_tables:
+            return [lava_db_path], os.path.join(out_params.output_folder_base, '_HTML', plugin.category)
+        return prepare_plugin(plugin)
+
+    def complete_plugin(name, log_completion=True):
+        plugin = loader[name]
+        done.add(name)
+        if checkpoint:
+            checkpoint([name])
+        GuiWindow.SetProgressBar(len(done), total)
+        if log_completion:
+            logfunc('{} [{}] artifact completed'.format(plugin.name, plugin.module_name))
+
+    if 'last_build' in graph and 'last_build' not in done:
+        prepared = start_plugin('last_build')
+        if prepared:
+            files_found, category_folder = prepared
+            try:
+                loader['last_build'].method(files_found, category_folder, seeker, wrap_text, time_offset)
+            except Exception as ex:
+                logfunc('Reading {} artifact had errors!'.format('last_build'))
+                logfunc('Error was {}'.format(str(ex)))
+                logfunc('Exception Traceback: {}'.format(traceback.format_exc()))
+        else:
+            logfunc("No file found")
+        complete_plugin('last_build')
+
+    screen_output_paths = (OutputParameters.screen_output_file_path,
+                           OutputParameters.screen_output_file_path_devinfo,
+                           OutputParameters.screen_output_file_path_lava_only)
+
+    def new_pool():
+        logfunc(f'Starting {workers} worker processes')
+        # Workers are spawned rather than forked so they never inherit the open SQLite connections
+        # of the main process. The seeker is sent once to each worker, the file infos of each plugin
+        # are sent with it.
+        return concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                      mp_context=multiprocessing.get_context('spawn'),
+                                                      initializer=_init_worker,
+                                                      initargs=(out_params, screen_output_paths, seeker))
+
+    pool = new_pool()
+    try:
+        while len(done) < total:
+            for name, dependencies in graph.items():
+                if name in done or name in running.values() or not dependencies <= done:
+                    continue
+                if name in required_tables and not does_table_exist_in_db(lava_db_path, required_tables[name]):
+                    # Same as sequential processing: skipped when its predecessor did not produce data
+                    complete_plugin(name, log_completion=False)
+                    continue
+                prepared = start_plugin(name)
+                if not prepared:
+                    logfunc("No file found")
+                    complete_plugin(name)
+                    continue
+                files_found, category_folder = prepared
+                file_infos = {path: seeker.file_infos[path] for path in files_found if path in seeker.file_infos}
+                future = pool.submit(_run_plugin_in_worker, name, files_found, category_folder, file_infos,
+                                     wrap_text, time_offset, iOS.get_version(),
+                                     Context.get_installed_os_version())
+                running[future] = name
+
+            if not running:
+                continue
+
+            finished, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            pool_broken = False
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    _merge_worker_result(future.result())
+                except BrokenProcessPool:
+                    logfunc(f'A worker process terminated abruptly while processing {name} artifact!')
+                    pool_broken = True
+                except Exception as ex:
+                    logfunc('Reading {} artifact had errors!'.format(name))
+                    logfunc('Error was {}'.format(str(ex)))
+                    temp_file = io.StringIO()
+                    traceback.print_exc(file=temp_file)
+                    logfunc(temp_file.getvalue())
+                    temp_file.close()
+                complete_plugin(name)
+            if pool_broken:
+                for future, name in running.items():
+                    logfunc(f'A worker process terminated abruptly while processing {name} artifact!')
+                    complete_plugin(name)
+                running.clear()
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = new_pool()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
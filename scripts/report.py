@@ -1,4 +1,5 @@
 import html
+import json
 import os
 from pathlib import Path
 import shutil
@@ -63,6 +64,21 @@ def get_search_mode_categories():
 # get them populated
 search_set = get_search_mode_categories()
 
+def walk_html_folder(html_folder):
+    '''Walks the folders of the pages, without the static assets and the media files'''
+    for root, dirs, files in os.walk(html_folder):
+        if root == html_folder:
+            dirs[:] = [folder for folder in dirs if folder not in ('_elements', 'media')]
+        yield root, dirs, files
+
+def write_sidebar_script(html_folder, nav_list_data):
+    '''Writes the sidebar data included by all the pages'''
+    sidebar_script_path = os.path.join(html_folder, sidebar_script_name)
+    temp_path = f'{sidebar_script_path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w', encoding='utf8') as sidebar_file:
+        sidebar_file.write(sidebar_script.format(json.dumps(nav_list_data)))
+    os.replace(temp_path, sidebar_script_path)
+
 
 def generate_report(reportfolderbase, time_in_secs, time_HMS, extraction_type, image_input_path, casedata, profile_filename, icons, lava_only):
     control = None
@@ -85,8 +101,9 @@ def generate_report(reportfolderbase, time_in_secs, time_HMS, extraction_type, i
     nav_list_data = side_heading.format('Saved Reports') + list_item.format('', 'index.html', 'home', 'Report Home')
     # Get all files
     side_list = OrderedDict() # { Category1 : [path1, path2, ..], Cat2:[..] } Dictionary containing paths as values, key=category
+    html_folder = os.path.join(reportfolderbase, '_HTML')
 
-    for root, dirs, files in sorted(os.walk(reportfolderbase)):
+    for root, dirs, files in sorted(walk_html_folder(html_folder)):
         files = sorted(files)
         for file in files:
             if file.startswith('._'):
@@ -111,24 +128,25 @@ def generate_report(reportfolderbase, time_in_secs, time_HMS, extraction_type, i
                     nav_list_data += list_item.format('', tail.replace(".temphtml", ".html").replace(" ", "_"), 
                                                       icon, filename.replace("_", " "))
 
-    # Now that we have all the file paths, start writing the files
+    # The pages include the sidebar data, they are final as written and only have to be moved
+    write_sidebar_script(html_folder, nav_list_data)
 
     for category, path_list in side_list.items():
         for path in path_list:
             old_filename = os.path.basename(path)
             filename = old_filename.replace(".temphtml", ".html").replace(" ", "_")
-            # search for it in nav_list_data, then mark that one as 'active' tab
-            active_nav_list_data = mark_item_active(nav_list_data, filename) + nav_bar_script
-            artifact_data = get_file_content(path)
-
-            # Now write out entire html page for artifact
-            f = open(os.path.join(reportfolderbase, '_HTML', filename), 'w', encoding='utf8')
-            artifact_data = insert_sidebar_code(artifact_data, active_nav_list_data, path)
-            f.write(artifact_data)
-            f.close()
-
-            # Now delete .temphtml
-            os.remove(path)
+
+            # Move the data shards of its tables next to the page
+            data_folder_name = filename[:-len(".html")] + "_data"
+            data_folder = os.path.join(os.path.dirname(path), data_folder_name)
+            if os.path.isdir(data_folder):
+                html_data_folder = os.path.join(html_folder, data_folder_name)
+                if os.path.isdir(html_data_folder):
+                    shutil.rmtree(html_data_folder)
+                shutil.move(data_folder, html_data_folder)
+
+            # Now rename .temphtml
+            os.replace(path, os.path.join(html_folder, filename))
             # If dir is empty, delete it
             try:
                 os.rmdir(os.path.dirname(path))
@@ -136,8 +154,8 @@ def generate_report(reportfolderbase, time_in_secs, time_HMS, extraction_type, i
                 pass # Perhaps it was not empty!
 
     # Create index.html's page content
-    create_index_html(reportfolderbase, time_in_secs, time_HMS, extraction_type, image_input_path, nav_list_data, casedata, profile_filename, lava_only)
-    elements_folder = os.path.join(reportfolderbase, '_HTML', '_elements')
+    create_index_html(reportfolderbase, time_in_secs, time_HMS, extraction_type, image_input_path, casedata, profile_filename, lava_only)
+    elements_folder = os.path.join(html_folder, '_elements')
     __location__ = os.path.dirname(os.path.abspath(__file__))
 
     def copy_no_perm(src, dst, *, follow_symlinks=True):
@@ -159,7 +177,7 @@ def get_file_content(path):
     f.close()
     return data
 
-def create_index_html(reportfolderbase, time_in_secs, time_HMS, extraction_type, image_input_path, nav_list_data, casedata, profile_filename, lava_only):
+def create_index_html(reportfolderbase, time_in_secs, time_HMS, extraction_type, image_input_path, casedata, profile_filename, lava_only):
     '''Write out the index.html page to the report folder'''
     case_list = []
     agency_logo_mimetype = ''
@@ -237,14 +255,12 @@ def create_index_html(reportfolderbase, time_in_secs, time_HMS, extraction_type,
     page_title = 'iLEAPP Report'
     body_heading = 'iOS Logs, Events, And Plists Parser'
     body_description = 'iLEAPP is an open source project that aims to parse every known iOS artifact for the purpose of forensic analysis.'
-    active_nav_list_data = mark_item_active(nav_list_data, filename) + nav_bar_script
-
     html_reportfolderbase = Path(reportfolderbase).joinpath('_HTML')
     html_reportfolderbase.mkdir(exist_ok=True)
     with html_reportfolderbase.joinpath(filename).open('w', encoding='utf8') as f:
         f.write(page_header.format(page_title))
         f.write(body_start.format(f"iLEAPP {ileapp_version}"))
-        f.write(body_sidebar_setup + active_nav_list_data + body_sidebar_trailer)
+        f.write(body_sidebar_setup + body_sidebar_dynamic_data_include + nav_bar_script + body_sidebar_trailer)
         f.write(body_main_header + body_main_data_title.format(body_heading, body_description))
         f.write(content)
         f.write(thank_you_note)
@@ -320,22 +336,3 @@ def generate_key_val_table_without_headings(title, data_list, agency_logo_mimety
     code += table_footer_code
 
     return code
-
-def insert_sidebar_code(data, sidebar_code, filename):
-    pos = data.find(body_sidebar_dynamic_data_placeholder)
-    if pos < 0:
-        logfunc(f'Error, could not find {body_sidebar_dynamic_data_placeholder} in file {filename}')
-        return data
-    else:
-        ret = data[0: pos] + sidebar_code + data[pos + len(body_sidebar_dynamic_data_placeholder):]
-        return ret
-
-def mark_item_active(data, itemname):
-    '''Finds itemname in data, then marks that node as active. Return value is changed data'''
-    pos = data.find(f'" href="{itemname}"')
-    if pos < 0:
-        logfunc(f'Error, could not find {itemname} in {data}')
-        return data
-    else:
-        ret = data[0: pos] + " active" + data[pos:]
-        return ret
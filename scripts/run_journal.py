@@ -0,0 +1,336 @@
+"""
+This module provides the run journal of a report, which records the progress of
+crunch_artifacts so that an interrupted run can be resumed with --resume.
+
+The journal is a SQLite database in the report folder. It contains the parameters of
+the run, the status and record count of each plugin and the outputs each plugin
+writes. An output is recorded before it is written, so the partial outputs of the
+plugins interrupted by a crash can be rolled back: their HTML, TSV, KML and columnar
+export files are deleted, their rows are deleted from the timeline and location
+databases and their tables and media references are deleted from the LAVA database.
+The media items no longer referenced by any artifact are then deleted with their files.
+
+When a plugin is completed, the state of the run kept in memory (LAVA metadata,
+device information, icons...) is saved in the journal in the same transaction, so it
+can be restored to generate the final report of a resumed run.
+
+Global Variables:
+    run_journal_name (str): Name of the journal database in the report folder.
+    run_journal (sqlite3.Connection): Connection to the journal of the current run.
+    current_plugin (str): Name of the plugin whose outputs are being written.
+
+Functions:
+    has_run_journal: Returns True if a report folder has a run journal.
+    get_run_params: Returns the parameters of the run recorded in a journal.
+    is_run_complete: Returns True if the run recorded in a journal is complete.
+    open_run_journal: Creates the journal of a new run or reopens the journal of a run.
+    initialize_run_journal_worker: Connects a worker process to the journal.
+    close_run_journal: Closes the journal of the current run.
+    journal_plugin_started: Records that a plugin is started.
+    set_journal_plugin: Sets the plugin whose outputs are recorded in a worker process.
+    journal_output: Records an output of the current plugin before it is written.
+    journal_records: Records the number of records found by the current plugin.
+    journal_plugins_completed: Records that plugins are completed with the state of the run.
+    get_completed_plugins: Returns the names of the completed plugins.
+    load_run_state: Returns the state of the run saved with the last completed plugin.
+    rollback_interrupted_plugins: Deletes the outputs of the plugins that were not completed.
+    set_run_complete: Records that the run and its report are complete.
+"""
+
+import json
+import os
+import sqlite3
+
+# Global variables
+run_journal_name = '_run_journal.db'
+run_journal = None
+current_plugin = None
+_journal_folder = None
+_recorded_outputs = set()
+# Seconds a process waits for another process to release the journal
+run_journal_timeout = 600
+
+
+def has_run_journal(output_folder):
+    """
+    Returns True if a report folder has a run journal.
+    Args:
+        output_folder (str): The path of the report folder.
+    Returns:
+        bool: True if the journal exists.
+    """
+    return os.path.isfile(os.path.join(output_folder, run_journal_name))
+
+
+def _get_info(db, key):
+    row = db.execute('SELECT value FROM run_info WHERE key = ?', (key,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def _set_info(db, key, value):
+    db.execute('INSERT OR REPLACE INTO run_info VALUES (?, ?)', (key, json.dumps(value, default=str)))
+
+
+def _read_info(output_folder, key):
+    db = None
+    try:
+        db = sqlite3.connect(os.path.join(output_folder, run_journal_name))
+        return _get_info(db, key)
+    except sqlite3.Error:
+        return None
+    finally:
+        if db:
+            db.close()
+
+
+def get_run_params(output_folder):
+    """
+    Returns the parameters of the run recorded in the journal of a report folder.
+    Args:
+        output_folder (str): The path of the report folder.
+    Returns:
+        dict or None: The parameters of the run, or None if the journal can't be read.
+    """
+    return _read_info(output_folder, 'params')
+
+
+def is_run_complete(output_folder):
+    """
+    Returns True if the run recorded in the journal of a report folder is complete.
+    Args:
+        output_folder (str): The path of the report folder.
+    Returns:
+        bool: True if the run and its report are complete.
+    """
+    return _read_info(output_folder, 'status') == 'Complete'
+
+
+def open_run_journal(output_folder, run_params=None):
+    """
+    Creates the journal of a new run, or reopens the journal of an interrupted run when
+    no parameters are provided.
+    Args:
+        output_folder (str): The path of the report folder.
+        run_params (dict): The parameters of a new run, needed to resume it.
+    """
+    global run_journal, current_plugin, _journal_folder
+
+    current_plugin = None
+    _journal_folder = output_folder
+    _recorded_outputs.clear()
+    run_journal = sqlite3.connect(os.path.join(output_folder, run_journal_name), timeout=run_journal_timeout,
+                                  check_same_thread=False)
+    run_journal.execute('PRAGMA journal_mode = WAL')
+    run_journal.execute('PRAGMA synchronous = FULL')
+    if run_params is not None:
+        run_journal.execute('CREATE TABLE run_info (key TEXT PRIMARY KEY, value TEXT)')
+        run_journal.execute('''CREATE TABLE plugins (name TEXT PRIMARY KEY, status TEXT, records INTEGER)''')
+        run_journal.execute('''CREATE TABLE outputs (plugin TEXT, kind TEXT, name TEXT,
+                               UNIQUE (plugin, kind, name))''')
+        _set_info(run_journal, 'params', run_params)
+        _set_info(run_journal, 'status', 'In Progress')
+        run_journal.commit()
+
+
+def initialize_run_journal_worker(output_folder):
+    """
+    Connects a worker process used for parallel artifact processing to the journal of
+    the run, if there is one.
+    Args:
+        output_folder (str): The path of the report folder.
+    """
+    global run_journal, _journal_folder
+
+    _journal_folder = output_folder
+    _recorded_outputs.clear()
+    if has_run_journal(output_folder):
+        run_journal = sqlite3.connect(os.path.join(output_folder, run_journal_name), timeout=run_journal_timeout,
+                                      check_same_thread=False)
+        run_journal.execute('PRAGMA synchronous = FULL')
+
+
+def close_run_journal():
+    """Closes the journal of the current run."""
+    global run_journal
+
+    if run_journal:
+        run_journal.close()
+        run_journal = None
+
+
+def journal_plugin_started(plugin_name):
+    """
+    Records that a plugin is started. Its outputs are recorded until another plugin is
+    started.
+    Args:
+        plugin_name (str): The name of the plugin.
+    """
+    set_journal_plugin(plugin_name)
+    if run_journal:
+        run_journal.execute("INSERT OR REPLACE INTO plugins VALUES (?, 'started', NULL)", (plugin_name,))
+        run_journal.commit()
+
+
+def set_journal_plugin(plugin_name):
+    """
+    Sets the plugin whose outputs are recorded, without recording that it is started.
+    Used in the worker processes, the main process records the start of the plugins.
+    Args:
+        plugin_name (str): The name of the plugin.
+    """
+    global current_plugin
+
+    current_plugin = plugin_name
+
+
+def journal_output(kind, name):
+    """
+    Records an output of the current plugin before it is written.
+    Args:
+        kind (str): 'html', 'tsv', 'kml' or 'export' for a file, 'timeline' or 'latlong'
+            for the rows of an activity, 'lava_table' for a table of the LAVA database and
+            'lava_media' for the media references of an artifact.
+        name (str): The name of the output, the path of a file.
+    """
+    if not run_journal or not current_plugin:
+        return
+    if kind in ('html', 'tsv', 'kml', 'export'):
+        name = os.path.relpath(name, _journal_folder)
+    if (current_plugin, kind, name) in _recorded_outputs:
+        return
+    _recorded_outputs.add((current_plugin, kind, name))
+    run_journal.execute('INSERT OR IGNORE INTO outputs VALUES (?, ?, ?)', (current_plugin, kind, name))
+    run_journal.commit()
+
+
+def journal_records(count):
+    """
+    Records the number of records found by an artifact of the current plugin.
+    Args:
+        count (int): The number of records.
+    """
+    if not run_journal or not current_plugin:
+        return
+    run_journal.execute('UPDATE plugins SET records = COALESCE(records, 0) + ? WHERE name = ?',
+                        (count, current_plugin))
+    run_journal.commit()
+
+
+def journal_plugins_completed(plugin_names, run_state):
+    """
+    Records that plugins are completed, with the state of the run after their execution.
+    Args:
+        plugin_names (list): The names of the completed plugins.
+        run_state (dict): The state of the run, serializable in JSON.
+    """
+    if not run_journal:
+        return
+    with run_journal:
+        for plugin_name in plugin_names:
+            updated = run_journal.execute("UPDATE plugins SET status = 'completed' WHERE name = ?", (plugin_name,))
+            if not updated.rowcount:
+                run_journal.execute("INSERT INTO plugins VALUES (?, 'completed', NULL)", (plugin_name,))
+        _set_info(run_journal, 'state', run_state)
+
+
+def get_completed_plugins():
+    """
+    Returns the names of the completed plugins of the current run.
+    Returns:
+        set: The names of the plugins.
+    """
+    if not run_journal:
+        return set()
+    return {name for (name,) in run_journal.execute("SELECT name FROM plugins WHERE status = 'completed'")}
+
+
+def load_run_state():
+    """
+    Returns the state of the run saved with the last completed plugin.
+    Returns:
+        dict or None: The state of the run, or None if no plugin was completed.
+    """
+    return _get_info(run_journal, 'state') if run_journal else None
+
+
+def _delete_activity_rows(db_path, activity):
+    if not os.path.isfile(db_path):
+        return
+    db = sqlite3.connect(db_path, timeout=run_journal_timeout)
+    try:
+        db.execute('DELETE FROM data WHERE activity = ?', (activity,))
+        db.commit()
+    except sqlite3.OperationalError:
+        pass
+    finally:
+        db.close()
+
+
+def _delete_unreferenced_media(output_folder, lava_db):
+    """Deletes the media items without media references and their source paths, then the
+    files of the media folders that are not the file of a media item"""
+    lava_db.execute('''DELETE FROM _lava_media_sources WHERE media_item_id IN
+                      (SELECT id FROM _lava_media_items
+                       WHERE id NOT IN (SELECT media_item_id FROM _lava_media_references))''')
+    lava_db.execute('''DELETE FROM _lava_media_items
+                      WHERE id NOT IN (SELECT media_item_id FROM _lava_media_references)''')
+    media_files = {os.path.basename(extraction_path)
+                   for (extraction_path,) in lava_db.execute('SELECT extraction_path FROM _lava_media_items')}
+    for media_folder in (os.path.join(output_folder, 'media'), os.path.join(output_folder, '_HTML', 'media')):
+        if os.path.isdir(media_folder):
+            for entry in os.scandir(media_folder):
+                if entry.is_file() and entry.name not in media_files:
+                    os.remove(entry.path)
+
+
+def rollback_interrupted_plugins(output_folder, lava_db_name):
+    """
+    Deletes the outputs written by the plugins that were started but not completed, and
+    removes them from the journal so they are executed again. Outputs shared with a
+    completed plugin are kept, as are the media items still referenced.
+    Args:
+        output_folder (str): The path of the report folder.
+        lava_db_name (str): The name of the LAVA database in the report folder.
+    Returns:
+        list: The names of the rolled back plugins.
+    """
+    interrupted = [name for (name,) in run_journal.execute("SELECT name FROM plugins WHERE status = 'started'")]
+    if not interrupted:
+        return interrupted
+    completed_outputs = set(run_journal.execute(
+        "SELECT kind, name FROM outputs WHERE plugin IN (SELECT name FROM plugins WHERE status = 'completed')"))
+    lava_db = sqlite3.connect(os.path.join(output_folder, lava_db_name), timeout=run_journal_timeout)
+    try:
+        for plugin_name in interrupted:
+            outputs = run_journal.execute('SELECT kind, name FROM outputs WHERE plugin = ?', (plugin_name,)).fetchall()
+            for kind, name in outputs:
+                if (kind, name) in completed_outputs:
+                    continue
+                if kind in ('html', 'tsv', 'kml', 'export'):
+                    path = os.path.join(output_folder, name)
+                    if os.path.isfile(path):
+                        os.remove(path)
+                elif kind == 'timeline':
+                    _delete_activity_rows(os.path.join(output_folder, '_Timeline', 'tl.db'), name)
+                elif kind == 'latlong':
+                    _delete_activity_rows(os.path.join(output_folder, '_KML Exports', '_latlong.db'), name)
+                elif kind == 'lava_table':
+                    lava_db.execute(f'DROP TABLE IF EXISTS "{name}"')
+                elif kind == 'lava_media':
+                    lava_db.execute('DELETE FROM _lava_media_references WHERE artifact_name = ?', (name,))
+            lava_db.commit()
+            with run_journal:
+                run_journal.execute('DELETE FROM outputs WHERE plugin = ?', (plugin_name,))
+                run_journal.execute('DELETE FROM plugins WHERE name = ?', (plugin_name,))
+        _delete_unreferenced_media(output_folder, lava_db)
+        lava_db.commit()
+    finally:
+        lava_db.close()
+    return interrupted
+
+
+def set_run_complete():
+    """Records that the run and its report are complete."""
+    if run_journal:
+        with run_journal:
+            _set_info(run_journal, 'status', 'Complete')
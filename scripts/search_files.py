@@ -18,17 +18,23 @@ Functions:
     get_itunes_backup_encryption: Checks if iTunes backup is encrypted
     check_itunes_backup_status: Validates iTunes backup status and encryption
     decrypt_itunes_backup: Decrypts encrypted iTunes backups using provided passcode
+    normalize_pattern: Returns the normalized form of a search pattern
 """
 
 import time as timex
 import fnmatch
 import os
+import re
+import sqlite3
 import tarfile
 import hashlib
 import struct
+import concurrent.futures
+import queue
+import threading
 
 from pathlib import Path
-from shutil import copyfile
+from shutil import copyfile, copyfileobj
 from zipfile import ZipFile
 from fnmatch import _compile_pattern
 from functools import lru_cache
@@ -36,8 +42,19 @@ from functools import lru_cache
 # Yes, this is hazmat, but we're only using it to unwrap existing keys
 import cryptography.hazmat.primitives.keywrap as crypt
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-
-
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+try:
+    # Optional, gives random access to gzip compressed tar archives
+    import indexed_gzip
+except ImportError:
+    indexed_gzip = None
+
+
+from scripts.files_index import get_index_path, get_root_fingerprint, load_files_listing, save_files_listing, \
+    load_directories_mtimes, get_archive_fingerprint, get_archive_index_path, load_tar_members, save_tar_members
 from scripts.ilapfuncs import get_plist_file_content, get_plist_content, logfunc, \
     is_platform_windows, open_sqlite_db_readonly, sanitize_file_path
 
@@ -68,6 +85,88 @@ domains = {
 }
 
 
+def normalize_pattern(filepattern):
+    """
+    Returns the normalized form of a search pattern, so that equivalent patterns
+    share the same search results. The case is normalized like the searched paths and
+    consecutive '*' are collapsed, as a single '*' already matches path separators.
+    Args:
+        filepattern (str): The search pattern of an artifact.
+    Returns:
+        str: The normalized pattern.
+    """
+    return re.sub(r'\*{2,}', '*', normcase(filepattern))
+
+
+def _has_wildcard(filepattern):
+    return any(char in filepattern for char in '*?[')
+
+
+def _literal_parts(filepattern):
+    """Yields the parts of a pattern between its wildcards, the bracket expressions being
+    delimited as fnmatch.translate does: a ']' right after '[' or '[!' is part of the set, and
+    a '[' without closing ']' is a literal character"""
+    part = []
+    index, length = 0, len(filepattern)
+    while index < length:
+        char = filepattern[index]
+        index += 1
+        if char in '*?':
+            yield ''.join(part)
+            part = []
+        elif char == '[':
+            end = index
+            if end < length and filepattern[end] == '!':
+                end += 1
+            if end < length and filepattern[end] == ']':
+                end += 1
+            end = filepattern.find(']', end)
+            if end < 0:
+                part.append(char)
+            else:
+                yield ''.join(part)
+                part = []
+                index = end + 1
+        else:
+            part.append(char)
+    yield ''.join(part)
+
+
+def _longest_literal(filepattern):
+    """Returns the longest part of a pattern without wildcard, that any matching path contains"""
+    return max(_literal_parts(filepattern), key=len)
+
+
+def _resolve_patterns(items, filepatterns, resolved, root=normcase("root/")):
+    '''Matches the patterns against root followed by the paths in items in a single pass and
+    stores the matched items of each normalized pattern in resolved. Patterns already in resolved
+    are skipped. Patterns ending with a literal file name are only tested against the paths
+    having that file name, the other patterns only against the paths containing their longest
+    literal part.'''
+    by_basename = {}
+    wildcard_patterns = []
+    for filepattern in set(normalize_pattern(filepattern) for filepattern in filepatterns):
+        if filepattern in resolved:
+            continue
+        resolved[filepattern] = []
+        basename = filepattern.rpartition(os.sep)[2]
+        if basename and not _has_wildcard(basename) and ']' not in basename:
+            by_basename.setdefault(basename, []).append((filepattern, _compile_pattern(filepattern)))
+        else:
+            wildcard_patterns.append((filepattern, _longest_literal(filepattern), _compile_pattern(filepattern)))
+    if not by_basename and not wildcard_patterns:
+        return
+
+    for item in items:
+        candidate = root + normcase(item)
+        for filepattern, pat in by_basename.get(candidate.rpartition(os.sep)[2], ()):
+            if pat(candidate) is not None:
+                resolved[filepattern].append(item)
+        for filepattern, literal, pat in wildcard_patterns:
+            if literal in candidate and pat(candidate) is not None:
+                resolved[filepattern].append(item)
+
+
 # iTunes backups functions
 def get_itunes_backup_type(directory):
     """
@@ -240,8 +339,7 @@ def decrypt_itunes_backup(directory, passcode):
     for _, protection_class_value in protection_classes.items():
         protection_class = protection_class_value
         try:
-            protection_class['Unwrapped'] = crypt.aes_key_unwrap(
-                unwrapped_key, protection_class['WPKY'])
+            protection_class['Unwrapped'] = _unwrap_key(unwrapped_key, protection_class['WPKY'])
         except crypt.InvalidUnwrap:
             logfunc("Could not unwrap a protection class key, likely due to an incorrect passcode. Exiting.")
             return None, "Incorrect password"
@@ -252,12 +350,34 @@ def decrypt_itunes_backup(directory, passcode):
         return None, "Could not find protection class for Manifest.db"
 
     manifest_protection_class = protection_classes[manifest_key_class]
-    unwrapped_manifest_key = crypt.aes_key_unwrap(manifest_protection_class["Unwrapped"], manifest_wrapped_key)
+    unwrapped_manifest_key = _unwrap_key(manifest_protection_class["Unwrapped"], manifest_wrapped_key)
 
     logfunc(f"Manifest.db was successfully decrypted with passcode {passcode}")
     return (protection_classes, unwrapped_manifest_key), "Decryption successful"
 
 
+def _unwrap_key(wrapping_key, wrapped_key):
+    '''Returns the unwrapped key'''
+    return crypt.aes_key_unwrap(wrapping_key, wrapped_key)
+
+
+def _decrypt_file(src_path, dst_path, key, size=None, chunk_size=1024 * 1024):
+    '''Decrypts src_path to dst_path by chunks with AES-CBC and the 0'd out 16-byte IV used by Apple.
+    Only the first size bytes are written when size is given, so the padding is dropped.'''
+    decryptor = Cipher(algorithms.AES(key), modes.CBC(b'\x00' * 16)).decryptor()
+    remaining = size
+    with open(src_path, "rb") as src_file, open(dst_path, "wb") as dst_file:
+        while remaining is None or remaining > 0:
+            chunk = src_file.read(chunk_size)
+            decrypted_chunk = decryptor.update(chunk) if chunk else decryptor.finalize()
+            if remaining is not None:
+                decrypted_chunk = decrypted_chunk[:remaining]
+                remaining -= len(decrypted_chunk)
+            dst_file.write(decrypted_chunk)
+            if not chunk:
+                break
+
+
 class FileInfo:
     """
     A class to store file metadata information.
@@ -282,10 +402,59 @@ class FileSeekerBase:
     def search(self, filepattern, return_on_first_hit=False):
         '''Returns a list of paths for files/folders that matched'''
 
+    def resolve_patterns(self, filepatterns):
+        '''Matches several patterns at once so that later searches do not rescan the files listing'''
+
     def cleanup(self):
         '''close any open handles'''
 
 
+# ioctl request cloning a whole file on Linux (Btrfs, XFS, ...), from linux/fs.h
+FICLONE = 0x40049409
+evidence_access_modes = ('copy', 'hardlink', 'reflink', 'inplace')
+sqlite_sidecar_suffixes = ('-wal', '-shm', '-journal')
+
+
+def _reflink_file(src, dst):
+    '''Clones src to dst sharing the data blocks of src, raises OSError if not supported'''
+    if fcntl is None:
+        raise OSError('File cloning is not supported on this platform')
+    with open(src, 'rb') as src_file, open(dst, 'wb') as dst_file:
+        fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+
+
+def _has_sqlite_sidecar_data(path):
+    '''Returns True if the -wal or -journal file next to path contains data that SQLite needs to read'''
+    for suffix in ('-wal', '-journal'):
+        try:
+            if os.path.getsize(path + suffix) > 0:
+                return True
+        except OSError:
+            pass
+    return False
+
+
+def _scan_directory(directory, with_stat=False):
+    '''Returns the (path, is_dir, metadata) of the entries of directory sorted by path, and the
+    error that stopped the listing if any. With with_stat, metadata is the (size, mtime, ctime)
+    of the entry, None if it can't be read, otherwise it is None.'''
+    entries = []
+    try:
+        with os.scandir(directory) as files_list:
+            for item in files_list:
+                metadata = None
+                if with_stat:
+                    try:
+                        entry_stat = item.stat(follow_symlinks=False)
+                        metadata = (entry_stat.st_size, entry_stat.st_mtime, entry_stat.st_ctime)
+                    except OSError:
+                        pass
+                entries.append((item.path, item.is_dir(follow_symlinks=False), metadata))
+    except OSError as ex:
+        return sorted(entries), ex
+    return sorted(entries), None
+
+
 class FileSeekerDir(FileSeekerBase):
     """
     This class extends FileSeekerBase to provide functionality for searching files
@@ -296,73 +465,254 @@ class FileSeekerDir(FileSeekerBase):
         data_folder (str): The destination folder where matched files will be copied.
         _all_files (list): Internal list containing all file paths found in the directory tree.
         searched (dict): Cache of search results, mapping file patterns to lists of matched paths.
+        resolved (dict): Cache of matched source paths, mapping normalized file patterns to lists
+            of paths in _all_files. Populated by resolve_patterns.
         copied (dict): Mapping of source file paths to their copied destination paths.
         file_infos (dict): Dictionary storing FileInfo objects with metadata for copied files.
+        walker_threads (int): Number of threads listing directories in build_files_list.
+        walker_report_interval (int): Interval in seconds between two progress reports of
+            build_files_list.
+        evidence_access (str): How matched files are made available to the artifacts, one of
+            evidence_access_modes:
+            - copy: the files are copied to data_folder.
+            - hardlink: the files are hardlinked in data_folder, copied if the evidence is on
+              another file system.
+            - reflink: the files are cloned in data_folder (copy-on-write), copied if the file
+              system does not support it.
+            - inplace: the evidence files are read where they are. SQLite databases with a
+              non-empty -wal or -journal file are hardlinked (or copied) in data_folder with a
+              private copy of their -wal, -shm and -journal files, so SQLite never writes
+              next to the evidence.
+            The -wal, -shm and -journal files themselves are always copied. Hardlinked and in
+            place files share the inode of the evidence: the artifacts must never write to the
+            files they are given.
     Methods:
         build_files_list(directory): Recursively scans directory and populates _all_files list.
+        load_files_list(directory, index_cache): Populates _all_files list from the persistent
+            files listing index of directory, building the index if needed.
+        resolve_patterns(filepatterns): Matches all the patterns against _all_files in a single pass.
         search(filepattern, return_on_first_hit=False, force=False): Searches for files matching
             the given pattern, copies them to data_folder, and returns matching paths.
     """
 
-    def __init__(self, directory, data_folder):
+    walker_threads = 16
+    walker_report_interval = 10
+
+    def __init__(self, directory, data_folder, index_cache=None, evidence_access='copy'):
         FileSeekerBase.__init__(self)
         self.directory = directory
         self._all_files = []
         self.data_folder = data_folder
-        logfunc('Building files listing...')
-        self.build_files_list(directory)
+        self.evidence_access = evidence_access
+        self._access_fallback_logged = False
+        if index_cache:
+            self.load_files_list(directory, index_cache)
+        else:
+            logfunc('Building files listing...')
+            self.build_files_list(directory)
         logfunc(f'File listing complete - {len(self._all_files)} files')
         self.searched = {}
+        self.resolved = {}
         self.copied = {}
         self.file_infos = {}
 
-    def build_files_list(self, directory):
-        '''Populates all paths in directory into _all_files'''
+    def build_files_list(self, directory, with_stat=False):
+        '''Populates all paths in directory into _all_files.
+        The directories are listed by walker_threads threads so that several scandir calls are
+        in flight at once, which hides the latency of remote storage. The paths are sorted
+        by name within each directory and each directory is followed by its content.
+        With with_stat, the entries are also stated by the walker threads and the list of the
+        (is_dir, size, mtime, ctime) of the paths of _all_files is returned, the last three
+        being None for an entry that can't be stated.'''
+        children = {}
+        errors = []
+        pending = queue.Queue()
+        pending.put(directory)
+
+        def walker():
+            while True:
+                dir_path = pending.get()
+                if dir_path is None:
+                    return
+                try:
+                    entries, error = _scan_directory(dir_path, with_stat)
+                    if error:
+                        errors.append((dir_path, error))
+                    children[dir_path] = entries
+                    for entry_path, is_dir, _ in entries:
+                        if is_dir:
+                            pending.put(entry_path)
+                except Exception as ex:
+                    errors.append((dir_path, ex))
+                finally:
+                    pending.task_done()
+
+        start = timex.perf_counter()
+        threads = [threading.Thread(target=walker, daemon=True) for _ in range(self.walker_threads)]
+        for thread in threads:
+            thread.start()
+        finished = threading.Thread(target=pending.join, daemon=True)
+        finished.start()
+        while True:
+            finished.join(self.walker_report_interval)
+            if not finished.is_alive():
+                break
+            entries_count = sum(len(entries) for entries in list(children.values()))
+            logfunc(f'Files listing in progress - {entries_count} entries '
+                    f'({entries_count / (timex.perf_counter() - start):.0f} entries/sec)')
+        for _ in threads:
+            pending.put(None)
+        for dir_path, error in errors:
+            logfunc(f'Error reading {dir_path} ' + str(error))
+
+        files_metadata = [] if with_stat else None
+        stack = [iter(children.pop(directory, ()))]
+        while stack:
+            for entry_path, is_dir, metadata in stack[-1]:
+                self._all_files.append(entry_path)
+                if with_stat:
+                    files_metadata.append((int(is_dir),) + (metadata or (None, None, None)))
+                if is_dir:
+                    stack.append(iter(children.pop(entry_path, ())))
+                    break
+            else:
+                stack.pop()
+
+        elapsed = timex.perf_counter() - start
+        entries_count = len(self._all_files)
+        logfunc(f'Listed {entries_count} entries in {elapsed:.1f}s '
+                f'({entries_count / elapsed if elapsed else entries_count:.0f} entries/sec)')
+        return files_metadata
+
+    def _is_index_up_to_date(self, index_path, directory):
+        '''Returns True if the indexed directories of directory still have the modification
+        time they had when the index was built. They are stated by walker_threads threads.'''
+        directories = load_directories_mtimes(index_path, directory)
+        if directories is None:
+            return False
+
+        def get_mtime(dir_path):
+            try:
+                return os.stat(dir_path, follow_symlinks=False).st_mtime
+            except OSError:
+                return None
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.walker_threads) as executor:
+            for (dir_path, indexed_mtime), mtime in zip(directories, executor.map(
+                    get_mtime, [dir_path for dir_path, _ in directories])):
+                if mtime != indexed_mtime:
+                    logfunc(f'{dir_path} has changed since the files listing index was built')
+                    return False
+        return True
+
+    def load_files_list(self, directory, index_cache):
+        '''Populates _all_files from the index of directory in the index_cache folder,
+        the index being built first if it is missing or if directory has changed'''
+        index_path = get_index_path(index_cache, directory)
+        fingerprint = get_root_fingerprint(directory)
+        files_list = load_files_listing(index_path, directory, fingerprint)
+        if files_list is not None and self._is_index_up_to_date(index_path, directory):
+            logfunc(f'Files listing loaded from index {index_path}')
+            self._all_files = files_list
+            return
+        logfunc('Building files listing...')
+        files_metadata = self.build_files_list(directory, with_stat=True)
         try:
-            files_list = os.scandir(directory)
-            for item in files_list:
-                self._all_files.append(item.path)
-                if item.is_dir(follow_symlinks=False):
-                    self.build_files_list(item.path)
+            save_files_listing(index_path, directory, fingerprint, self._all_files, files_metadata)
+            logfunc(f'Files listing saved to index {index_path}')
+        except (OSError, sqlite3.Error) as ex:
+            logfunc(f'Could not save files listing index {index_path} ' + str(ex))
+
+    def resolve_patterns(self, filepatterns):
+        '''Matches all the patterns against _all_files in a single pass and stores the
+        matched paths in resolved, so that search only has to copy the files.'''
+        _resolve_patterns(self._all_files, filepatterns, self.resolved)
+
+    def _match_items(self, filepattern):
+        '''Returns the paths of _all_files matching the pattern'''
+        normalized_pattern = normalize_pattern(filepattern)
+        if normalized_pattern in self.resolved:
+            return self.resolved[normalized_pattern]
+        pat = _compile_pattern(normalized_pattern)
+        root = normcase("root/")
+        return (item for item in self._all_files if pat(root + normcase(item)) is not None)
+
+    def _link_file(self, item, data_path):
+        '''Hardlinks or clones item to data_path according to evidence_access, falls back to a copy'''
+        if os.path.lexists(data_path):
+            # Never write through an existing link to the evidence
+            os.remove(data_path)
+        try:
+            if self.evidence_access == 'reflink':
+                _reflink_file(item, data_path)
+            else:
+                os.link(item, data_path)
+            return
         except OSError as ex:
-            logfunc(f'Error reading {directory} ' + str(ex))
+            if not self._access_fallback_logged:
+                logfunc(f'Evidence access mode {self.evidence_access} not possible for {item}, '
+                        f'files are copied instead when needed ({ex})')
+                self._access_fallback_logged = True
+        if os.path.lexists(data_path):
+            os.remove(data_path)
+        copyfile(item, data_path)
+
+    def _access_file(self, item, data_path):
+        '''Makes the file item available to the artifacts according to evidence_access.
+        Returns the path the artifacts must read, which is item itself for in-place access.'''
+        if self.evidence_access == 'inplace' and not item.endswith(sqlite_sidecar_suffixes):
+            if not _has_sqlite_sidecar_data(item):
+                return item
+            os.makedirs(os.path.dirname(data_path), exist_ok=True)
+            self._link_file(item, data_path)
+            for suffix in sqlite_sidecar_suffixes:
+                if os.path.isfile(item + suffix) and item + suffix not in self.copied:
+                    copyfile(item + suffix, data_path + suffix)
+                    self.copied[item + suffix] = data_path + suffix
+                    self.file_infos[data_path + suffix] = FileInfo(
+                        item + suffix, Path(item + suffix).stat().st_ctime, Path(item + suffix).stat().st_mtime)
+            return data_path
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        if self.evidence_access in ('hardlink', 'reflink') and not item.endswith(sqlite_sidecar_suffixes):
+            self._link_file(item, data_path)
+        else:
+            if self.evidence_access != 'copy' and os.path.lexists(data_path):
+                os.remove(data_path)
+            copyfile(item, data_path)
+        return data_path
 
     def search(self, filepattern, return_on_first_hit=False, force=False):
         if filepattern in self.searched and not force:
             pathlist = self.searched[filepattern]
             return self.searched[filepattern][0] if return_on_first_hit and pathlist else pathlist
         pathlist = []
-        pat = _compile_pattern(normcase(filepattern))
-        root = normcase("root/")
-        for item in self._all_files:
-            if pat(root + normcase(item)) is not None:
-                item_rel_path = item.replace(self.directory, '')
-                data_path = os.path.join(self.data_folder, item_rel_path[1:])
-                if is_platform_windows():
-                    data_path = data_path.replace('/', '\\')
-                if item not in self.copied or force:
-                    try:
-                        if os.path.isdir(item):
-                            pathlist.append(data_path)
-                        elif os.path.isfile(item):
-                            os.makedirs(os.path.dirname(data_path), exist_ok=True)
-                            copyfile(item, data_path)
-                            self.copied[item] = data_path
-                            creation_date = Path(item).stat().st_ctime
-                            modification_date = Path(item).stat().st_mtime
-                            file_info = FileInfo(item, creation_date, modification_date)
-                            self.file_infos[data_path] = file_info
-                        else:
-                            logfunc(f"INFO: Item '{item}' is neither a file nor a directory "
-                                    "(e.g. symlink not followed, or broken). Skipped.")
-                    except OSError as ex:
-                        logfunc(f'Could not copy {item} to {data_path} ' + str(ex))
-                else:
-                    data_path = self.copied[item]
-                pathlist.append(data_path)
-                if return_on_first_hit:
-                    self.searched[filepattern] = pathlist
-                    return data_path
+        for item in self._match_items(filepattern):
+            item_rel_path = item.replace(self.directory, '')
+            data_path = os.path.join(self.data_folder, item_rel_path[1:])
+            if is_platform_windows():
+                data_path = data_path.replace('/', '\\')
+            if item not in self.copied or force:
+                try:
+                    if os.path.isdir(item):
+                        pathlist.append(data_path)
+                    elif os.path.isfile(item):
+                        data_path = self._access_file(item, data_path)
+                        self.copied[item] = data_path
+                        creation_date = Path(item).stat().st_ctime
+                        modification_date = Path(item).stat().st_mtime
+                        file_info = FileInfo(item, creation_date, modification_date)
+                        self.file_infos[data_path] = file_info
+                    else:
+                        logfunc(f"INFO: Item '{item}' is neither a file nor a directory "
+                                "(e.g. symlink not followed, or broken). Skipped.")
+                except OSError as ex:
+                    logfunc(f'Could not copy {item} to {data_path} ' + str(ex))
+            else:
+                data_path = self.copied[item]
+            pathlist.append(data_path)
+            if return_on_first_hit:
+                self.searched[filepattern] = pathlist
+                return data_path
         self.searched[filepattern] = pathlist
         return pathlist
 
@@ -379,11 +729,22 @@ class FileSeekerItunes(FileSeekerBase):
         backup_type (str): The type of backup, either 'db' or 'mbdb'.
         decryption_keys (list): A list of keys used for decrypting files, if applicable.
         _all_files (dict): A dictionary mapping full file paths to their corresponding hash filenames.
-        _all_file_meta (dict): A dictionary storing metadata for each file.
-        files_metadata (dict): A dictionary mapping hash filenames to their metadata.
+        _all_file_meta (dict): A dictionary storing the dates, and the encryption class, key and size
+            of encrypted files, for each copied file.
+        files_metadata (dict): A dictionary mapping hash filenames to their Manifest.db row ids, the
+            metadata plist of a file is only read from Manifest.db when the file is copied.
+        _index (sqlite3.Connection): In-memory FTS5 trigram index of the paths of _all_files, used to
+            resolve the search patterns with GLOB queries, including the patterns starting with '*'.
+            Built on first use, False if SQLite has no FTS5 module.
+        _unwrapped_keys (dict): The unwrapped keys of the files, by wrapping key and wrapped key,
+            as the same keys are unwrapped again on later searches. They are not kept once the
+            seeker is released.
         searched (dict): A dictionary storing search results for file patterns.
         copied (dict): A dictionary tracking copied files and their destinations.
         file_infos (dict): A dictionary storing file information such as creation and modification dates.
+        resolved (dict): Paths of _all_files matching each normalized file pattern, populated by
+            resolve_patterns.
+        copy_workers (int): Number of threads copying and decrypting files in copy_files.
     Methods:
         __init__(directory, data_folder, backup_type, decryption_keys):
             Initializes the FileSeekerItunes instance and builds the file listing based on the backup type.
@@ -393,10 +754,16 @@ class FileSeekerItunes(FileSeekerBase):
             Populates paths from Manifest.db files into _all_files.
         build_files_list_from_manifest_mbdb(manifest_path):
             Populates paths from Manifest.mbdb files into _all_files.
+        copy_files(relative_paths):
+            Copies and decrypts several files at once with a pool of threads.
+        resolve_patterns(filepatterns):
+            Matches all the patterns with the index and copies the matched files with copy_files.
         search(filepattern, return_on_first_hit=False, force=False):
             Searches for files matching the given pattern and returns their paths.
     """
 
+    copy_workers = min(8, os.cpu_count() or 1)
+
     def __init__(self, directory, data_folder, backup_type, decryption_keys):
         FileSeekerBase.__init__(self)
         self.directory = directory
@@ -406,19 +773,18 @@ class FileSeekerItunes(FileSeekerBase):
         self.files_metadata = {}
         self.decryption_keys = decryption_keys
         self.backup_type = backup_type
+        self._manifest_path = None
+        self._manifest_db = None
+        self._index = None
+        self._unwrapped_keys = {}
         logfunc('Building files listing...')
         if backup_type == "db":
             manifest_path = os.path.join(directory, "Manifest.db")
             if decryption_keys:
                 unwrapped_manifest_key = decryption_keys[1]
-                with open(manifest_path, "rb") as manifest_contents:
-                    cipher = Cipher(algorithms.AES(unwrapped_manifest_key),
-                                    modes.CBC(b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'))
-                    decryptor = cipher.decryptor()
-                    decrypted_manifest_contents = decryptor.update(manifest_contents.read()) + decryptor.finalize()
-                    manifest_path = os.path.join(data_folder, "Manifest.db")
-                    with open(manifest_path, "wb") as new_manifest_contents:
-                        new_manifest_contents.write(decrypted_manifest_contents)
+                decrypted_manifest_path = os.path.join(data_folder, "Manifest.db")
+                _decrypt_file(manifest_path, decrypted_manifest_path, unwrapped_manifest_key)
+                manifest_path = decrypted_manifest_path
 
             self.build_files_list_from_manifest_db(manifest_path)
         elif backup_type == "mbdb":
@@ -426,6 +792,7 @@ class FileSeekerItunes(FileSeekerBase):
             self.build_files_list_from_manifest_mbdb(manifest_path)
         logfunc(f'File listing complete - {len(self._all_files)} files')
         self.searched = {}
+        self.resolved = {}
         self.copied = {}
         self.file_infos = {}
 
@@ -454,52 +821,59 @@ class FileSeekerItunes(FileSeekerBase):
             cursor = db.cursor()
             cursor.execute(
                 """
-                SELECT fileID, domain, relativePath, file
+                SELECT fileID, domain, relativePath, rowid
                 FROM Files
                 WHERE flags=1
                 """
             )
-            all_rows = cursor.fetchall()
-            for row in all_rows:
-                hash_filename = row[0]
-                domain = row[1]
+            for hash_filename, domain, relative_path, rowid in cursor:
                 root_path = self.get_root_path_from_domain(domain)
-                relative_path = row[2]
-                file_metadata = row[3]
                 full_path = os.path.join(root_path, relative_path)
                 self._all_files[full_path] = hash_filename
-                if self.decryption_keys:
-                    # Load the file's plist and find the encryption key
-                    tmp_file_plist = get_plist_content(row[3])
-                    tmp_wrapped_key = tmp_file_plist["EncryptionKey"]["NS.data"]
-
-                    # Store the results into a dict for future
-                    self._all_file_meta[full_path] = {}
-                    self._all_file_meta[full_path]['Class'] = int.from_bytes(tmp_wrapped_key[0:4], byteorder="little")
-                    self._all_file_meta[full_path]['Key'] = tmp_wrapped_key[4:]
-                    self._all_file_meta[full_path]['Size'] = tmp_file_plist["Size"]
-                self.files_metadata[hash_filename] = file_metadata
+                self.files_metadata[hash_filename] = rowid
             db.close()
+            self._manifest_path = manifest_path
         except Exception as ex:
             logfunc(f'Error opening Manifest.db from {manifest_path}, ' + str(ex))
             raise ex
 
+    def _get_file_meta(self, relative_path):
+        '''Returns the dates of a file, and its encryption class, key and size if the backup is
+        encrypted, reading its metadata plist from Manifest.db on first use'''
+        if relative_path in self._all_file_meta:
+            return self._all_file_meta[relative_path]
+        file_meta = {'Birth': 0, 'LastModified': 0}
+        if self.backup_type == "db":
+            if self._manifest_db is None:
+                self._manifest_db = open_sqlite_db_readonly(self._manifest_path)
+            row = self._manifest_db.execute(
+                'SELECT file FROM Files WHERE rowid = ?',
+                (self.files_metadata[self._all_files[relative_path]],)).fetchone()
+            tmp_file_plist = get_plist_content(row[0])
+            file_meta['Birth'] = tmp_file_plist.get('Birth', 0)
+            file_meta['LastModified'] = tmp_file_plist.get('LastModified', 0)
+            if self.decryption_keys:
+                # Find the encryption key in the file's plist
+                tmp_wrapped_key = tmp_file_plist["EncryptionKey"]["NS.data"]
+                file_meta['Class'] = int.from_bytes(tmp_wrapped_key[0:4], byteorder="little")
+                file_meta['Key'] = tmp_wrapped_key[4:]
+                file_meta['Size'] = tmp_file_plist["Size"]
+        self._all_file_meta[relative_path] = file_meta
+        return file_meta
+
     def build_files_list_from_manifest_mbdb(self, manifest_path):
         '''Populates paths from Manifest.mbdb files into _all_files'''
-        def getint(data, offset, intsize):
-            """Retrieve an integer (big-endian) and new offset from the current offset"""
-            value = 0
-            while intsize > 0:
-                value = (value << 8) + data[offset]
-                offset = offset + 1
-                intsize = intsize - 1
-            return value, offset
+        # mode, inode, uid, gid, mtime, atime, ctime, size, protection class and number of
+        # properties, following the domain, file name, link target, data hash and encryption key
+        record_struct = struct.Struct('>HQIIIIIQBB')
+        length_struct = struct.Struct('>H')
 
         def getstring(data, offset, binary=False):
             """Retrieve a string and new offset from the current offset into the data"""
-            if chr(data[offset]) == chr(0xFF) and chr(data[offset+1]) == chr(0xFF):
-                return '', offset+2  # Blank string
-            length, offset = getint(data, offset, 2)  # 2-byte length
+            length, = length_struct.unpack_from(data, offset)
+            offset += 2
+            if length == 0xFFFF:
+                return '', offset  # Blank string
             value = "" if binary else data[offset:offset+length].decode()
             return value, (offset + length)
 
@@ -517,17 +891,8 @@ class FileSeekerItunes(FileSeekerBase):
                 _, offset = getstring(data, offset, True)
                 _, offset = getstring(data, offset, True)
                 _, offset = getstring(data, offset, True)
-                _, offset = getint(data, offset, 2)
-                _, offset = getint(data, offset, 4)
-                _, offset = getint(data, offset, 4)
-                _, offset = getint(data, offset, 4)
-                _, offset = getint(data, offset, 4)
-                _, offset = getint(data, offset, 4)
-                _, offset = getint(data, offset, 4)
-                _, offset = getint(data, offset, 4)
-                _, offset = getint(data, offset, 8)
-                _, offset = getint(data, offset, 1)
-                numprops, offset = getint(data, offset, 1)
+                numprops = record_struct.unpack_from(data, offset)[-1]
+                offset += record_struct.size
                 for _ in range(numprops):
                     _, offset = getstring(data, offset, True)
                     _, offset = getstring(data, offset, True)
@@ -548,64 +913,155 @@ class FileSeekerItunes(FileSeekerBase):
             logfunc(f'Error opening Manifest.mbdb from {self.directory}, ' + str(ex))
             raise ex
 
+    def _copy_file(self, relative_path, original_location, data_path):
+        '''Copies the backup file of relative_path to data_path, decrypting it if the backup is
+        encrypted. The file is decrypted by chunks so the memory used does not depend on its size.'''
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+
+        # Handle encrypted backups differently, don't just copy the encrypted files
+        if self.decryption_keys:
+            protection_classes = self.decryption_keys[0]
+            # Snag the right protection class
+            tmp_file_meta = self._all_file_meta[relative_path]
+            if tmp_file_meta['Class'] not in protection_classes:
+                logfunc(f'Can\'t locate the protection class for {relative_path}: {tmp_file_meta["Class"]}')
+                raise KeyError
+            tmp_protection_class = protection_classes[tmp_file_meta['Class']]
+
+            # Grab the file's key
+            key_id = (tmp_protection_class['Unwrapped'], tmp_file_meta['Key'])
+            tmp_file_unwrapped_key = self._unwrapped_keys.get(key_id)
+            if tmp_file_unwrapped_key is None:
+                tmp_file_unwrapped_key = self._unwrapped_keys[key_id] = _unwrap_key(*key_id)
+
+            # Decrypt into the expected location, only write the expected size, no padding
+            _decrypt_file(original_location, data_path, tmp_file_unwrapped_key, tmp_file_meta['Size'])
+
+        # If not encrypted, just copy the thing
+        else:
+            copyfile(original_location, data_path)
+
+    def _get_file_locations(self, relative_path):
+        '''Returns the location of the file of relative_path in the backup, its destination in
+        data_folder and its FileInfo'''
+        hash_filename = self._all_files[relative_path]
+        file_meta = self._get_file_meta(relative_path)
+        if self.backup_type == "db":
+            original_location = os.path.join(self.directory, hash_filename[:2], hash_filename)
+        else:
+            original_location = os.path.join(self.directory, hash_filename)
+            # TO DO: extract creation and modification dates from manifest.mbdb
+        creation_date = file_meta['Birth']
+        modification_date = file_meta['LastModified']
+        data_path = os.path.join(self.data_folder, sanitize_file_path(relative_path))
+        if is_platform_windows():
+            data_path = data_path.replace('/', '\\')
+        return original_location, data_path, FileInfo(original_location, creation_date, modification_date)
+
+    def copy_files(self, relative_paths):
+        '''Copies (and decrypts) the files not yet copied with a pool of threads'''
+        to_copy = {}
+        for relative_path in relative_paths:
+            original_location, data_path, file_info = self._get_file_locations(relative_path)
+            if original_location not in self.copied and original_location not in to_copy:
+                to_copy[original_location] = (relative_path, data_path, file_info)
+        if not to_copy:
+            return
+        logfunc(f'{"Decrypting" if self.decryption_keys else "Copying"} {len(to_copy)} files '
+                f'with {self.copy_workers} threads')
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.copy_workers) as executor:
+            futures = {executor.submit(self._copy_file, relative_path, original_location, data_path):
+                       original_location
+                       for original_location, (relative_path, data_path, _) in to_copy.items()}
+            for future in concurrent.futures.as_completed(futures):
+                original_location = futures[future]
+                _, data_path, file_info = to_copy[original_location]
+                try:
+                    future.result()
+                except OSError as ex:
+                    logfunc(f'Could not copy {original_location} to {data_path} ' + str(ex))
+                    continue
+                except KeyError:
+                    # Missing protection class, already logged
+                    continue
+                self.file_infos[data_path] = file_info
+                self.copied[original_location] = data_path
+        logfunc('Copy of the files complete')
+
+    def __getstate__(self):
+        # SQLite connections can't be sent to worker processes, they are opened again when needed
+        state = self.__dict__.copy()
+        state['_manifest_db'] = None
+        state['_index'] = None
+        state['_unwrapped_keys'] = {}
+        return state
+
+    def _get_index(self):
+        '''Returns the in-memory full-text index of the normalized paths of _all_files, building
+        it on first use, or None if SQLite has no FTS5 module. The paths are indexed by their
+        trigrams, so SQLite resolves a GLOB query from the trigrams of the literal parts of the
+        pattern, wherever they are: the patterns starting with '*' are resolved with the index.'''
+        if self._index is None:
+            index = sqlite3.connect(':memory:')
+            try:
+                index.execute("""CREATE VIRTUAL TABLE files USING fts5(path UNINDEXED, path_nc,
+                                 tokenize='trigram case_sensitive 1', detail=column, columnsize=0)""")
+            except sqlite3.OperationalError as ex:
+                logfunc(f'Paths of the backup not indexed, SQLite has no FTS5 trigram tokenizer ({ex})')
+                index.close()
+                self._index = False
+                return None
+            index.executemany('INSERT INTO files (rowid, path, path_nc) VALUES (?, ?, ?)', (
+                (file_id, relative_path, normcase(relative_path))
+                for file_id, relative_path in enumerate(self._all_files)))
+            self._index = index
+        return self._index or None
+
+    def _resolve_with_index(self, filepatterns):
+        '''Stores in resolved the paths of _all_files matching each normalized pattern not yet
+        resolved, in the order of _all_files. The patterns are GLOB queries of the index and the
+        results are checked with fnmatch. The patterns with a '[', whose sets and unclosed
+        brackets GLOB does not read like fnmatch, and all the patterns without index are
+        matched in a single pass over the paths.'''
+        index = self._get_index()
+        filepatterns = set(normalize_pattern(filepattern) for filepattern in filepatterns)
+        if index is None:
+            _resolve_patterns(self._all_files, filepatterns, self.resolved, root='')
+            return
+        bracket_patterns = [filepattern for filepattern in filepatterns if '[' in filepattern]
+        if bracket_patterns:
+            _resolve_patterns(self._all_files, bracket_patterns, self.resolved, root='')
+        for filepattern in filepatterns:
+            if filepattern in self.resolved:
+                continue
+            pat = _compile_pattern(filepattern)
+            self.resolved[filepattern] = [
+                path for path, path_nc in index.execute(
+                    'SELECT path, path_nc FROM files WHERE path_nc GLOB ? ORDER BY rowid', (filepattern,))
+                if pat(path_nc) is not None]
+
+    def resolve_patterns(self, filepatterns):
+        '''Matches all the patterns against _all_files with the index and copies the matched
+        files at once with copy_files'''
+        new_patterns = [filepattern for filepattern in filepatterns
+                        if normalize_pattern(filepattern) not in self.resolved]
+        self._resolve_with_index(new_patterns)
+        self.copy_files(relative_path for filepattern in new_patterns
+                        for relative_path in self.resolved[normalize_pattern(filepattern)])
+
     def search(self, filepattern, return_on_first_hit=False, force=False):
         if filepattern in self.searched and not force:
             pathlist = self.searched[filepattern]
             return self.searched[filepattern][0] if return_on_first_hit and pathlist else pathlist
         pathlist = []
-        matching_keys = fnmatch.filter(self._all_files, filepattern)
-        for relative_path in matching_keys:
-            hash_filename = self._all_files[relative_path]
-            if self.backup_type == "db":
-                original_location = os.path.join(self.directory, hash_filename[:2], hash_filename)
-                metadata = get_plist_content(self.files_metadata[hash_filename])
-                creation_date = metadata.get('Birth', 0)
-                modification_date = metadata.get('LastModified', 0)
-            else:
-                original_location = os.path.join(self.directory, hash_filename)
-                # TO DO: extract creation and modification dates from manifest.mbdb
-                creation_date = 0
-                modification_date = 0
-            data_path = os.path.join(self.data_folder, sanitize_file_path(relative_path))
-            if is_platform_windows():
-                data_path = data_path.replace('/', '\\')
+        normalized_pattern = normalize_pattern(filepattern)
+        if normalized_pattern not in self.resolved:
+            self._resolve_with_index([normalized_pattern])
+        for relative_path in self.resolved[normalized_pattern]:
+            original_location, data_path, file_info = self._get_file_locations(relative_path)
             if original_location not in self.copied or force:
                 try:
-                    os.makedirs(os.path.dirname(data_path), exist_ok=True)
-
-                    # Handle encrypted backups differently, don't just copy the encrypted files
-                    if self.decryption_keys:
-                        protection_classes = self.decryption_keys[0]
-                        # Snag the right protection class
-                        tmp_file_meta = self._all_file_meta[relative_path]
-                        if tmp_file_meta['Class'] not in protection_classes:
-                            logfunc(f'Can\'t locate the protection class for {relative_path}: {tmp_file_meta["Class"]}')
-                            raise KeyError
-                        tmp_protection_class = protection_classes[tmp_file_meta['Class']]
-
-                        # Grab the file's key
-                        tmp_file_wrapped_key = tmp_file_meta['Key']
-                        tmp_file_unwrapped_key = crypt.aes_key_unwrap(tmp_protection_class['Unwrapped'],
-                                                                      tmp_file_wrapped_key)
-
-                        # Open the file and snag the contents
-                        with open(original_location, "rb") as temp_original_file:
-                            # Decrypt the contents, Apple uses a 0'd out 16-byte IV
-                            cipher = Cipher(
-                                algorithms.AES(tmp_file_unwrapped_key),
-                                modes.CBC(b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'))
-                            decryptor = cipher.decryptor()
-                            decrypted_contents = decryptor.update(temp_original_file.read()) + decryptor.finalize()
-
-                            # Write the decrypt into the expected located, only write the expected size, no padding
-                            with open(data_path, "wb") as temp_new_file:
-                                temp_new_file.write(decrypted_contents[0:tmp_file_meta['Size']])
-
-                    # If not encrypted, just copy the thing
-                    else:
-                        copyfile(original_location, data_path)
-
-                    file_info = FileInfo(original_location, creation_date, modification_date)
+                    self._copy_file(relative_path, original_location, data_path)
                     self.file_infos[data_path] = file_info
                     self.copied[original_location] = data_path
                 except OSError as ex:
@@ -632,9 +1088,21 @@ class FileSeekerTar(FileSeekerBase):
         searched (dict): A dictionary to keep track of searched file patterns and their results.
         copied (dict): A dictionary to keep track of files that have been copied.
         file_infos (dict): A dictionary to store file information for extracted files.
+        resolved (dict): Members matching each normalized file pattern, populated by resolve_patterns.
+        members (list): The TarInfo of the members of the archive, loaded from the index of the
+            archive in index_cache when available.
+        copy_buffer_size (int): Size of the chunks read from the archive when extracting a file.
+        seek_point_spacing (int): Number of uncompressed bytes between two seek points of a gzip
+            compressed archive. Seek points are only used with index_cache and when the optional
+            indexed_gzip package is installed: they are saved next to the members index once the
+            planned extraction of resolve_patterns is complete, so later runs can read any member
+            without decompressing the archive from its start.
     Methods:
-        __init__(tar_file_path, data_folder):
-            Initializes the FileSeekerTar instance with the specified tar file path and data folder.
+        __init__(tar_file_path, data_folder, index_cache=None):
+            Initializes the FileSeekerTar instance with the specified tar file path and data folder,
+            reusing the members and seek points indexes of the archive in the index_cache folder.
+        resolve_patterns(filepatterns):
+            Extracts all the files matching the patterns in a single ordered pass over the archive.
         search(filepattern, return_on_first_hit=False, force=False):
             Searches for files matching the given pattern in the tar archive and extracts them to the data folder.
             Returns a list of paths to the extracted files or the first hit if specified.
@@ -642,55 +1110,150 @@ class FileSeekerTar(FileSeekerBase):
             Closes the tar file to free up resources.
     """
 
-    def __init__(self, tar_file_path, data_folder):
+    copy_buffer_size = 1024 * 1024
+    seek_point_spacing = 32 * 1024 * 1024
+
+    def __init__(self, tar_file_path, data_folder, index_cache=None):
         FileSeekerBase.__init__(self)
         self.is_gzip = tar_file_path.lower().endswith('gz')
-        mode = 'r:gz' if self.is_gzip else 'r'
-        self.tar_file = tarfile.open(tar_file_path, mode)
         self.data_folder = data_folder
         self.searched = {}
+        self.resolved = {}
         self.copied = {}
         self.file_infos = {}
+        self.members = None
+        self._gzip_file = None
+        self._gzip_index_path = None
+
+        members_index_path = None
+        if index_cache:
+            fingerprint = get_archive_fingerprint(tar_file_path)
+            members_index_path = get_archive_index_path(index_cache, fingerprint, '.members.db')
+            self.members = load_tar_members(members_index_path)
+            if self.members is not None:
+                logfunc(f'Archive members loaded from index {members_index_path}')
+            if self.is_gzip and indexed_gzip:
+                self._gzip_index_path = get_archive_index_path(index_cache, fingerprint, '.gzidx')
+
+        if self._gzip_index_path:
+            gzip_index_exists = os.path.isfile(self._gzip_index_path)
+            if gzip_index_exists:
+                logfunc(f'Gzip seek points loaded from index {self._gzip_index_path}')
+            self._gzip_file = indexed_gzip.IndexedGzipFile(
+                tar_file_path, spacing=self.seek_point_spacing,
+                index_file=self._gzip_index_path if gzip_index_exists else None)
+            if gzip_index_exists:
+                # Nothing to save when the archive is closed
+                self._gzip_index_path = None
+            self.tar_file = tarfile.open(fileobj=self._gzip_file, mode='r:')
+        else:
+            mode = 'r:gz' if self.is_gzip else 'r'
+            self.tar_file = tarfile.open(tar_file_path, mode)
+
+        if self.members is None:
+            self.members = self.tar_file.getmembers()
+            if members_index_path:
+                try:
+                    save_tar_members(members_index_path, self.members)
+                    logfunc(f'Archive members saved to index {members_index_path}')
+                except (OSError, sqlite3.Error) as ex:
+                    logfunc(f'Could not save archive members index {members_index_path} ' + str(ex))
+
+    def _extract_member(self, member, full_path):
+        '''Writes the content of a file member to full_path, reading the archive by chunks'''
+        parent_dir = os.path.dirname(full_path)
+        if not os.path.exists(parent_dir):
+            os.makedirs(parent_dir)
+        with open(full_path, "wb") as fout:
+            copyfileobj(tarfile.ExFileObject(self.tar_file, member), fout, self.copy_buffer_size)
+        file_info = FileInfo(member.name, 0, member.mtime)
+        self.file_infos[full_path] = file_info
+        self.copied[member.name] = full_path
+        os.utime(full_path, (member.mtime, member.mtime))
+
+    def resolve_patterns(self, filepatterns):
+        '''Matches all the patterns against the members of the archive and extracts all the matched
+        files in a single pass, ordered by their position in the archive, so that a compressed
+        archive is never rewound. Later searches are served from the extracted files.'''
+        patterns = [(filepattern, _compile_pattern(filepattern))
+                    for filepattern in set(normalize_pattern(filepattern) for filepattern in filepatterns)
+                    if filepattern not in self.resolved]
+        if not patterns:
+            return
+        for filepattern, _ in patterns:
+            self.resolved[filepattern] = []
+        root = normcase("root/")
+        planned = {}
+        for member in self.members:
+            candidate = root + normcase(member.name)
+            for filepattern, pat in patterns:
+                if pat(candidate) is not None:
+                    self.resolved[filepattern].append(member)
+                    if not member.isdir() and member.name not in self.copied:
+                        planned[member.name] = member
+
+        planned = sorted(planned.values(), key=lambda member: member.offset_data)
+        logfunc(f'Extracting {len(planned)} files '
+                f'({sum(member.size for member in planned) / 1048576:.1f} MB) from the archive in a single pass')
+        for member in planned:
+            full_path = os.path.join(self.data_folder, Path(sanitize_file_path(member.name)))
+            try:
+                self._extract_member(member, full_path)
+            except (OSError, tarfile.TarError) as ex:
+                logfunc(f'Could not write file to filesystem, path was {member.name} ' + str(ex))
+        logfunc('Extraction from the archive complete')
+        self._save_gzip_index()
+
+    def _match_members(self, filepattern):
+        '''Returns the members of the archive matching the pattern'''
+        normalized_pattern = normalize_pattern(filepattern)
+        if normalized_pattern in self.resolved:
+            return self.resolved[normalized_pattern]
+        pat = _compile_pattern(normalized_pattern)
+        root = normcase("root/")
+        return (member for member in self.members if pat(root + normcase(member.name)) is not None)
 
     def search(self, filepattern, return_on_first_hit=False, force=False):
         if filepattern in self.searched and not force:
             pathlist = self.searched[filepattern]
             return self.searched[filepattern][0] if return_on_first_hit and pathlist else pathlist
         pathlist = []
-        pat = _compile_pattern(normcase(filepattern))
-        root = normcase("root/")
-        for member in self.tar_file.getmembers():
-            if pat(root + normcase(member.name)) is not None:
-                clean_name = sanitize_file_path(member.name)
-                full_path = os.path.join(self.data_folder, Path(clean_name))
-                if member.name not in self.copied or force:
-                    try:
-                        if member.isdir():
-                            os.makedirs(full_path, exist_ok=True)
-                        else:
-                            parent_dir = os.path.dirname(full_path)
-                            if not os.path.exists(parent_dir):
-                                os.makedirs(parent_dir)
-                            with open(full_path, "wb") as fout:
-                                fout.write(tarfile.ExFileObject(self.tar_file, member).read())
-                                fout.close()
-                                file_info = FileInfo(member.name, 0, member.mtime)
-                                self.file_infos[full_path] = file_info
-                                self.copied[member.name] = full_path
-                            os.utime(full_path, (member.mtime, member.mtime))
-                    except OSError as ex:
-                        logfunc(f'Could not write file to filesystem, path was {member.name} ' + str(ex))
-                else:
-                    full_path = self.copied[member.name]
-                pathlist.append(full_path)
-                if return_on_first_hit:
-                    self.searched[filepattern] = pathlist
-                    return full_path
+        for member in self._match_members(filepattern):
+            clean_name = sanitize_file_path(member.name)
+            full_path = os.path.join(self.data_folder, Path(clean_name))
+            if member.name not in self.copied or force:
+                try:
+                    if member.isdir():
+                        os.makedirs(full_path, exist_ok=True)
+                    else:
+                        self._extract_member(member, full_path)
+                except OSError as ex:
+                    logfunc(f'Could not write file to filesystem, path was {member.name} ' + str(ex))
+            else:
+                full_path = self.copied[member.name]
+            pathlist.append(full_path)
+            if return_on_first_hit:
+                self.searched[filepattern] = pathlist
+                return full_path
         self.searched[filepattern] = pathlist
         return pathlist
 
+    def _save_gzip_index(self):
+        '''Saves the seek points of a gzip compressed archive in index_cache, once'''
+        if self._gzip_file and self._gzip_index_path:
+            try:
+                os.makedirs(os.path.dirname(self._gzip_index_path), exist_ok=True)
+                self._gzip_file.export_index(self._gzip_index_path)
+                logfunc(f'Gzip seek points saved to index {self._gzip_index_path}')
+            except (OSError, indexed_gzip.ZranError) as ex:
+                logfunc(f'Could not save gzip seek points index {self._gzip_index_path} ' + str(ex))
+            self._gzip_index_path = None
+
     def cleanup(self):
+        self._save_gzip_index()
         self.tar_file.close()
+        if self._gzip_file:
+            self._gzip_file.close()
 
 
 class FileSeekerZip(FileSeekerBase):
@@ -703,23 +1266,33 @@ class FileSeekerZip(FileSeekerBase):
         searched (dict): A dictionary to keep track of searched file patterns and their corresponding paths.
         copied (dict): A dictionary to keep track of files that have been extracted and their paths.
         file_infos (dict): A dictionary to store file information such as creation and modification dates.
+        resolved (dict): Members matching each normalized file pattern, populated by resolve_patterns.
+        extraction_workers (int): Number of threads extracting members in extract_members.
     Methods:
         __init__(zip_file_path, data_folder):
             Initializes the FileSeekerZip instance with the specified ZIP file path and data folder.
         decode_extended_timestamp(extra_data):
             Decodes the extended timestamp information from the extra data of a file in the ZIP archive.
+        extract_members(members):
+            Extracts several members at once with a pool of threads.
+        resolve_patterns(filepatterns):
+            Matches all the patterns at once and extracts the matched members with extract_members.
         search(filepattern, return_on_first_hit=False, force=False):
             Searches for files matching the specified pattern in the ZIP archive and extracts them if found.
         cleanup():
             Closes the ZIP file to free up resources.
     """
 
+    extraction_workers = min(16, os.cpu_count() or 1)
+
     def __init__(self, zip_file_path, data_folder):
         FileSeekerBase.__init__(self)
+        self.zip_file_path = zip_file_path
         self.zip_file = ZipFile(zip_file_path)
         self.name_list = self.zip_file.namelist()
         self.data_folder = data_folder
         self.searched = {}
+        self.resolved = {}
         self.copied = {}
         self.file_infos = {}
 
@@ -755,37 +1328,106 @@ class FileSeekerZip(FileSeekerBase):
                 offset += data_size
         return None, None
 
+    def _extract_member(self, zip_file, member):
+        '''Extracts member with zip_file and sets its timestamps. Returns the extracted path
+        and the FileInfo of the member.'''
+        try:
+            # already replaces illegal chars with _ when exporting
+            extracted_path = zip_file.extract(member, path=self.data_folder)
+        except FileExistsError:
+            # One of its folders was created at the same time by another extraction thread
+            extracted_path = zip_file.extract(member, path=self.data_folder)
+        f = zip_file.getinfo(member)
+        creation_date, modification_date = self.decode_extended_timestamp(f.extra)
+        file_info = FileInfo(member, creation_date, modification_date)
+        date_time = f.date_time
+        date_time = timex.mktime(date_time + (0, 0, -1))
+        os.utime(extracted_path, (date_time, date_time))
+        return extracted_path, file_info
+
+    def extract_members(self, members):
+        '''Extracts the members not yet copied with a pool of threads, each thread having its own
+        handle on the ZIP file, as inflating the members releases the GIL'''
+        members = [member for member in dict.fromkeys(members) if member not in self.copied]
+        if not members:
+            return
+        thread_data = threading.local()
+        zip_files = []
+
+        def extract(member):
+            zip_file = getattr(thread_data, 'zip_file', None)
+            if zip_file is None:
+                zip_file = thread_data.zip_file = ZipFile(self.zip_file_path)
+                zip_files.append(zip_file)
+            return self._extract_member(zip_file, member)
+
+        logfunc(f'Extracting {len(members)} files from the archive with {self.extraction_workers} threads')
+        if self.extraction_workers == 1:
+            for member in members:
+                try:
+                    extracted_path, file_info = self._extract_member(self.zip_file, member)
+                except OSError as ex:
+                    logfunc(f'Could not write file to filesystem, path was {member} ' + str(ex))
+                    continue
+                self.file_infos[extracted_path] = file_info
+                self.copied[member] = extracted_path
+            logfunc('Extraction from the archive complete')
+            return
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.extraction_workers) as executor:
+                for member, future in zip(members, [executor.submit(extract, member) for member in members]):
+                    try:
+                        extracted_path, file_info = future.result()
+                    except OSError as ex:
+                        logfunc(f'Could not write file to filesystem, path was {member} ' + str(ex))
+                        continue
+                    self.file_infos[extracted_path] = file_info
+                    self.copied[member] = extracted_path
+        finally:
+            for zip_file in zip_files:
+                zip_file.close()
+        logfunc('Extraction from the archive complete')
+
+    def resolve_patterns(self, filepatterns):
+        '''Matches all the patterns against name_list in a single pass and extracts all the
+        matched members at once with extract_members'''
+        new_patterns = [filepattern for filepattern in filepatterns
+                        if normalize_pattern(filepattern) not in self.resolved]
+        _resolve_patterns(self.name_list, new_patterns, self.resolved)
+        self.extract_members(member for filepattern in new_patterns
+                             for member in self.resolved[normalize_pattern(filepattern)]
+                             if not member.startswith("__MACOSX"))
+
+    def _match_members(self, filepattern):
+        '''Returns the members of name_list matching the pattern'''
+        normalized_pattern = normalize_pattern(filepattern)
+        if normalized_pattern in self.resolved:
+            return self.resolved[normalized_pattern]
+        pat = _compile_pattern(normalized_pattern)
+        root = normcase("root/")
+        return (member for member in self.name_list if pat(root + normcase(member)) is not None)
+
     def search(self, filepattern, return_on_first_hit=False, force=False):
         if filepattern in self.searched and not force:
             pathlist = self.searched[filepattern]
             return self.searched[filepattern][0] if return_on_first_hit and pathlist else pathlist
         pathlist = []
-        pat = _compile_pattern(normcase(filepattern))
-        root = normcase("root/")
-        for member in self.name_list:
+        for member in self._match_members(filepattern):
             if member.startswith("__MACOSX"):
                 continue
-            if pat(root + normcase(member)) is not None:
-                if member not in self.copied or force:
-                    try:
-                        # already replaces illegal chars with _ when exporting
-                        extracted_path = self.zip_file.extract(member, path=self.data_folder)
-                        f = self.zip_file.getinfo(member)
-                        creation_date, modification_date = self.decode_extended_timestamp(f.extra)
-                        file_info = FileInfo(member, creation_date, modification_date)
-                        self.file_infos[extracted_path] = file_info
-                        date_time = f.date_time
-                        date_time = timex.mktime(date_time + (0, 0, -1))
-                        os.utime(extracted_path, (date_time, date_time))
-                        self.copied[member] = extracted_path
-                    except OSError as ex:
-                        logfunc(f'Could not write file to filesystem, path was {member} ' + str(ex))
-                else:
-                    extracted_path = self.copied[member]
-                pathlist.append(extracted_path)
-                if return_on_first_hit:
-                    self.searched[filepattern] = pathlist
-                    return extracted_path
+            if member not in self.copied or force:
+                try:
+                    extracted_path, file_info = self._extract_member(self.zip_file, member)
+                    self.file_infos[extracted_path] = file_info
+                    self.copied[member] = extracted_path
+                except OSError as ex:
+                    logfunc(f'Could not write file to filesystem, path was {member} ' + str(ex))
+            else:
+                extracted_path = self.copied[member]
+            pathlist.append(extracted_path)
+            if return_on_first_hit:
+                self.searched[filepattern] = pathlist
+                return extracted_path
         self.searched[filepattern] = pathlist
         return pathlist
 
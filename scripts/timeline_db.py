@@ -0,0 +1,194 @@
+"""
+This module provides the timeline of a report, the rows of the artifacts with a timestamp
+in their first column, stored in the _Timeline/tl.db SQLite database and exported in time
+order when the report is generated.
+
+Each process keeps a single connection to the timeline database, and the rows of an
+artifact are inserted in one batch. The data table keeps the original key, activity and
+datalist columns, the datalist being a compact JSON object of the values of the row. It
+adds the timestamp of the row in microseconds since the epoch in UTC, NULL when the first
+column is not a date, and the category of the artifact.
+
+When the report is generated, the timestamp and activity indexes are created and the rows
+are exported sorted by time to timeline.tsv and timeline.jsonl. The rows of each activity
+are read in time order from the activity index, and the activities are merged, so the
+export does not need to sort the whole timeline. The rows without timestamp are exported
+last.
+
+Global Variables:
+    timeline_folder_name (str): Name of the timeline folder in the report folder.
+    timeline_db_name (str): Name of the timeline database in the timeline folder.
+    timeline_export_name (str): Name, without extension, of the exported timeline files.
+    timeline_db_timeout (int): Seconds a process waits for another process to release the
+        database.
+
+Functions:
+    get_timestamp_us: Returns a timestamp in microseconds since the epoch in UTC.
+    write_timeline: Writes the rows of an artifact to the timeline.
+    close_timeline: Closes the connection of the process to the timeline.
+    finalize_timeline: Indexes the timeline and exports it in time order.
+"""
+
+import heapq
+import json
+import os
+import sqlite3
+
+from datetime import date, datetime, timedelta, timezone
+from json.encoder import encode_basestring_ascii
+
+timeline_folder_name = '_Timeline'
+timeline_db_name = 'tl.db'
+timeline_export_name = 'timeline'
+timeline_db_timeout = 600
+
+_timeline_db = None
+_timeline_db_path = None
+_payload_encoder = json.JSONEncoder(separators=(',', ':'))
+_epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_microsecond = timedelta(microseconds=1)
+
+
+def get_timestamp_us(value):
+    """
+    Returns the timestamp of a value in microseconds since the epoch in UTC. Naive dates are
+    considered in UTC.
+    Args:
+        value: A datetime, a date or an ISO 8601 string.
+    Returns:
+        int or None: The timestamp, or None if the value is not a date.
+    """
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.strip())
+        except ValueError:
+            return None
+    elif isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    elif not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - _epoch) // _microsecond
+
+
+def _get_timeline_db(report_folder_base):
+    global _timeline_db, _timeline_db_path
+
+    db_path = os.path.join(report_folder_base, timeline_folder_name, timeline_db_name)
+    if _timeline_db and _timeline_db_path == db_path:
+        return _timeline_db
+    close_timeline()
+    # The folder and table may be created concurrently by parallel workers
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    _timeline_db = sqlite3.connect(db_path, timeout=timeline_db_timeout, check_same_thread=False)
+    _timeline_db_path = db_path
+    _timeline_db.execute('PRAGMA journal_mode = WAL')
+    _timeline_db.execute('PRAGMA synchronous = NORMAL')
+    _timeline_db.execute('''CREATE TABLE IF NOT EXISTS data(key TEXT, activity TEXT, datalist TEXT,
+                            timestamp INTEGER, category TEXT)''')
+    _timeline_db.commit()
+    return _timeline_db
+
+
+def _get_timeline_rows(activity, category, data_list, data_headers):
+    if len(set(data_headers)) != len(data_headers) or not all(isinstance(header, str) for header in data_headers):
+        # The last value of a duplicated header is kept, as in a dict, and json converts the keys
+        encode = _payload_encoder.encode
+        for entry in data_list:
+            fields = [str(field) for field in entry]
+            yield (fields[0], activity, encode(dict(zip(data_headers, fields))), get_timestamp_us(entry[0]),
+                   category)
+        return
+    # The keys of the payload are encoded once, and the values with the C encoder of json
+    keys = [encode_basestring_ascii(header) + ':' for header in data_headers]
+    for entry in data_list:
+        fields = [str(field) for field in entry]
+        yield (fields[0], activity,
+               '{' + ','.join([key + encode_basestring_ascii(field) for key, field in zip(keys, fields)]) + '}',
+               get_timestamp_us(entry[0]), category)
+
+
+def write_timeline(report_folder_base, activity, category, data_list, data_headers):
+    """
+    Writes the rows of an artifact to the timeline, in a single transaction.
+    Args:
+        report_folder_base (str): The path of the report folder.
+        activity (str): The name of the artifact.
+        category (str): The category of the artifact.
+        data_list (list): The rows of the artifact, their first column being the timestamp.
+        data_headers (list): The names of the columns.
+    """
+    db = _get_timeline_db(report_folder_base)
+    with db:
+        db.executemany('INSERT INTO data VALUES(?,?,?,?,?)',
+                       _get_timeline_rows(activity, category, data_list, data_headers))
+
+
+def close_timeline():
+    """Closes the connection of the process to the timeline."""
+    global _timeline_db, _timeline_db_path
+
+    if _timeline_db:
+        _timeline_db.close()
+        _timeline_db = None
+        _timeline_db_path = None
+
+
+def _format_timestamp(timestamp):
+    return (_epoch + timestamp * _microsecond).isoformat(sep=' ')
+
+
+def _get_export_rows(db):
+    """Yields the rows of the timeline sorted by time, merging the rows of the activities
+    read in time order, then the rows without timestamp"""
+    activities = [activity for (activity,) in db.execute('SELECT DISTINCT activity FROM data ORDER BY activity')]
+    timed_rows = [db.execute('''SELECT timestamp, activity, category, datalist FROM data
+                                WHERE activity = ? AND timestamp IS NOT NULL ORDER BY timestamp''', (activity,))
+                  for activity in activities]
+    yield from heapq.merge(*timed_rows, key=lambda row: row[0])
+    for activity in activities:
+        yield from db.execute('''SELECT timestamp, activity, category, datalist FROM data
+                                 WHERE activity = ? AND timestamp IS NULL''', (activity,))
+
+
+def finalize_timeline(report_folder_base):
+    """
+    Creates the indexes of the timeline, then exports it sorted by time to timeline.tsv and
+    timeline.jsonl in the timeline folder, and closes the connection of the process.
+    Args:
+        report_folder_base (str): The path of the report folder.
+    Returns:
+        int: The number of rows exported, 0 if there is no timeline.
+    """
+    timeline_folder = os.path.join(report_folder_base, timeline_folder_name)
+    if not os.path.isfile(os.path.join(timeline_folder, timeline_db_name)):
+        close_timeline()
+        return 0
+    db = _get_timeline_db(report_folder_base)
+    with db:
+        db.execute('CREATE INDEX IF NOT EXISTS data_timestamp ON data(timestamp)')
+        db.execute('CREATE INDEX IF NOT EXISTS data_activity ON data(activity, timestamp)')
+
+    tsv_path = os.path.join(timeline_folder, f'{timeline_export_name}.tsv')
+    jsonl_path = os.path.join(timeline_folder, f'{timeline_export_name}.jsonl')
+    row_count = 0
+    try:
+        with open(f'{tsv_path}.tmp', 'w', encoding='utf-8', newline='') as tsv_file, \
+                open(f'{jsonl_path}.tmp', 'w', encoding='utf-8', newline='\n') as jsonl_file:
+            tsv_file.write('Timestamp (UTC)\tActivity\tCategory\tData\n')
+            for timestamp, activity, category, datalist in _get_export_rows(db):
+                timestamp_text = _format_timestamp(timestamp) if timestamp is not None else ''
+                tsv_file.write(f'{timestamp_text}\t{activity}\t{category or ""}\t{datalist}\n')
+                jsonl_file.write(f'{{"timestamp":{json.dumps(timestamp_text or None)},"timestamp_us":'
+                                 f'{json.dumps(timestamp)},"activity":{json.dumps(activity)},'
+                                 f'"category":{json.dumps(category)},"data":{datalist}}}\n')
+                row_count += 1
+        os.replace(f'{tsv_path}.tmp', tsv_path)
+        os.replace(f'{jsonl_path}.tmp', jsonl_path)
+    finally:
+        for temp_path in (f'{tsv_path}.tmp', f'{jsonl_path}.tmp'):
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        close_timeline()
+    return row_count
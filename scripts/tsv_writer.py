@@ -0,0 +1,152 @@
+"""
+This module provides the writer of the TSV exports of the artifacts, in the _TSV Exports
+folder of the report. The rows are formatted as csv.writer formats them with a tab
+delimiter, and written by blocks of tsv_buffer_size characters. The rows without tab,
+quote or line break in their values are joined directly, only the other rows are
+formatted by csv.writer.
+
+With --tsv-compress, the exports are compressed as they are written, with gzip in .tsv.gz
+files or with Zstandard in .tsv.zst files. Zstandard needs the optional zstandard package.
+Rows appended to an existing export are written in a new gzip member or Zstandard frame,
+which the decompressors concatenate.
+
+The UTF-8 BOM is only written at the start of a new export.
+
+Global Variables:
+    tsv_folder_name (str): Name of the TSV exports folder in the report folder.
+    tsv_buffer_size (int): Number of characters of the rows buffered before they are written.
+    tsv_compression_formats (tuple): The formats of the --tsv-compress option.
+    tsv_compression_extensions (dict): The extension of the exports of each compression format.
+
+Classes:
+    TsvWriter: Writes the rows of an artifact to its TSV export.
+
+Functions:
+    is_tsv_compression_available: Returns True if a compression format can be used.
+    get_tsv_path: Returns the path of the TSV export of an artifact.
+"""
+
+import csv
+import gzip
+import io
+import os
+
+try:
+    # Optional, only needed by --tsv-compress zstd
+    import zstandard
+except ImportError:
+    zstandard = None
+
+tsv_folder_name = '_TSV Exports'
+tsv_buffer_size = 1024 * 1024
+tsv_compression_formats = ('gzip', 'zstd')
+tsv_compression_extensions = {None: '.tsv', 'gzip': '.tsv.gz', 'zstd': '.tsv.zst'}
+
+_gzip_compression_level = 6
+_zstd_compression_level = 3
+_line_terminator = '\r\n'
+_bom = '\ufeff'
+
+
+def is_tsv_compression_available(compression):
+    """
+    Returns True if the exports can be compressed with a format.
+    Args:
+        compression (str): One of tsv_compression_formats.
+    Returns:
+        bool: False for zstd without the zstandard package.
+    """
+    return compression != 'zstd' or zstandard is not None
+
+
+def get_tsv_path(report_folder_base, tsv_name, compression=None):
+    """
+    Returns the path of the TSV export of an artifact.
+    Args:
+        report_folder_base (str): The path of the report folder.
+        tsv_name (str): The name of the export, without extension.
+        compression (str): None, or one of tsv_compression_formats.
+    Returns:
+        str: The path of the export.
+    """
+    return os.path.join(report_folder_base, tsv_folder_name, tsv_name + tsv_compression_extensions[compression])
+
+
+def _get_tsv_lines(rows):
+    """Yields the rows formatted as by csv.writer with a tab delimiter"""
+    csv_buffer = io.StringIO()
+    csv_writer = csv.writer(csv_buffer, delimiter='\t', lineterminator=_line_terminator)
+    for row in rows:
+        fields = ['' if value is None else value if isinstance(value, str) else str(value) for value in row]
+        line = '\t'.join(fields)
+        # The values with a tab, a quote or a line break are quoted, as is a single empty value
+        if line.count('\t') != len(fields) - 1 or '"' in line or '\n' in line or '\r' in line \
+                or fields == ['']:
+            csv_writer.writerow(row)
+            yield csv_buffer.getvalue()
+            csv_buffer.seek(0)
+            csv_buffer.truncate()
+        else:
+            yield line + _line_terminator
+
+
+class TsvWriter:
+    """
+    Writes the rows of an artifact to its TSV export, appended to the export if it exists.
+    Args:
+        report_folder_base (str): The path of the report folder.
+        tsv_name (str): The name of the export, without extension.
+        compression (str): None, or one of tsv_compression_formats.
+    """
+
+    def __init__(self, report_folder_base, tsv_name, compression=None):
+        self.raw_file = None
+        self.path = get_tsv_path(report_folder_base, tsv_name, compression)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.is_new = not os.path.isfile(self.path) or not os.path.getsize(self.path)
+        raw_file = open(self.path, 'ab')
+        if compression == 'gzip':
+            self.file = gzip.GzipFile(fileobj=raw_file, mode='ab', compresslevel=_gzip_compression_level)
+        elif compression == 'zstd':
+            self.file = zstandard.ZstdCompressor(level=_zstd_compression_level).stream_writer(raw_file)
+        else:
+            self.file = raw_file
+        self.raw_file = raw_file
+        self.buffer = []
+        self.buffer_size = 0
+
+    def __del__(self):
+        self.close()
+
+    def _flush(self):
+        if self.buffer:
+            text = ''.join(self.buffer)
+            if self.is_new:
+                text = _bom + text
+                self.is_new = False
+            self.file.write(text.encode('utf-8'))
+            self.buffer = []
+            self.buffer_size = 0
+
+    def write_rows(self, rows):
+        """
+        Writes rows to the export, by blocks of tsv_buffer_size characters.
+        Args:
+            rows: An iterable of rows, the headers being written as a row.
+        """
+        for line in _get_tsv_lines(rows):
+            self.buffer.append(line)
+            self.buffer_size += len(line)
+            if self.buffer_size >= tsv_buffer_size:
+                self._flush()
+
+    def close(self):
+        """Writes the buffered rows and closes the export."""
+        if self.raw_file:
+            try:
+                self._flush()
+            finally:
+                if self.file is not self.raw_file:
+                    self.file.close()
+                self.raw_file.close()
+                self.raw_file = None